@@ -6,20 +6,189 @@ Herramienta para analizar evaluaciones académicas, competencias básicas,
 diversidad cultural e inclusión educativa
 """
 
+import time
+
+# Instante de arranque, para --medir-arranque
+INICIO_PROGRAMA = time.perf_counter()
+
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from pathlib import Path
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import numpy as np
+import os
+import csv
+import io
+import re
+import json
+import codecs
+import gzip
+import zipfile
+import hashlib
+import sys
+import functools
+import threading
+import weakref
+import gc
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from enum import Enum
 
-# Configurar estilo de gráficos
-sns.set_style("whitegrid")
-plt.rcParams['figure.figsize'] = (12, 6)
-plt.rcParams['font.size'] = 10
+
+# Separador entre la ruta de un .zip y un CSV que contiene ("datos.zip::2019.csv")
+SEPARADOR_MIEMBRO_ZIP = '::'
+
+# Extensiones de CSV comprimido; se descomprimen al vuelo, sin copia en disco
+EXTENSIONES_COMPRIMIDAS = ('.gz', '.zip', '.zst')
+
+
+def separar_fuente(ruta):
+    """Devuelve (ruta del archivo en disco, CSV dentro del zip o None)"""
+    ruta = str(ruta)
+    if SEPARADOR_MIEMBRO_ZIP in ruta:
+        archivo, miembro = ruta.split(SEPARADOR_MIEMBRO_ZIP, 1)
+        return archivo, miembro
+    return ruta, None
+
+
+def _miembros_csv(zf):
+    return [info.filename for info in zf.infolist()
+            if not info.is_dir() and info.filename.lower().endswith('.csv')]
+
+
+def expandir_rutas(rutas):
+    """Sustituye cada .zip por las rutas ("archivo.zip::miembro.csv") de sus CSV
+
+    Las demás rutas, y los zip que no se pueden abrir o no contienen ningún
+    CSV, se devuelven tal cual para que el error se informe al cargarlos.
+    """
+    expandidas = []
+    for ruta in rutas:
+        ruta = str(ruta)
+        miembros = []
+        if ruta.lower().endswith('.zip'):
+            try:
+                with zipfile.ZipFile(ruta) as zf:
+                    miembros = _miembros_csv(zf)
+            except (OSError, zipfile.BadZipFile):
+                miembros = []
+        if miembros:
+            expandidas.extend(f"{ruta}{SEPARADOR_MIEMBRO_ZIP}{miembro}" for miembro in miembros)
+        else:
+            expandidas.append(ruta)
+    return expandidas
+
+
+def nombre_fuente(ruta):
+    """Nombre del dataset: el del CSV sin extensiones ('2019.csv.gz' -> '2019')"""
+    archivo, miembro = separar_fuente(ruta)
+    nombre = Path(miembro or archivo).name
+    if nombre.lower().endswith(EXTENSIONES_COMPRIMIDAS):
+        nombre = Path(nombre).stem
+    return Path(nombre).stem
+
+
+def _zstandard():
+    """Importa zstandard (dependencia opcional, solo para archivos .zst)"""
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        raise ValueError("Para leer archivos .zst hay que instalar el paquete 'zstandard'")
+
+
+def abrir_fuente(ruta):
+    """Abre un CSV plano, .gz, .zst o dentro de un .zip como flujo binario
+
+    Los archivos comprimidos se descomprimen a medida que se leen, de modo
+    que la detección de encoding y la lectura por bloques funcionan igual
+    que con un CSV plano y nunca se escribe una copia descomprimida.
+    """
+    archivo, miembro = separar_fuente(ruta)
+    extension = archivo.lower()
+    if extension.endswith('.zip'):
+        # El flujo del miembro sigue siendo legible tras cerrar el ZipFile
+        with zipfile.ZipFile(archivo) as zf:
+            if miembro is None:
+                miembros = _miembros_csv(zf)
+                if len(miembros) != 1:
+                    raise ValueError(f"El zip contiene {len(miembros)} archivos CSV; "
+                                     "usa la carga de múltiples archivos")
+                miembro = miembros[0]
+            return zf.open(miembro)
+    if extension.endswith('.gz'):
+        return gzip.open(archivo, 'rb')
+    if extension.endswith('.zst'):
+        lector = _zstandard().ZstdDecompressor().stream_reader(open(archivo, 'rb'), closefd=True)
+        return io.BufferedReader(lector)
+    return open(archivo, 'rb')
+
+
+def tamano_descomprimido(ruta):
+    """Tamaño aproximado (bytes) del CSV una vez descomprimido, sin descomprimirlo
+
+    Para .zip se usa el tamaño del índice del zip, para .gz el campo ISIZE
+    del final del archivo (módulo 4 GiB) y para .zst el tamaño declarado en
+    la cabecera, si lo tiene. Nunca es menor que el tamaño en disco.
+    """
+    archivo, miembro = separar_fuente(ruta)
+    tamano = Path(archivo).stat().st_size
+    extension = archivo.lower()
+    if extension.endswith('.zip'):
+        with zipfile.ZipFile(archivo) as zf:
+            nombres = [miembro] if miembro else _miembros_csv(zf)
+            return max([tamano] + [zf.getinfo(nombre).file_size for nombre in nombres])
+    if extension.endswith('.gz'):
+        with open(archivo, 'rb') as f:
+            f.seek(-4, os.SEEK_END)
+            return max(tamano, int.from_bytes(f.read(4), 'little'))
+    if extension.endswith('.zst'):
+        with open(archivo, 'rb') as f:
+            parametros = _zstandard().get_frame_parameters(f.read(18))
+        if parametros.content_size > 0:
+            return max(tamano, parametros.content_size)
+    return tamano
+
+
+# Tamaño de la muestra (bytes) usada para detectar el encoding de un CSV
+TAMANO_MUESTRA_ENCODING = 64 * 1024
+
+# Encodings alternativos si la detección falla más allá de la muestra
+ENCODINGS_ALTERNATIVOS = ['latin-1', 'utf-8', 'cp1252']
+
+# Bytes que cp1252 no define (en latin-1 son caracteres de control)
+_BYTES_NO_DEFINIDOS_CP1252 = {0x81, 0x8D, 0x8F, 0x90, 0x9D}
+
+
+def detectar_encoding_muestra(muestra):
+    """Deduce el encoding a partir de una muestra de bytes del archivo
+
+    Orden de decisión: BOM, validez UTF-8 y, si no es UTF-8, frecuencia de
+    bytes del rango 0x80-0x9F (imprimibles en cp1252, de control en latin-1).
+    """
+    if muestra.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if muestra.startswith(codecs.BOM_UTF16_LE) or muestra.startswith(codecs.BOM_UTF16_BE):
+        return 'utf-16'
+
+    # Decodificador incremental: tolera un carácter multibyte cortado al final
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(muestra, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    bytes_c1 = {b for b in muestra if 0x80 <= b <= 0x9F}
+    if bytes_c1 and not (bytes_c1 & _BYTES_NO_DEFINIDOS_CP1252):
+        return 'cp1252'
+    return 'latin-1'
+
+
+def detectar_encoding(ruta_archivo, tamano_muestra=TAMANO_MUESTRA_ENCODING):
+    """Detecta el encoding de un CSV leyendo solo una muestra acotada"""
+    with abrir_fuente(ruta_archivo) as f:
+        muestra = f.read(tamano_muestra)
+    return detectar_encoding_muestra(muestra)
 
 
 class TipoCSV(Enum):
@@ -29,182 +198,1835 @@ class TipoCSV(Enum):
     DESCONOCIDO = "desconocido"
 
 
-class AnalizadorEducativo:
+# Esquema de tipos por TipoCSV: (patrones de columna, tipo de dato)
+#   'category' -> texto de baja cardinalidad (un código por fila)
+#   'entero'   -> recuentos, reducidos al entero más pequeño que los representa
+#   'float32'  -> medias de competencias
+#   None       -> se conserva sin conversión
+# Solo se leen del CSV las columnas que encajan en algún patrón de su tipo.
+ESQUEMAS_CSV = {
+    TipoCSV.EVALUACION: [
+        (['Curs'], 'category'),
+        (['Nivell'], 'category'),
+        (['Ensenyament'], 'category'),
+        (['Zona', 'Nacionalitat'], 'category'),
+        (['Aula', 'acollida'], 'category'),
+        (['Conseq', 'Avalua'], 'category'),
+        (['Centre', 'Codi'], 'entero'),
+        (['mero', 'Avalua'], 'entero'),
+    ],
+    TipoCSV.COMPETENCIAS: [
+        (['Curs'], 'category'),
+        (['Nivell'], 'category'),
+        (['Zona', 'Nacionalitat'], 'category'),
+        (['Centre', 'Codi'], 'entero'),
+        (['mero', 'alumnes'], 'entero'),
+        (['mero', 'avaluats'], 'entero'),
+        (['mitjana'], 'float32'),
+        (['compet'], None),
+    ],
+}
+
+
+def buscar_columna_en(columnas, patrones):
+    """Devuelve la primera columna que contiene todos los patrones (sin distinguir mayúsculas)"""
+    for col in columnas:
+        if all(patron.lower() in col.lower() for patron in patrones):
+            return col
+    return None
+
+
+# Campos lógicos -> patrones de la columna que los contiene. Se resuelven una
+# sola vez por dataset al cargarlo (ver resolver_columnas); el análisis usa
+# siempre el nombre ya resuelto.
+CAMPOS = {
+    'curso': ['Curs'],
+    'nivel': ['Nivell'],
+    'numero': ['mero', 'Avalua'],
+    'nacionalidad': ['Zona', 'Nacionalitat'],
+    'aula_acollida': ['Aula', 'acollida'],
+    'consecuencias': ['Conseq', 'Avalua'],
+    'centro': ['Centre', 'Codi'],
+    'num_catala': ['mero', 'alumnes', 'Catal'],
+    'mitjana_catala': ['Catal', 'mitjana'],
+    'num_castella': ['mero', 'alumnes', 'Castell'],
+    'mitjana_castella': ['Castell', 'mitjana'],
+    'competencia_catala': ['Català', 'competència'],
+    'competencia_castella': ['Castellà', 'competència'],
+    'num_avaluats': ['mero', 'avaluats'],
+}
+
+
+def resolver_columnas(columnas):
+    """Devuelve el mapa campo lógico -> nombre de columna (None si no existe)"""
+    columnas = list(columnas)
+    return {campo: buscar_columna_en(columnas, patrones) for campo, patrones in CAMPOS.items()}
+
+
+# Grupos de nacionalidad: nombre -> patrones de la etiqueta de zona (sin
+# distinguir mayúsculas). Cada etiqueta pertenece al primer grupo con algún
+# patrón que contiene, así que el orden importa; las que no encajan en
+# ninguno van a GRUPO_SIN_CLASIFICAR. Se puede modificar antes de cargar datos.
+GRUPOS_NACIONALIDAD = {
+    'ESPAÑA': ['ESPANYA', 'ESPAÑA'],
+    'MAGREB': ['MAGREB'],
+    'AMÉRICA': ['CENTRE I SUDAM', 'AMÈRICA'],
+    'EUROPA': ['RESTA UNIÓ EUROPEA', 'EUROPA'],
+    'ASIA/OCEANÍA': ['ÀSIA', 'OCEANIA'],
+    'RESTO ÁFRICA': ['RESTA ÀFRICA'],
+}
+GRUPO_SIN_CLASIFICAR = 'OTROS'
+
+# Grupo con el que se calculan los porcentajes de alumnado extranjero
+GRUPO_LOCAL = 'ESPAÑA'
+
+# Subgrupo de AMÉRICA con análisis propio
+PATRON_SUDAMERICA = 'CENTRE I SUDAM'
+
+# Las columnas con este prefijo las añade el programa: no se muestran ni exportan
+PREFIJO_COLUMNA_INTERNA = '_'
+COL_GRUPO_NACIONALIDAD = '_Grup nacionalitat'
+
+
+def columnas_visibles(df):
+    """Columnas del DataFrame sin las internas (ver PREFIJO_COLUMNA_INTERNA)"""
+    return [col for col in df.columns if not str(col).startswith(PREFIJO_COLUMNA_INTERNA)]
+
+
+def _como_categoria(serie):
+    return serie if serie.dtype.name == 'category' else serie.astype('category')
+
+
+def clasificar_etiquetas(serie, clasificar, categorias, nombre):
+    """Columna categórica derivada de clasificar cada etiqueta distinta una vez
+
+    `clasificar` recibe una etiqueta y devuelve la posición de su clase en
+    `categorias`; las filas reciben la clase a través del código de su
+    etiqueta, sin evaluar nada fila a fila.
+    """
+    serie = _como_categoria(serie)
+    codigo_por_etiqueta = np.array([clasificar(str(etiqueta)) for etiqueta in serie.cat.categories],
+                                   dtype=np.int8)
+
+    # El código -1 (etiqueta vacía) se mantiene como valor ausente
+    codigos = serie.cat.codes.to_numpy()
+    codigos_clase = np.where(codigos >= 0, codigo_por_etiqueta[np.maximum(codigos, 0)], -1) \
+        if len(codigo_por_etiqueta) else np.full(len(codigos), -1, dtype=np.int8)
+    return pd.Series(pd.Categorical.from_codes(codigos_clase, categories=categorias),
+                     index=serie.index, name=nombre)
+
+
+def clasificar_nacionalidades(serie, grupos=None):
+    """Columna categórica con el grupo de nacionalidad de cada fila"""
+    grupos = GRUPOS_NACIONALIDAD if grupos is None else grupos
+
+    def clasificar(etiqueta):
+        etiqueta = etiqueta.lower()
+        for codigo, patrones in enumerate(grupos.values()):
+            if any(patron.lower() in etiqueta for patron in patrones):
+                return codigo
+        return len(grupos)
+
+    return clasificar_etiquetas(serie, clasificar, list(grupos) + [GRUPO_SIN_CLASIFICAR],
+                                COL_GRUPO_NACIONALIDAD)
+
+
+class ResultadoEvaluacion(Enum):
+    """Resultado de una consecuencia de evaluación"""
+    PROMOCIONA = "promociona"
+    REPITE = "repite"
+    OTRO = "otro"
+
+
+# En catalán: "Accedeix", "Obté el títol", "Passa de curs" = promociona
+# Pero NO "Roman" (permanece), "No passa", "No obté", "No accedeix"
+PATRON_PROMOCION = re.compile(r'Accedeix al curs següent|Passa de curs|Obté el títol|Promociona', re.IGNORECASE)
+PATRON_NO_PROMOCION = re.compile(r'Roman|No passa|No obté|No accedeix', re.IGNORECASE)
+PATRON_REPETICION = re.compile(r'Roman|Repeteix|Repetir|No passa', re.IGNORECASE)
+
+COL_RESULTADO_EVALUACION = '_Resultat avaluació'
+
+
+def clasificar_consecuencia(etiqueta):
+    """ResultadoEvaluacion de una etiqueta de consecuencias de evaluación"""
+    if PATRON_PROMOCION.search(etiqueta) and not PATRON_NO_PROMOCION.search(etiqueta):
+        return ResultadoEvaluacion.PROMOCIONA
+    if PATRON_REPETICION.search(etiqueta):
+        return ResultadoEvaluacion.REPITE
+    return ResultadoEvaluacion.OTRO
+
+
+def clasificar_consecuencias(serie):
+    """Columna categórica con el ResultadoEvaluacion (su valor) de cada fila"""
+    resultados = list(ResultadoEvaluacion)
+    return clasificar_etiquetas(serie, lambda etiqueta: resultados.index(clasificar_consecuencia(etiqueta)),
+                                [resultado.value for resultado in resultados], COL_RESULTADO_EVALUACION)
+
+
+def totales_por_resultado(df, col_numero, por=None):
+    """Suma de col_numero por ResultadoEvaluacion
+
+    Returns:
+        Sin `por`, Series indexada por el valor de cada ResultadoEvaluacion.
+        Con `por`, DataFrame con una fila por valor de esa columna y una
+        columna por resultado. Las filas sin consecuencia no se cuentan.
+    """
+    resultados = [resultado.value for resultado in ResultadoEvaluacion]
+    if por is None:
+        return df.groupby(COL_RESULTADO_EVALUACION, observed=True)[col_numero].sum() \
+            .reindex(resultados, fill_value=0)
+    tabla = df.groupby([por, COL_RESULTADO_EVALUACION], observed=True)[col_numero].sum()
+    return tabla.unstack(COL_RESULTADO_EVALUACION, fill_value=0).reindex(columns=resultados, fill_value=0)
+
+
+# Campos lógicos que conserva el cubo de agregados de un dataset de evaluación
+DIMENSIONES_CUBO = ['curso', 'nivel', 'nacionalidad', 'grupo_nacionalidad', 'aula_acollida',
+                    'consecuencias', 'resultado', 'centro']
+
+
+def construir_cubo(df, campos, dimensiones=DIMENSIONES_CUBO):
+    """Suma el número de evaluados por cada combinación de las dimensiones
+
+    El resultado conserva los nombres de columna del dataset y una columna
+    COL_REGISTROS_AGREGADOS con las filas originales de cada combinación,
+    así que se puede filtrar y agrupar igual que los datos sin agregar.
+    `df` puede ser a su vez un cubo con más dimensiones (para los rollups).
+    """
+    col_numero = campos['numero']
+    columnas = [campos[dimension] for dimension in dimensiones if campos.get(dimension)]
+    # Los recuentos vienen reducidos (int8/int16): las sumas se hacen en 64 bits
+    tipo_suma = 'int64' if pd.api.types.is_integer_dtype(df[col_numero]) else 'float64'
+    df = df.assign(**{col_numero: df[col_numero].astype(tipo_suma)})
+    if COL_REGISTROS_AGREGADOS in df.columns:
+        registros = (COL_REGISTROS_AGREGADOS, 'sum')
+    else:
+        registros = (col_numero, 'size')
+    cubo = df.groupby(columnas, observed=True, dropna=False, sort=False).agg(
+        **{col_numero: (col_numero, 'sum'), COL_REGISTROS_AGREGADOS: registros})
+    return cubo.reset_index()
+
+
+def mascara_grupo(df, grupo):
+    """Filas del grupo de nacionalidad indicado (comparación de códigos enteros)"""
+    serie = df[COL_GRUPO_NACIONALIDAD]
+    if grupo not in serie.cat.categories:
+        return np.zeros(len(df), dtype=bool)
+    return serie.cat.codes.to_numpy() == serie.cat.categories.get_loc(grupo)
+
+
+def mascara_etiqueta(serie, patron):
+    """Filas cuya etiqueta contiene el patrón, evaluado solo sobre las etiquetas distintas"""
+    serie = _como_categoria(serie)
+    coincide = np.array([patron.lower() in str(etiqueta).lower()
+                         for etiqueta in serie.cat.categories], dtype=bool)
+    # Posición extra para el código -1 (valor ausente)
+    coincide = np.append(coincide, False)
+    return coincide[serie.cat.codes.to_numpy()]
+
+
+# Campos lógicos por los que se puede filtrar el dataset actual (ver
+# AnalizadorEducativo.establecer_filtro). Todos son dimensiones del cubo.
+CAMPOS_FILTRO = ['curso', 'nivel', 'grupo_nacionalidad', 'aula_acollida', 'resultado', 'centro']
+
+
+def mascara_valores(serie, valores):
+    """Filas cuyo valor está entre `valores`; en las categóricas se evalúa sobre las categorías"""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # Posición extra para el código -1 (valor ausente)
+        permitidos = np.append(serie.cat.categories.isin(list(valores)), False)
+        return permitidos[serie.cat.codes.to_numpy()]
+    return serie.isin(list(valores)).to_numpy()
+
+
+def mascara_filtro(df, campos, filtro):
+    """Conjunción de las máscaras de cada campo del filtro sobre df (o un cubo)"""
+    return np.logical_and.reduce([mascara_valores(df[campos[campo]], valores)
+                                  for campo, valores in filtro.items()] +
+                                 [np.ones(len(df), dtype=bool)])
+
+
+# Lenguas de las pruebas de competencias: (nombre, campo de alumnos, campo de media)
+LENGUAS_COMPETENCIAS = [('Català', 'num_catala', 'mitjana_catala'),
+                        ('Castellà', 'num_castella', 'mitjana_castella')]
+
+
+def tabla_competencias(df, campos, grupos=None, por_nivel=False):
+    """Alumnos, media ponderada y mediana por grupo, nivel y lengua en una sola agrupación
+
+    Args:
+        grupos: Etiqueta de grupo de cada fila (serie o array alineado con df).
+            Sin ella todo el dataset es un único grupo, True.
+        por_nivel: Si es True, separa además por nivel
+
+    Returns:
+        DataFrame con una fila por combinación (columnas grupo, [nivel,] lengua,
+        total_alumnos, registros_validos, media y mediana) o None si el dataset
+        no tiene columnas de competencias. La media pondera por alumnos solo
+        las filas con número y media; media y mediana son NaN si no hay ninguna.
+    """
+    lenguas = [(nombre, campos.get(num), campos.get(mit)) for nombre, num, mit in LENGUAS_COMPETENCIAS
+               if campos.get(num) and campos.get(mit)]
+    if not lenguas:
+        return None
+
+    claves = ['grupo', 'nivel'] if por_nivel and campos.get('nivel') else ['grupo']
+    grupos = np.ones(len(df), dtype=bool) if grupos is None else np.asarray(grupos)
+    nombres = [nombre for nombre, _, _ in lenguas]
+
+    # Formato largo: una fila por fila original y lengua
+    partes = []
+    for nombre, col_num, col_mit in lenguas:
+        parte = pd.DataFrame({'grupo': grupos, 'num': df[col_num].to_numpy(),
+                              'mit': df[col_mit].to_numpy()})
+        if 'nivel' in claves:
+            parte['nivel'] = df[campos['nivel']].to_numpy()
+        parte['lengua'] = pd.Categorical.from_codes(np.full(len(df), nombres.index(nombre)), nombres)
+        partes.append(parte)
+    largo = pd.concat(partes, ignore_index=True)
+
+    num = largo['num'].astype('float64')
+    validos = num.notna() & largo['mit'].notna()
+    largo['ponderado'] = (num * largo['mit'].astype('float64')).where(validos)
+    largo['peso'] = num.where(validos)
+    largo['valido'] = validos
+
+    tabla = largo.groupby(claves + ['lengua'], observed=True).agg(
+        total_alumnos=('num', 'sum'), registros_validos=('valido', 'sum'),
+        ponderado=('ponderado', 'sum'), peso=('peso', 'sum'), mediana=('mit', 'median'))
+    hay_validos = tabla['registros_validos'] > 0
+    tabla['media'] = (tabla['ponderado'] / tabla['peso']).where(hay_validos)
+    tabla['mediana'] = tabla['mediana'].where(hay_validos)
+    return tabla[['total_alumnos', 'registros_validos', 'media', 'mediana']].reset_index()
+
+
+def vista_competencias(tabla, grupo, por_nivel=False):
+    """Estadísticas de un grupo de tabla_competencias en formato {lengua: {...}}
+
+    Con por_nivel devuelve {nivel: {lengua: {...}}} y media/mediana None en
+    las lenguas sin datos válidos; sin él esas lenguas se omiten.
+    """
+    if tabla is None:
+        return None
+    filas = tabla[tabla['grupo'] == grupo]
+
+    def estadisticas(fila):
+        valida = fila.registros_validos > 0
+        return {'total_alumnos': fila.total_alumnos,
+                'media': fila.media if valida else None,
+                'mediana': fila.mediana if valida else None}
+
+    if por_nivel and 'nivel' in filas.columns:
+        stats_por_nivel = {}
+        for fila in filas.itertuples(index=False):
+            stats_por_nivel.setdefault(fila.nivel, {})[fila.lengua] = estadisticas(fila)
+        return stats_por_nivel if stats_por_nivel else None
+
+    stats = {fila.lengua: estadisticas(fila) for fila in filas.itertuples(index=False)
+             if fila.registros_validos > 0}
+    return stats if stats else None
+
+
+def detectar_tipo_columnas(columnas):
+    """Detecta el tipo de CSV a partir de los nombres de columna"""
+    columnas = list(columnas)
+
+    # Buscar indicadores de CSV de Evaluación
+    tiene_consecuencias = any('conseq' in col.lower() and 'avalua' in col.lower()
+                             for col in columnas)
+    tiene_aula_acollida = any('aula' in col.lower() and 'acollida' in col.lower()
+                             for col in columnas)
+
+    # Buscar indicadores de CSV de Competencias
+    tiene_catala_mitjana = any('catal' in col.lower() and 'mitjana' in col.lower()
+                               for col in columnas)
+    tiene_castella_mitjana = any('castell' in col.lower() and 'mitjana' in col.lower()
+                                 for col in columnas)
+
+    if tiene_consecuencias or tiene_aula_acollida:
+        return TipoCSV.EVALUACION
+    elif tiene_catala_mitjana or tiene_castella_mitjana:
+        return TipoCSV.COMPETENCIAS
+    else:
+        return TipoCSV.DESCONOCIDO
+
+
+def _categorias_numericas(serie):
+    """Convierte a números las categorías de texto que son todas numéricas
+
+    read_csv con dtype='category' deja las categorías como texto ('1', '2'...);
+    así los niveles conservan el tipo y el orden que tendrían sin categorizar.
+    """
+    categorias = serie.cat.categories
+    if pd.api.types.is_numeric_dtype(categorias):
+        return serie
+    try:
+        numericas = pd.to_numeric(categorias)
+        return serie.cat.rename_categories(numericas).cat.reorder_categories(sorted(numericas))
+    except (ValueError, TypeError):
+        return serie
+
+
+# Recuento escrito con punto como separador de miles ('1.234', '12.345.678')
+PATRON_MILES = re.compile(r'-?\d{1,3}(\.\d{3})+')
+
+
+def _texto_a_numero(valor, entero=False):
+    """Interpreta un número escrito con coma decimal y/o separadores de miles
+
+    Con coma y punto, el último de los dos es el separador decimal
+    ('1.234,5' y '1,234.5'). Una sola coma es decimal ('75,17'); varias, de miles.
+    Con solo puntos, en recuentos un patrón de miles ('1.234') se lee como
+    miles y en el resto el punto es decimal. Devuelve NaN si no es un número.
+    """
+    texto = str(valor).strip().replace('\u00a0', '').replace(' ', '')
+    coma, punto = texto.rfind(','), texto.rfind('.')
+    if coma >= 0 and punto >= 0:
+        if coma > punto:
+            texto = texto.replace('.', '').replace(',', '.')
+        else:
+            texto = texto.replace(',', '')
+    elif texto.count(',') > 1:
+        texto = texto.replace(',', '')
+    elif coma >= 0:
+        texto = texto.replace(',', '.')
+    elif entero and PATRON_MILES.fullmatch(texto):
+        texto = texto.replace('.', '')
+    try:
+        return float(texto)
+    except ValueError:
+        return np.nan
+
+
+def normalizar_numeros(serie, entero=False):
+    """Convierte a número una columna leída como texto
+
+    La conversión se hace una sola vez por valor distinto y se propaga a las
+    filas, de modo que el coste depende de la cardinalidad de la columna.
+
+    Returns:
+        (serie_numerica, valores_no_convertidos): el segundo elemento cuenta
+        las filas con contenido que no se pudo interpretar como número
+    """
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie, 0
+    unicos = serie.dropna().unique()
+    conversion = {valor: _texto_a_numero(valor, entero) for valor in unicos}
+    numerica = serie.map(conversion).astype('float64')
+    no_convertidos = int((serie.notna() & numerica.isna()).sum())
+    return numerica, no_convertidos
+
+
+def aplicar_esquema(df, tipo_csv):
+    """Convierte las columnas del DataFrame a los tipos del esquema de su TipoCSV
+
+    Un mismo patrón puede afectar a varias columnas (p. ej. Català y Castellà).
+    Las columnas que no encajan en el esquema se dejan como están. Las
+    columnas numéricas escritas con coma decimal se normalizan aquí, de modo
+    que el análisis trabaja siempre con columnas ya tipadas.
+
+    Returns:
+        (df, no_convertidos): no_convertidos es un dict columna -> número de
+        valores que no se pudieron interpretar como número (solo si hay alguno)
+    """
+    no_convertidos = {}
+    for patrones, tipo_dato in ESQUEMAS_CSV.get(tipo_csv, []):
+        for col in df.columns:
+            if not all(patron.lower() in col.lower() for patron in patrones):
+                continue
+
+            if tipo_dato == 'category':
+                if df[col].dtype.name != 'category':
+                    df[col] = df[col].astype('category')
+                df[col] = _categorias_numericas(df[col])
+            elif tipo_dato in ('entero', 'float32'):
+                serie, fallos = normalizar_numeros(df[col], entero=tipo_dato == 'entero')
+                if fallos:
+                    no_convertidos[col] = fallos
+                if tipo_dato == 'float32':
+                    df[col] = serie.astype('float32')
+                # Solo se reduce a entero si no hay valores vacíos ni decimales
+                elif serie.notna().all() and (serie % 1 == 0).all():
+                    df[col] = pd.to_numeric(serie.astype('int64'), downcast='integer')
+                else:
+                    df[col] = pd.to_numeric(serie, downcast='float')
+    return df, no_convertidos
+
+
+# Archivos mayores que este umbral se cargan en modo streaming (solo agregados)
+UMBRAL_STREAMING_BYTES = 200 * 1024 ** 2
+TAMANO_CHUNK_STREAMING = 200000
+
+# Dimensiones que conservan los agregados de evaluación en modo streaming
+DIMENSIONES_AGREGADO_EVALUACION = [
+    ['Curs'],
+    ['Nivell'],
+    ['Zona', 'Nacionalitat'],
+    ['Aula', 'acollida'],
+    ['Conseq', 'Avalua'],
+    ['Centre', 'Codi'],
+]
+
+# Columna con el número de filas originales que resume cada fila agregada
+COL_REGISTROS_AGREGADOS = 'Registres agregats'
+
+
+def leer_csv_agregado(ruta_archivo, encoding, tamano_chunk=TAMANO_CHUNK_STREAMING):
+    """Lee un CSV de evaluación por bloques y lo reduce a sumas por dimensión
+
+    Cada bloque se agrupa por las dimensiones de DIMENSIONES_AGREGADO_EVALUACION
+    y se suma al acumulado, sin materializar nunca todas las filas a la vez.
+    El resultado conserva los nombres de columna originales, por lo que los
+    métodos de análisis funcionan igual que con el archivo completo.
+
+    Returns:
+        (df_agregado, filas_originales, no_convertidos)
+
+    Raises:
+        ValueError: si el archivo no tiene la columna de número de evaluados
+    """
+    columnas = leer_cabecera(ruta_archivo, encoding)
+    col_numero = buscar_columna_en(columnas, ['mero', 'Avalua'])
+    if col_numero is None:
+        raise ValueError("No se encontró la columna de número de evaluados")
+    dimensiones = [col for col in (buscar_columna_en(columnas, patrones)
+                                   for patrones in DIMENSIONES_AGREGADO_EVALUACION)
+                   if col is not None]
+
+    parciales = []
+    filas = 0
+    no_convertidos = 0
+    with abrir_fuente(ruta_archivo) as fuente:
+        lector = pd.read_csv(fuente, sep=';', encoding=encoding,
+                             usecols=dimensiones + [col_numero], dtype={col_numero: str},
+                             chunksize=tamano_chunk)
+        for chunk in lector:
+            filas += len(chunk)
+            chunk[col_numero], fallos = normalizar_numeros(chunk[col_numero], entero=True)
+            no_convertidos += fallos
+            parcial = chunk.groupby(dimensiones, dropna=False, sort=False)[col_numero].agg(['sum', 'size'])
+            parciales.append(parcial)
+
+            # Compactar periódicamente para que la memoria dependa de las
+            # combinaciones distintas y no del número de bloques leídos
+            if len(parciales) >= 8:
+                parciales = [pd.concat(parciales).groupby(level=dimensiones, dropna=False, sort=False).sum()]
+
+    if not parciales:
+        raise ValueError("El archivo no contiene registros")
+
+    agregado = pd.concat(parciales).groupby(level=dimensiones, dropna=False).sum()
+    agregado = agregado.rename(columns={'sum': col_numero, 'size': COL_REGISTROS_AGREGADOS})
+    return agregado.reset_index(), filas, {col_numero: no_convertidos} if no_convertidos else {}
+
+
+# Caché en disco de CSV ya parseados y tipados
+DIRECTORIO_CACHE = Path.home() / '.analizador_evaluaciones' / 'cache'
+TAMANO_MAXIMO_CACHE_BYTES = 2 * 1024 ** 3
+
+# Incrementar si cambia el esquema de tipos o el formato de los datos en caché
+VERSION_CACHE = 5
+
+# Índice de la caché con los hashes de los archivos de origen ya resumidos
+ARCHIVO_HUELLAS = 'huellas.json'
+
+
+class CacheDatasets:
+    """Caché en disco de DataFrames ya parseados, indexada por contenido
+
+    Cada entrada se identifica por la huella del archivo de origen (tamaño,
+    fecha de modificación y hash del contenido), su TipoCSV y el modo de
+    lectura. Se guarda en Feather (lectura con memory-map) si pyarrow está
+    instalado y, si no, en el formato pickle de pandas. Al superar
+    `tamano_maximo` se eliminan las entradas usadas hace más tiempo. Los
+    hashes ya calculados se guardan en ARCHIVO_HUELLAS por ruta, tamaño y
+    fecha, así que un archivo sin cambios no se vuelve a leer para buscarlo.
+    """
+
+    def __init__(self, directorio=DIRECTORIO_CACHE, tamano_maximo=TAMANO_MAXIMO_CACHE_BYTES):
+        self.directorio = Path(directorio)
+        self.tamano_maximo = tamano_maximo
+
+    @staticmethod
+    def _usar_feather():
+        try:
+            import pyarrow.feather  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def huella(self, ruta_archivo, tamano_bloque=1024 * 1024):
+        """Huella del archivo: tamaño, fecha de modificación y hash del contenido
+
+        Los comprimidos se resumen tal como están en disco. Para un CSV dentro
+        de un zip se usan su nombre, tamaño y CRC32 del índice del zip, sin
+        leer el resto del archivo. El hash de un archivo solo se calcula si su
+        tamaño o su fecha no coinciden con los de ARCHIVO_HUELLAS.
+        """
+        archivo, miembro = separar_fuente(ruta_archivo)
+        info = Path(archivo).stat()
+        resumen = hashlib.blake2b(digest_size=16)
+        if miembro is not None:
+            with zipfile.ZipFile(archivo) as zf:
+                info_miembro = zf.getinfo(miembro)
+            resumen.update(f"{miembro}-{info_miembro.CRC:08x}".encode('utf-8'))
+            return f"{info_miembro.file_size}-{info.st_mtime_ns}-{resumen.hexdigest()}"
+
+        ruta = str(Path(archivo).resolve())
+        huellas = self._leer_huellas()
+        conocida = huellas.get(ruta)
+        if conocida is not None and conocida[:2] == [info.st_size, info.st_mtime_ns]:
+            contenido = conocida[2]
+        else:
+            with open(archivo, 'rb') as f:
+                for bloque in iter(lambda: f.read(tamano_bloque), b''):
+                    resumen.update(bloque)
+            contenido = resumen.hexdigest()
+            huellas[ruta] = [info.st_size, info.st_mtime_ns, contenido]
+            self._guardar_huellas(huellas)
+        return f"{info.st_size}-{info.st_mtime_ns}-{contenido}"
+
+    def _leer_huellas(self):
+        """{ruta: [tamaño, fecha en ns, hash]} de los archivos ya resumidos"""
+        try:
+            with open(self.directorio / ARCHIVO_HUELLAS, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _guardar_huellas(self, huellas):
+        ruta = self.directorio / ARCHIVO_HUELLAS
+        try:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            # Se olvidan los archivos que ya no existen
+            huellas = {origen: datos for origen, datos in huellas.items() if os.path.exists(origen)}
+            temporal = ruta.with_name(ruta.name + f'.{os.getpid()}.tmp')
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(huellas, f)
+            os.replace(temporal, ruta)
+        except OSError:
+            # Sin índice de huellas la caché sigue funcionando, solo vuelve a leer el archivo
+            pass
+
+    @staticmethod
+    def clave(huella, tipo_csv, agregado):
+        modo = 'agregado' if agregado else 'completo'
+        return f"v{VERSION_CACHE}-{tipo_csv.value}-{modo}-{huella}"
+
+    def _rutas(self, clave):
+        extension = '.feather' if self._usar_feather() else '.pkl'
+        return self.directorio / f"{clave}{extension}", self.directorio / f"{clave}.json"
+
+    def leer(self, clave):
+        """Devuelve (df, info_carga) o None si la clave no está en caché"""
+        ruta_datos, ruta_meta = self._rutas(clave)
+        if not ruta_datos.exists() or not ruta_meta.exists():
+            return None
+        try:
+            if ruta_datos.suffix == '.feather':
+                from pyarrow import feather
+                df = feather.read_table(ruta_datos, memory_map=True).to_pandas()
+            else:
+                df = pd.read_pickle(ruta_datos)
+            with open(ruta_meta, encoding='utf-8') as f:
+                info_carga = json.load(f)
+            # Marcar como usada recientemente (orden de expulsión)
+            os.utime(ruta_datos)
+            return df, info_carga
+        except Exception:
+            # Entrada corrupta o a medio escribir: se ignora
+            return None
+
+    def guardar(self, clave, df, info_carga):
+        """Guarda un DataFrame en caché y aplica el límite de tamaño"""
+        ruta_datos, ruta_meta = self._rutas(clave)
+        try:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            # Escritura atómica: otro proceso nunca ve un archivo a medias
+            temporal = ruta_datos.with_name(ruta_datos.name + f'.{os.getpid()}.tmp')
+            if ruta_datos.suffix == '.feather':
+                from pyarrow import feather
+                feather.write_feather(df.reset_index(drop=True), temporal)
+            else:
+                df.to_pickle(temporal)
+            os.replace(temporal, ruta_datos)
+            with open(ruta_meta, 'w', encoding='utf-8') as f:
+                json.dump(info_carga, f)
+            self._expulsar()
+        except Exception:
+            # La caché es una optimización: un fallo al escribir no impide cargar
+            pass
+
+    def _entradas(self):
+        if not self.directorio.exists():
+            return []
+        return [ruta for ruta in self.directorio.iterdir()
+                if ruta.suffix in ('.feather', '.pkl')]
+
+    def tamano_total(self):
+        """Bytes ocupados por los datos en caché"""
+        total = 0
+        for ruta in self._entradas():
+            try:
+                total += ruta.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def _expulsar(self):
+        """Elimina las entradas menos usadas hasta respetar el tamaño máximo"""
+        entradas = []
+        for ruta in self._entradas():
+            try:
+                info = ruta.stat()
+                entradas.append((info.st_mtime, info.st_size, ruta))
+            except OSError:
+                pass
+
+        total = sum(tamano for _, tamano, _ in entradas)
+        for _, tamano, ruta in sorted(entradas, key=lambda e: e[0]):
+            if total <= self.tamano_maximo:
+                break
+            self._eliminar(ruta)
+            total -= tamano
+
+    @staticmethod
+    def _eliminar(ruta_datos):
+        for ruta in (ruta_datos, ruta_datos.with_suffix('.json')):
+            try:
+                ruta.unlink()
+            except OSError:
+                pass
+
+    def purgar(self):
+        """Vacía la caché y devuelve los bytes liberados"""
+        liberados = self.tamano_total()
+        if self.directorio.exists():
+            for ruta in self.directorio.iterdir():
+                try:
+                    ruta.unlink()
+                except OSError:
+                    pass
+        return liberados
+
+
+def leer_cabecera(ruta_archivo, encoding):
+    """Lee solo la primera línea del CSV y devuelve los nombres de columna"""
+    with io.TextIOWrapper(abrir_fuente(ruta_archivo), encoding=encoding, newline='') as f:
+        primera_linea = f.readline()
+    if not primera_linea:
+        return []
+    return [col.strip() for col in next(csv.reader([primera_linea], delimiter=';'))]
+
+
+def plan_lectura(columnas, tipo_csv):
+    """Columnas a leer y tipos a aplicar en el parseo según el esquema del tipo
+
+    Returns:
+        (usecols, dtype): todas las columnas con nombre (las de cabecera vacía,
+        p. ej. por un ';' final, no tienen datos); para las categóricas del
+        esquema, dtype 'category' para que se parseen ya codificadas, y para
+        las numéricas, texto que convierte aplicar_esquema. Las
+        columnas fuera del esquema (p. ej. 'Nom Centre') no se analizan pero se
+        muestran y exportan; se leen también como 'category'
+    """
+    usecols = []
+    dtype = {}
+    for col in columnas:
+        if not col:
+            continue
+        usecols.append(col)
+        tipos = [tipo_dato for patrones, tipo_dato in ESQUEMAS_CSV.get(tipo_csv, [])
+                 if all(patron.lower() in col.lower() for patron in patrones)]
+        if not tipos or 'category' in tipos:
+            dtype[col] = 'category'
+        elif 'entero' in tipos or 'float32' in tipos:
+            # Como texto: si pandas las convirtiera, leería "1.234" como 1.234 y
+            # no 1234; normalizar_numeros trata la coma decimal y el punto de miles
+            dtype[col] = str
+    return usecols, dtype
+
+
+def leer_csv(ruta_archivo, streaming=None, cache=None):
+    """Lee y tipa un CSV sin registrarlo en ningún analizador
+
+    Antes del parseo se comprueba solo la cabecera: los archivos de tipo
+    desconocido se rechazan sin leerlos y, para los demás, la cabecera decide
+    qué columnas se leen y con qué tipos. El encoding se decide una sola vez
+    sobre una muestra del archivo, de modo que el CSV se parsea completo una
+    única vez. Al ser una función de módulo puede ejecutarse en otro proceso
+    (ver cargar_multiples_csv).
+
+    Args:
+        streaming: Si es True, los CSV de evaluación se leen por bloques y
+            solo se conservan sus agregados. Con None se activa
+            automáticamente para archivos mayores que UMBRAL_STREAMING_BYTES.
+        cache: CacheDatasets opcional; si contiene el archivo se evita el parseo
+
+    Returns:
+        dict con 'nombre', 'df', 'tipo', 'campos' (ver resolver_columnas) y
+        'carga' (encoding, tiempos, memoria)
+
+    Raises:
+        ValueError: si el archivo no es de un tipo reconocido o no se puede decodificar
+    """
+    inicio = time.perf_counter()
+    encoding = detectar_encoding(ruta_archivo)
+    tipo_csv = detectar_tipo_columnas(leer_cabecera(ruta_archivo, encoding))
+    tiempo_deteccion = time.perf_counter() - inicio
+
+    if tipo_csv == TipoCSV.DESCONOCIDO:
+        raise ValueError("Tipo de CSV no reconocido (no es de evaluación ni de competencias básicas)")
+
+    if streaming is None:
+        streaming = tamano_descomprimido(ruta_archivo) > UMBRAL_STREAMING_BYTES
+    streaming = streaming and tipo_csv == TipoCSV.EVALUACION
+
+    clave_cache = None
+    if cache is not None:
+        inicio = time.perf_counter()
+        clave_cache = cache.clave(cache.huella(ruta_archivo), tipo_csv, streaming)
+        en_cache = cache.leer(clave_cache)
+        if en_cache is not None:
+            df, info_carga = en_cache
+            info_carga.update({
+                'tiempo_deteccion': tiempo_deteccion,
+                'tiempo_lectura': time.perf_counter() - inicio,
+                'cache': True
+            })
+            return _resultado_carga(ruta_archivo, df, tipo_csv, info_carga)
+
+    # Si la muestra engañó (bytes inválidos más adelante), se reintenta
+    # con el resto de encodings conocidos
+    candidatos = [encoding] + [e for e in ENCODINGS_ALTERNATIVOS if e != encoding]
+    inicio = time.perf_counter()
+    filas_originales = None
+    for candidato in candidatos:
+        try:
+            if streaming:
+                df, filas_originales, no_convertidos = leer_csv_agregado(ruta_archivo, candidato)
+            else:
+                # Los nombres de columna dependen del encoding con que se decodifican
+                usecols, dtype = plan_lectura(leer_cabecera(ruta_archivo, candidato), tipo_csv)
+                with abrir_fuente(ruta_archivo) as fuente:
+                    df = pd.read_csv(fuente, sep=';', encoding=candidato,
+                                     usecols=usecols, dtype=dtype)
+            encoding = candidato
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        raise ValueError("No se pudo decodificar el archivo")
+    tiempo_lectura = time.perf_counter() - inicio
+
+    df, no_convertidos_esquema = aplicar_esquema(df, tipo_csv)
+    if not streaming:
+        no_convertidos = no_convertidos_esquema
+
+    info_carga = {
+        'encoding': encoding,
+        'tiempo_deteccion': tiempo_deteccion,
+        'tiempo_lectura': tiempo_lectura,
+        'memoria_bytes': int(df.memory_usage(deep=True).sum()),
+        'agregado': filas_originales is not None,
+        'filas_originales': filas_originales if filas_originales is not None else len(df),
+        'no_convertidos': no_convertidos,
+        'cache': False
+    }
+
+    if clave_cache is not None:
+        cache.guardar(clave_cache, df, info_carga)
+
+    return _resultado_carga(ruta_archivo, df, tipo_csv, info_carga)
+
+
+def _resultado_carga(ruta_archivo, df, tipo_csv, info_carga):
+    """Completa un DataFrame leído (o de la caché) con sus columnas derivadas
+
+    El grupo de nacionalidad y el resultado de evaluación no se guardan en
+    caché: dependen de la configuración de grupos y patrones y se calculan
+    sobre las etiquetas distintas.
+    """
+    campos = resolver_columnas(df.columns)
+    if campos['nacionalidad'] is not None:
+        df[COL_GRUPO_NACIONALIDAD] = clasificar_nacionalidades(df[campos['nacionalidad']])
+    campos['grupo_nacionalidad'] = COL_GRUPO_NACIONALIDAD if campos['nacionalidad'] else None
+    if campos['consecuencias'] is not None:
+        df[COL_RESULTADO_EVALUACION] = clasificar_consecuencias(df[campos['consecuencias']])
+    campos['resultado'] = COL_RESULTADO_EVALUACION if campos['consecuencias'] else None
+
+    return {
+        'nombre': nombre_fuente(ruta_archivo),
+        'ruta': str(ruta_archivo),
+        'df': df,
+        'tipo': tipo_csv,
+        'campos': campos,
+        'carga': info_carga
+    }
+
+
+def _leer_csv_en_proceso(ruta_archivo, streaming=None, cache=None):
+    """Envoltorio de leer_csv para el pool de procesos: nunca lanza excepciones"""
+    inicio = time.perf_counter()
+    try:
+        resultado = leer_csv(ruta_archivo, streaming, cache)
+        return True, resultado, time.perf_counter() - inicio
+    except Exception as e:
+        return False, str(e), time.perf_counter() - inicio
+
+
+# Memoria máxima (bytes) de los DataFrames que se mantienen cargados a la vez
+PRESUPUESTO_MEMORIA_DATASETS = 1024 ** 3
+
+
+class EntradaDataset:
+    """Metadatos de un dataset de la sesión
+
+    Nombre, tipo, número de filas, columnas y mapa de campos están siempre en memoria; el
+    DataFrame se materializa bajo demanda a través del RegistroDatasets. Se
+    puede usar como el dict {'df': ..., 'tipo': ..., 'carga': ...} anterior.
+    Mientras está en memoria se lleva la cuenta de lo que ocupan el DataFrame
+    (medido al materializarlo) y sus cubos, máscaras e índice de centros.
+    """
+
+    def __init__(self, registro, resultado):
+        self._registro = registro
+        self._df = resultado['df']
+        self.nombre = resultado['nombre']
+        self.tipo = resultado['tipo']
+        self.carga = resultado['carga']
+        self.ruta = resultado.get('ruta')
+        self.filas = len(resultado['df'])
+        self.columnas = columnas_visibles(resultado['df'])
+        self.campos = resultado.get('campos') or resolver_columnas(self.columnas)
+        self._cubos = {}
+        self._indice_centros = None
+        self._mascaras = {}
+        self._memoria_df = tamano_resultado(self._df)
+        self._memoria_derivados = 0
+        self.version = 0
+
+    @property
+    def residente(self):
+        return self._df is not None
+
+    def memoria(self):
+        """Bytes en memoria del DataFrame y de lo calculado a partir de él (0 si no es residente)"""
+        return self._memoria_df + self._memoria_derivados if self.residente else 0
+
+    def _derivado(self, valor):
+        self._memoria_derivados += tamano_resultado(valor)
+        return valor
+
+    def _descargar(self):
+        """Suelta el DataFrame y todo lo calculado a partir de él"""
+        self._df = None
+        self._cubos.clear()
+        self._indice_centros = None
+        self._mascaras.clear()
+        self._memoria_df = 0
+        self._memoria_derivados = 0
+
+    @property
+    def df(self):
+        return self._registro.materializar(self.nombre)
+
+    def __getitem__(self, clave):
+        if clave in ('df', 'tipo', 'carga', 'nombre', 'ruta', 'filas', 'columnas', 'campos'):
+            return getattr(self, clave)
+        raise KeyError(clave)
+
+    def get(self, clave, defecto=None):
+        try:
+            return self[clave]
+        except KeyError:
+            return defecto
+
+    def cubo(self, dimensiones=DIMENSIONES_CUBO):
+        """Cubo de agregados del dataset sobre los campos indicados
+
+        El cubo completo (DIMENSIONES_CUBO) se construye una vez a partir de
+        las filas; los de menos dimensiones, a partir de él. Todos se
+        guardan hasta que el dataset se expulsa de memoria.
+        """
+        if self.tipo != TipoCSV.EVALUACION or self.campos.get('numero') is None:
+            return None
+        clave = tuple(dimension for dimension in DIMENSIONES_CUBO if dimension in dimensiones)
+        with self._registro._cerrojo:
+            if clave not in self._cubos:
+                completo = tuple(DIMENSIONES_CUBO)
+                if completo not in self._cubos:
+                    self._cubos[completo] = self._derivado(construir_cubo(self.df, self.campos))
+                self._cubos[clave] = self._derivado(construir_cubo(self._cubos[completo], self.campos, clave))
+            return self._cubos[clave]
+
+    def indice_centros(self):
+        """Posiciones de las filas de cada centro: {código: array de posiciones}
+
+        Se construye con una sola agrupación la primera vez que se pide y,
+        como los cubos, se descarta cuando el dataset se expulsa de memoria.
+        """
+        col_centro = self.campos.get('centro')
+        if col_centro is None:
+            return None
+        with self._registro._cerrojo:
+            if self._indice_centros is None:
+                self._indice_centros = self._derivado(self.df.groupby(col_centro, observed=True, sort=False).indices)
+            return self._indice_centros
+
+    def mascara(self, campo, valores):
+        """Máscara de las filas con el campo en `valores`, guardada para próximos filtros
+
+        La de centro se construye con el índice de centros, marcando solo las
+        posiciones de los centros pedidos.
+        """
+        clave = (campo, frozenset(valores))
+        with self._registro._cerrojo:
+            if clave not in self._mascaras:
+                if campo == 'centro':
+                    indice = self.indice_centros()
+                    mascara = np.zeros(self.filas, dtype=bool)
+                    for codigo in valores:
+                        if codigo in indice:
+                            mascara[indice[codigo]] = True
+                else:
+                    mascara = mascara_valores(self.df[self.campos[campo]], valores)
+                self._mascaras[clave] = self._derivado(mascara)
+            return self._mascaras[clave]
+
+    def mascara_filtro(self, filtro):
+        """Conjunción de las máscaras del filtro {campo: valores}, o None si está vacío"""
+        if not filtro:
+            return None
+        return np.logical_and.reduce([self.mascara(campo, valores) for campo, valores in filtro.items()])
+
+
+class RegistroDatasets:
+    """Datasets cargados en la sesión, con expulsión LRU de los DataFrames
+
+    Mientras la memoria de los datasets residentes (DataFrame, cubos,
+    máscaras e índice de centros, ver EntradaDataset.memoria) más la del
+    df_actual filtrado supera el presupuesto, se liberan los usados hace más
+    tiempo (salvo el protegido, normalmente el dataset actual). Al volver a
+    pedirlos se recargan desde la caché en disco o, si no están en ella,
+    desde el archivo de origen. Las vistas en segundo plano (ver
+    TareasSegundoPlano) usan los datasets a la vez que la interfaz: el
+    cerrojo del registro protege la carga, la expulsión y el cálculo de los
+    cubos, máscaras e índices de cada EntradaDataset.
+    """
+
+    def __init__(self, presupuesto_bytes=PRESUPUESTO_MEMORIA_DATASETS, cache=None):
+        self.presupuesto_bytes = presupuesto_bytes
+        self.cache = cache
+        self.protegido = None
+        self.memoria_filtro = 0  # bytes del df_actual filtrado (una copia de las filas)
+        self._entradas = OrderedDict()  # orden de carga
+        self._uso = OrderedDict()       # orden de uso (el último, el más reciente)
+        # Reentrante: los cubos y máscaras de una entrada materializan su DataFrame
+        self._cerrojo = threading.RLock()
+
+    def agregar(self, resultado):
+        """Registra un resultado de leer_csv y devuelve su entrada"""
+        entrada = EntradaDataset(self, resultado)
+        with self._cerrojo:
+            self._entradas[entrada.nombre] = entrada
+            self._marcar_uso(entrada.nombre)
+            self._expulsar()
+        return entrada
+
+    def materializar(self, nombre):
+        """Devuelve el DataFrame del dataset, recargándolo si fue expulsado"""
+        with self._cerrojo:
+            entrada = self._entradas[nombre]
+            if entrada._df is None:
+                if entrada.ruta is None:
+                    raise RuntimeError(f"No se puede recargar el dataset {nombre}: origen desconocido")
+                resultado = leer_csv(entrada.ruta, entrada.carga.get('agregado', False), self.cache)
+                entrada._df = resultado['df']
+                entrada._memoria_df = tamano_resultado(entrada._df)
+            self._marcar_uso(nombre)
+            self._expulsar()
+            return entrada._df
+
+    def _marcar_uso(self, nombre):
+        self._uso.pop(nombre, None)
+        self._uso[nombre] = True
+
+    def memoria_residente(self):
+        """Bytes de los datasets en memoria, con lo calculado a partir de ellos y el filtro actual"""
+        with self._cerrojo:
+            return self.memoria_filtro + sum(entrada.memoria() for entrada in self._entradas.values())
+
+    def fijar_memoria_filtro(self, bytes_filtro):
+        """Anota lo que ocupa el df_actual filtrado y libera datasets si ya no cabe"""
+        with self._cerrojo:
+            self.memoria_filtro = bytes_filtro
+            self._expulsar()
+
+    def _expulsar(self):
+        # Siempre con el cerrojo tomado (agregar, materializar, fijar_memoria_filtro)
+        residentes = [nombre for nombre in self._uso if self._entradas[nombre].residente]
+        memoria = self.memoria_residente()
+        for nombre in residentes:
+            # Se conserva siempre al menos el dataset usado más recientemente
+            if memoria <= self.presupuesto_bytes or nombre == residentes[-1]:
+                break
+            if nombre == self.protegido:
+                continue
+            entrada = self._entradas[nombre]
+            memoria -= entrada.memoria()
+            entrada._descargar()
+
+    def eliminar(self, nombre):
+        """Quita un dataset de la sesión"""
+        with self._cerrojo:
+            self._entradas.pop(nombre)
+            self._uso.pop(nombre, None)
+            if self.protegido == nombre:
+                self.protegido = None
+
+    def clear(self):
+        with self._cerrojo:
+            self._entradas.clear()
+            self._uso.clear()
+            self.protegido = None
+            self.memoria_filtro = 0
+
+    def __getitem__(self, nombre):
+        return self._entradas[nombre]
+
+    def __contains__(self, nombre):
+        return nombre in self._entradas
+
+    def __iter__(self):
+        return iter(self._entradas)
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def get(self, nombre, defecto=None):
+        return self._entradas.get(nombre, defecto)
+
+    def keys(self):
+        return self._entradas.keys()
+
+    def values(self):
+        return self._entradas.values()
+
+    def items(self):
+        return self._entradas.items()
+
+
+# Memoria máxima (bytes estimados) de los resultados de análisis memorizados
+TAMANO_MAXIMO_RESULTADOS_BYTES = 256 * 1024 ** 2
+
+
+def tamano_resultado(valor):
+    """Bytes estimados de un resultado de análisis (DataFrames, Series, dicts, listas)"""
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        uso = valor.memory_usage(deep=True)
+        return int(uso.sum() if isinstance(valor, pd.DataFrame) else uso)
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamano_resultado(k) + tamano_resultado(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(tamano_resultado(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+class CacheResultados:
+    """Resultados de análisis memorizados, con expulsión LRU por tamaño
+
+    Las claves incluyen la huella de los datos (ver
+    AnalizadorEducativo.huella_datos y huella_panel), el método y sus
+    argumentos; el primer elemento de la huella es su ámbito (nombre del
+    dataset o 'panel'). Los resultados se devuelven tal cual: quien los use
+    no debe modificarlos.
+    """
+
+    def __init__(self, tamano_maximo=TAMANO_MAXIMO_RESULTADOS_BYTES, medir=tamano_resultado):
+        self.tamano_maximo = tamano_maximo
+        self.medir = medir  # bytes estimados de un resultado
+        self.aciertos = 0
+        self.fallos = 0
+        self._entradas = OrderedDict()  # clave -> (resultado, bytes); el último, el más reciente
+        self._tamano = 0
+        # Los cálculos en segundo plano (ver TareasSegundoPlano) usan la caché desde otros hilos
+        self._cerrojo = threading.Lock()
+
+    def obtener(self, clave, calcular):
+        """Devuelve el resultado memorizado o lo calcula y lo guarda"""
+        encontrado, resultado = self.buscar(clave)
+        if not encontrado:
+            resultado = calcular()
+            self.guardar(clave, resultado)
+        return resultado
+
+    def __contains__(self, clave):
+        with self._cerrojo:
+            return clave in self._entradas
+
+    def buscar(self, clave):
+        """(True, resultado) si está memorizado; si no, (False, None). Cuenta el acierto o el fallo"""
+        with self._cerrojo:
+            if clave in self._entradas:
+                self.aciertos += 1
+                self._entradas.move_to_end(clave)
+                return True, self._entradas[clave][0]
+            self.fallos += 1
+            return False, None
+
+    def guardar(self, clave, resultado):
+        """Memoriza un resultado, expulsando los menos usados si no cabe"""
+        tamano = self.medir(resultado)
+        if tamano <= self.tamano_maximo:
+            with self._cerrojo:
+                if clave in self._entradas:
+                    self._tamano -= self._entradas[clave][1]
+                self._entradas[clave] = (resultado, tamano)
+                self._tamano += tamano
+                while self._tamano > self.tamano_maximo:
+                    _, (_, liberado) = self._entradas.popitem(last=False)
+                    self._tamano -= liberado
+
+    def invalidar(self, ambito=None):
+        """Descarta los resultados de un ámbito, o todos (los contadores se conservan)"""
+        with self._cerrojo:
+            if ambito is None:
+                self._entradas.clear()
+                self._tamano = 0
+                return
+            for clave in [clave for clave in self._entradas if clave[0][0] == ambito]:
+                self._tamano -= self._entradas.pop(clave)[1]
+
+    def estadisticas(self):
+        """Entradas, bytes estimados, aciertos y fallos"""
+        with self._cerrojo:
+            return {'entradas': len(self._entradas), 'bytes': self._tamano,
+                    'aciertos': self.aciertos, 'fallos': self.fallos}
+
+
+def _memorizador(huella):
+    """Decorador que memoriza un método de AnalizadorEducativo en su CacheResultados
+
+    `huella` es el nombre del método del analizador que identifica los datos
+    de los que depende el resultado. Los argumentos deben ser hashables; si
+    no lo son, el método se ejecuta sin memorizar.
+    """
+    def decorador(metodo):
+        @functools.wraps(metodo)
+        def envoltorio(self, *args, **kwargs):
+            clave = (getattr(self, huella)(), metodo.__name__, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(clave)
+            except TypeError:
+                return metodo(self, *args, **kwargs)
+            return self.resultados.obtener(clave, lambda: metodo(self, *args, **kwargs))
+        return envoltorio
+    return decorador
+
+
+# Resultados que dependen solo del dataset actual y de todo el panel de cursos
+memorizar = _memorizador('huella_datos')
+memorizar_panel = _memorizador('huella_panel')
+
+
+# Campos lógicos que cada TipoCSV aporta al panel de cursos. Los de
+# evaluación salen del cubo del dataset y los de competencias, de sus filas.
+CAMPOS_PANEL = {
+    TipoCSV.EVALUACION: ['curso', 'nivel', 'grupo_nacionalidad', 'resultado'],
+    TipoCSV.COMPETENCIAS: ['curso', 'nivel', 'grupo_nacionalidad', 'num_catala', 'mitjana_catala',
+                           'num_castella', 'mitjana_castella'],
+}
+
+
+def parte_panel(entrada):
+    """Filas de un dataset para el panel de cursos, con los campos lógicos como columnas
+
+    Los datasets sin columna de curso usan su nombre como curso. La columna
+    'dataset' permite retirar el dataset del panel.
+    """
+    campos = [campo for campo in CAMPOS_PANEL[entrada.tipo] if entrada.campos.get(campo)]
+    if entrada.tipo == TipoCSV.EVALUACION:
+        origen = entrada.cubo(campos)
+        if origen is None:
+            return None
+        columnas = {entrada.campos[campo]: campo for campo in campos + ['numero']}
+        columnas[COL_REGISTROS_AGREGADOS] = 'registros'
+    else:
+        columnas = {entrada.campos[campo]: campo for campo in campos}
+        origen = entrada.df[list(columnas)]
+
+    parte = origen[list(columnas)].rename(columns=columnas).reset_index(drop=True)
+    if 'curso' not in parte.columns:
+        parte['curso'] = entrada.nombre
+    parte['curso'] = _como_categoria(parte['curso'])
+    parte['dataset'] = pd.Categorical.from_codes(np.zeros(len(parte), dtype=np.int8), [entrada.nombre])
+    return parte
+
+
+def anexar_panel(panel, parte):
+    """Añade filas al panel unificando los diccionarios de las columnas categóricas
+
+    Cada columna categórica del resultado tiene las categorías (ordenadas)
+    de los dos lados, así los códigos son comparables entre cursos y los
+    cursos salen en orden cronológico.
+    """
+    if panel is None:
+        return parte
+    columnas = list(dict.fromkeys(list(panel.columns) + list(parte.columns)))
+    unidas = {}
+    for col in columnas:
+        if col not in panel.columns or col not in parte.columns:
+            unidas[col] = pd.concat([panel.get(col, pd.Series(np.nan, index=panel.index)),
+                                     parte.get(col, pd.Series(np.nan, index=parte.index))], ignore_index=True)
+        elif isinstance(panel[col].dtype, pd.CategoricalDtype) or isinstance(parte[col].dtype, pd.CategoricalDtype):
+            izquierda, derecha = _como_categoria(panel[col]), _como_categoria(parte[col])
+            try:
+                unidas[col] = pd.Series(pd.api.types.union_categoricals(
+                    [izquierda, derecha], sort_categories=True, ignore_order=True))
+            except TypeError:
+                # Categorías de distinto tipo (p. ej. niveles numéricos y de texto)
+                unidas[col] = pd.Series(pd.api.types.union_categoricals(
+                    [izquierda.astype(str).astype('category'), derecha.astype(str).astype('category')],
+                    sort_categories=True))
+        else:
+            unidas[col] = pd.concat([panel[col], parte[col]], ignore_index=True)
+    return pd.DataFrame(unidas)
+
+
+def totales_parte(parte, tipo):
+    """Sumas de una parte del panel por curso, nivel, grupo (y resultado en evaluación)
+
+    Todas las columnas son sumables (recuentos y sumas de medias con su
+    número de valores), así que los totales de la sesión se mantienen
+    sumando o restando la aportación de cada dataset.
+    """
+    claves = [campo for campo in ('curso', 'nivel', 'grupo_nacionalidad', 'resultado') if campo in parte.columns]
+    if tipo == TipoCSV.EVALUACION:
+        sumables = parte[['numero', 'registros']]
+    else:
+        sumables = pd.DataFrame({'registros': np.ones(len(parte), dtype='int64')})
+        for _, _, mit in LENGUAS_COMPETENCIAS:
+            if mit in parte.columns:
+                valores = parte[mit].astype('float64')
+                sumables[f'suma_{mit}'] = valores.fillna(0).to_numpy()
+                sumables[f'valores_{mit}'] = valores.notna().astype('int64').to_numpy()
+    sumas = sumables.groupby([parte[clave] for clave in claves], observed=True, dropna=False).sum()
+    # Índice con los valores de las categorías: se alinea entre datasets aunque sus diccionarios difieran
+    sumas.index = pd.MultiIndex.from_frame(sumas.index.to_frame(index=False).astype(object))
+    return sumas
+
+
+def sumar_totales(totales, aporte, signo=1):
+    """Suma (signo 1) o resta (signo -1) la aportación de un dataset a los totales"""
+    if totales is None:
+        return aporte if signo > 0 else None
+    combinados = pd.concat([totales, aporte * signo])
+    combinados = combinados.groupby(level=list(range(combinados.index.nlevels)), dropna=False).sum()
+    combinados = combinados[combinados['registros'] != 0]
+    return combinados if len(combinados) > 0 else None
+
+
+class PanelCursos:
+    """Datasets de la sesión combinados por TipoCSV en una tabla larga por curso
+
+    Los datasets se anotan al registrarse y se incorporan a la tabla de su
+    tipo la primera vez que se pide; cada dataset nuevo se añade a la tabla
+    existente en lugar de reconstruirla. Junto a la tabla se mantienen los
+    totales por curso, nivel, grupo y resultado (ver totales_parte): cada
+    dataset suma su aportación al incorporarse y la resta al quitarlo. Un
+    cerrojo protege esos cambios, porque las comparativas se calculan en
+    segundo plano mientras la interfaz registra o quita datasets.
+    """
+
     def __init__(self):
-        self.dataframes = {}
+        self._tablas = {}
+        self._totales = {}
+        self._aportes = {}  # nombre -> (tipo, totales del dataset)
+        self._pendientes = OrderedDict()
+        self._cerrojo = threading.RLock()
+        self.version = 0
+
+    def agregar(self, entrada):
+        """Anota un EntradaDataset (sustituye al dataset anterior del mismo nombre)"""
+        with self._cerrojo:
+            self.quitar(entrada.nombre)
+            if entrada.tipo in CAMPOS_PANEL:
+                self._pendientes[entrada.nombre] = entrada
+            self.version += 1
+
+    def quitar(self, nombre):
+        """Retira del panel las filas de un dataset y resta su aportación a los totales"""
+        with self._cerrojo:
+            self.version += 1
+            self._pendientes.pop(nombre, None)
+            if nombre in self._aportes:
+                tipo, aporte = self._aportes.pop(nombre)
+                self._totales[tipo] = sumar_totales(self._totales.get(tipo), aporte, -1)
+            for tipo, tabla in list(self._tablas.items()):
+                if nombre in tabla['dataset'].cat.categories:
+                    tabla = tabla[tabla['dataset'] != nombre].reset_index(drop=True)
+                    for col in tabla.select_dtypes('category').columns:
+                        tabla[col] = tabla[col].cat.remove_unused_categories()
+                    self._tablas[tipo] = tabla if len(tabla) > 0 else None
+
+    def _incorporar(self, tipo):
+        # Siempre con el cerrojo tomado (tabla, totales)
+        for nombre, entrada in list(self._pendientes.items()):
+            if entrada.tipo == tipo:
+                del self._pendientes[nombre]
+                parte = parte_panel(entrada)
+                if parte is not None and len(parte) > 0:
+                    self._tablas[tipo] = anexar_panel(self._tablas.get(tipo), parte)
+                    aporte = totales_parte(parte, tipo)
+                    self._aportes[nombre] = (tipo, aporte)
+                    self._totales[tipo] = sumar_totales(self._totales.get(tipo), aporte)
+
+    def tabla(self, tipo):
+        """Tabla larga de los datasets del tipo (None si no hay ninguno)"""
+        with self._cerrojo:
+            self._incorporar(tipo)
+            return self._tablas.get(tipo)
+
+    def totales(self, tipo):
+        """Totales acumulados de los datasets del tipo (None si no hay ninguno)"""
+        with self._cerrojo:
+            self._incorporar(tipo)
+            return self._totales.get(tipo)
+
+    def cursos(self, tipo):
+        """Número de cursos distintos en la tabla del tipo"""
+        tabla = self.tabla(tipo)
+        return 0 if tabla is None else tabla['curso'].nunique()
+
+    def clear(self):
+        with self._cerrojo:
+            self._tablas.clear()
+            self._totales.clear()
+            self._aportes.clear()
+            self._pendientes.clear()
+            self.version += 1
+
+
+# Ranking de centros por diversidad: tamaño mínimo y número de centros mostrados
+MINIMO_ESTUDIANTES_RANKING = 50
+TOP_CENTROS_RANKING = 20
+
+
+class AnalizadorEducativo:
+    def __init__(self, usar_cache=True, presupuesto_memoria=PRESUPUESTO_MEMORIA_DATASETS):
+        self.cache = CacheDatasets() if usar_cache else None
+        self.dataframes = RegistroDatasets(presupuesto_memoria, self.cache)
         self.df_actual = None
         self.nombre_archivo_actual = None
         self.tipo_csv_actual = TipoCSV.DESCONOCIDO
+        self.campos_actual = {}
+        self.resultados = CacheResultados()
+        # Funciones a las que se avisa con el ámbito (nombre del dataset,
+        # 'panel' o None: todos) cuyos resultados dejan de valer
+        self.al_invalidar = []
+        self._version_datos = 0
+        self.panel = PanelCursos()
+        self.filtro = {}
+        self._mascara_actual = None
+
+    def huella_datos(self):
+        """Identifica el dataset actual para la CacheResultados: (nombre, versión, filtro)
+
+        La versión cambia cada vez que se registra un dataset con ese nombre,
+        así los resultados de los demás datasets siguen siendo válidos. Incluye
+        el filtro activo.
+        """
+        entrada = self.dataframes.get(self.nombre_archivo_actual)
+        return (self.nombre_archivo_actual, entrada.version if entrada is not None else 0,
+                frozenset(self.filtro.items()))
+
+    def huella_panel(self):
+        """Identifica el estado del panel de cursos para la CacheResultados"""
+        return ('panel', self.panel.version)
+
+    def _datos_cambiados(self, nombre):
+        """Descarta los resultados del dataset `nombre` (sustituido o quitado) y del panel"""
+        self._invalidar(nombre)
+        self._invalidar('panel')
+
+    def _invalidar(self, ambito=None):
+        self.resultados.invalidar(ambito)
+        for aviso in self.al_invalidar:
+            aviso(ambito)
+
+    def seleccionar_dataset(self, nombre):
+        """Marca como actual un dataset ya registrado (None: ninguno)"""
+        if nombre is None:
+            self.dataframes.protegido = None
+            self.df_actual = None
+            self.nombre_archivo_actual = None
+            self.tipo_csv_actual = TipoCSV.DESCONOCIDO
+            self.campos_actual = {}
+            self.filtro = {}
+            self._mascara_actual = None
+            self.dataframes.fijar_memoria_filtro(0)
+            return
+        entrada = self.dataframes[nombre]
+        if nombre != self.nombre_archivo_actual:
+            self.filtro = {}
+        self.dataframes.protegido = nombre
+        self._mascara_actual = entrada.mascara_filtro(self.filtro)
+        self.df_actual = entrada.df if self._mascara_actual is None else entrada.df[self._mascara_actual]
+        self.dataframes.fijar_memoria_filtro(0 if self._mascara_actual is None else tamano_resultado(self.df_actual))
+        self.nombre_archivo_actual = nombre
+        self.tipo_csv_actual = entrada.tipo
+        self.campos_actual = entrada.campos
+
+    def establecer_filtro(self, filtro=None):
+        """Activa un filtro sobre el dataset actual: {campo de CAMPOS_FILTRO: valores}
+
+        Los campos se combinan con Y y los valores de un campo con O; los
+        campos sin valores no filtran. Desde ese momento df_actual, los cubos,
+        los análisis y las exportaciones solo ven las filas que lo cumplen. Las
+        comparativas entre cursos (totales del panel) no se filtran. Las máscaras de cada campo se guardan en el dataset, así que combinar
+        o repetir filtros no vuelve a recorrer las columnas.
+
+        Raises:
+            ValueError: si un campo no se puede filtrar o no existe en el dataset
+        """
+        filtro = {campo: frozenset(valores) for campo, valores in (filtro or {}).items() if valores}
+        for campo in filtro:
+            if campo not in CAMPOS_FILTRO or self.columna(campo) is None:
+                raise ValueError(f"No se puede filtrar por {campo} en el dataset actual")
+        self.filtro = filtro
+        if self.nombre_archivo_actual is not None:
+            self.seleccionar_dataset(self.nombre_archivo_actual)
+
+    def valores_filtro(self, campo):
+        """Valores distintos del campo en el dataset actual completo (sin filtrar)"""
+        entrada = self.dataframes.get(self.nombre_archivo_actual)
+        if entrada is None or entrada.campos.get(campo) is None:
+            return []
+        serie = entrada.df[entrada.campos[campo]]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            return list(serie.cat.categories)
+        return sorted(serie.dropna().unique().tolist())
+
+    def eliminar_dataset(self, nombre):
+        """Quita un dataset de la sesión y resta su aportación al panel de cursos
+
+        Si era el actual, pasa a serlo el último cargado de los que quedan.
+        Devuelve False si no había ningún dataset con ese nombre.
+        """
+        if nombre not in self.dataframes:
+            return False
+        self.dataframes.eliminar(nombre)
+        self.panel.quitar(nombre)
+        self._datos_cambiados(nombre)
+        if nombre == self.nombre_archivo_actual:
+            restantes = list(self.dataframes.keys())
+            self.seleccionar_dataset(restantes[-1] if restantes else None)
+        return True
+
+    def limpiar(self):
+        """Descarta todos los datasets de la sesión y los resultados memorizados"""
+        self.dataframes.clear()
+        self.panel.clear()
+        self.seleccionar_dataset(None)
+        self._invalidar()
 
     def detectar_tipo_csv(self, df):
         """Detecta el tipo de CSV basándose en las columnas"""
-        columnas = df.columns.tolist()
-        columnas_str = ' '.join(columnas).lower()
+        return detectar_tipo_columnas(df.columns)
+
+    def registrar_dataset(self, resultado):
+        """Añade a la sesión un resultado de leer_csv y lo marca como actual"""
+        nombre = resultado['nombre']
+        self.dataframes.protegido = nombre
+        entrada = self.dataframes.agregar(resultado)
+        self._version_datos += 1
+        entrada.version = self._version_datos
+        self.filtro = {}
+        self.seleccionar_dataset(nombre)
+        self.panel.agregar(entrada)
+        self._datos_cambiados(nombre)
+
+    @staticmethod
+    def mensaje_carga(resultado):
+        """Texto descriptivo de una carga (tipo, registros, encoding y tiempos)"""
+        tipo_csv = resultado['tipo']
+        info_carga = resultado['carga']
+        df = resultado['df']
+
+        tipo_str = "Evaluación" if tipo_csv == TipoCSV.EVALUACION else \
+                  "Competencias Básicas" if tipo_csv == TipoCSV.COMPETENCIAS else \
+                  "Desconocido"
 
-        # Buscar indicadores de CSV de Evaluación
-        tiene_consecuencias = any('conseq' in col.lower() and 'avalua' in col.lower()
-                                 for col in columnas)
-        tiene_aula_acollida = any('aula' in col.lower() and 'acollida' in col.lower()
-                                 for col in columnas)
+        if info_carga['agregado']:
+            registros = (f"{info_carga['filas_originales']:,} registros agregados en "
+                         f"{len(df):,} combinaciones (modo streaming)")
+        else:
+            registros = f"{len(df)} registros"
 
-        # Buscar indicadores de CSV de Competencias
-        tiene_catala_mitjana = any('catal' in col.lower() and 'mitjana' in col.lower()
-                                   for col in columnas)
-        tiene_castella_mitjana = any('castell' in col.lower() and 'mitjana' in col.lower()
-                                     for col in columnas)
+        origen = "caché" if info_carga.get('cache') else "lectura"
+        mensaje = (f"Archivo cargado ({tipo_str}): {registros}\n"
+                   f"Encoding: {info_carga['encoding']} (detección {info_carga['tiempo_deteccion']*1000:.1f} ms, "
+                   f"{origen} {info_carga['tiempo_lectura']*1000:.1f} ms)\n"
+                   f"Memoria: {info_carga['memoria_bytes'] / 1024**2:.1f} MB")
 
-        if tiene_consecuencias or tiene_aula_acollida:
-            return TipoCSV.EVALUACION
-        elif tiene_catala_mitjana or tiene_castella_mitjana:
-            return TipoCSV.COMPETENCIAS
-        else:
-            return TipoCSV.DESCONOCIDO
+        no_convertidos = info_carga.get('no_convertidos', {})
+        if no_convertidos:
+            detalle = ", ".join(f"{col}: {n}" for col, n in no_convertidos.items())
+            mensaje += f"\nValores no numéricos descartados: {detalle}"
+        return mensaje
+
+    def cargar_csv(self, ruta_archivo, streaming=None):
+        """Carga un archivo CSV con detección automática de encoding y tipo
 
-    def cargar_csv(self, ruta_archivo):
-        """Carga un archivo CSV con detección automática de tipo"""
+        Args:
+            streaming: Ver leer_csv
+        """
         try:
-            # Intentar con diferentes encodings
-            for encoding in ['latin-1', 'utf-8', 'cp1252']:
-                try:
-                    df = pd.read_csv(ruta_archivo, sep=';', encoding=encoding)
-                    nombre = Path(ruta_archivo).stem
+            resultado = leer_csv(ruta_archivo, streaming, self.cache)
+            self.registrar_dataset(resultado)
+            return True, self.mensaje_carga(resultado)
+        except Exception as e:
+            return False, f"Error al cargar archivo: {str(e)}"
 
-                    # Detectar tipo de CSV
-                    tipo_csv = self.detectar_tipo_csv(df)
+    def cargar_multiples_csv(self, rutas, max_procesos=None, streaming=None):
+        """Carga varios CSV en paralelo en un pool de procesos
 
-                    self.dataframes[nombre] = {'df': df, 'tipo': tipo_csv}
-                    self.df_actual = df
-                    self.nombre_archivo_actual = nombre
-                    self.tipo_csv_actual = tipo_csv
+        Los archivos se parsean a la vez, pero se registran en el orden de
+        `rutas`, de modo que el resultado no depende de cuál termina antes.
+        Un archivo defectuoso no impide cargar los demás. Cada .zip aporta
+        todos los CSV que contiene (ver expandir_rutas).
 
-                    tipo_str = "Evaluación" if tipo_csv == TipoCSV.EVALUACION else \
-                              "Competencias Básicas" if tipo_csv == TipoCSV.COMPETENCIAS else \
-                              "Desconocido"
+        Returns:
+            Lista (en el orden de `rutas`) de dicts con 'ruta', 'nombre',
+            'exito', 'mensaje' y 'tiempo' (segundos de lectura del archivo)
+        """
+        return self.registrar_lecturas(self.leer_multiples_csv(rutas, max_procesos, streaming))
 
-                    return True, f"Archivo cargado ({tipo_str}): {len(df)} registros"
-                except UnicodeDecodeError:
-                    continue
-            return False, "Error: No se pudo decodificar el archivo"
-        except Exception as e:
-            return False, f"Error al cargar archivo: {str(e)}"
+    def leer_multiples_csv(self, rutas, max_procesos=None, streaming=None):
+        """Parsea varios CSV en paralelo sin registrarlos (ver cargar_multiples_csv)
+
+        No modifica el analizador, así que puede ejecutarse fuera del hilo
+        de la interfaz.
+
+        Returns:
+            Lista de (ruta, exito, resultado de leer_csv o mensaje de error, tiempo)
+        """
+        rutas = expandir_rutas(rutas)
+        if not rutas:
+            return []
+
+        resultados = None
+        if len(rutas) > 1:
+            max_procesos = max_procesos or min(len(rutas), os.cpu_count() or 1)
+            try:
+                with ProcessPoolExecutor(max_workers=max_procesos) as pool:
+                    futuros = [pool.submit(_leer_csv_en_proceso, ruta, streaming, self.cache) for ruta in rutas]
+                    resultados = [futuro.result() for futuro in futuros]
+            except Exception:
+                # Entornos sin soporte de multiproceso: carga secuencial
+                resultados = None
+
+        if resultados is None:
+            resultados = [_leer_csv_en_proceso(ruta, streaming, self.cache) for ruta in rutas]
+
+        return [(ruta, exito, resultado, tiempo) for ruta, (exito, resultado, tiempo) in zip(rutas, resultados)]
+
+    def registrar_lecturas(self, lecturas):
+        """Registra, en orden, las lecturas correctas de leer_multiples_csv y devuelve el informe"""
+        informe = []
+        for ruta, exito, resultado, tiempo in lecturas:
+            if exito:
+                self.registrar_dataset(resultado)
+                mensaje = self.mensaje_carga(resultado)
+            else:
+                mensaje = f"Error al cargar archivo: {resultado}"
+            informe.append({
+                'ruta': ruta,
+                'nombre': nombre_fuente(ruta),
+                'exito': exito,
+                'mensaje': mensaje,
+                'tiempo': tiempo
+            })
+        return informe
+
+    def purgar_cache(self):
+        """Vacía la caché en disco y devuelve los bytes liberados"""
+        if self.cache is None:
+            return 0
+        return self.cache.purgar()
 
+    @memorizar
     def obtener_estadisticas_basicas(self):
         """Obtiene estadísticas básicas del dataframe actual"""
         if self.df_actual is None:
             return None
 
+        info_carga = self.dataframes.get(self.nombre_archivo_actual, {}).get('carga', {})
+
+        if self.filtro:
+            total_registros = int(self.df_actual[COL_REGISTROS_AGREGADOS].sum()) \
+                if COL_REGISTROS_AGREGADOS in self.df_actual.columns else len(self.df_actual)
+        else:
+            total_registros = info_carga.get('filas_originales', len(self.df_actual))
+
         stats = {
-            'total_registros': len(self.df_actual),
-            'columnas': list(self.df_actual.columns),
+            'total_registros': total_registros,
+            'columnas': columnas_visibles(self.df_actual),
             'valores_unicos': {col: self.df_actual[col].nunique()
-                              for col in self.df_actual.columns},
-            'tipo_csv': self.tipo_csv_actual
+                              for col in columnas_visibles(self.df_actual)},
+            'tipo_csv': self.tipo_csv_actual,
+            'agregado': info_carga.get('agregado', False),
+            'filas_agregadas': len(self.df_actual)
         }
         return stats
 
     def buscar_columna(self, patrones):
-        """Busca una columna que coincida con los patrones dados"""
+        """Busca una columna que coincida con los patrones dados
+
+        Para los campos de CAMPOS es preferible columna(), que no recorre
+        las columnas en cada llamada.
+        """
         if self.df_actual is None:
             return None
 
-        for col in self.df_actual.columns:
-            if all(patron.lower() in col.lower() for patron in patrones):
-                return col
-        return None
+        return buscar_columna_en(self.df_actual.columns, patrones)
+
+    def columna(self, campo):
+        """Nombre de la columna del campo lógico en el dataset actual (o None)"""
+        return self.campos_actual.get(campo)
+
+    def cubo(self, *dimensiones):
+        """Cubo de agregados del dataset actual sobre esos campos (ver EntradaDataset.cubo)
+
+        Sin argumentos devuelve el cubo con todas las DIMENSIONES_CUBO. Es
+        None si el dataset actual no es de evaluación. Con un filtro activo,
+        el filtro se aplica sobre el cubo (sus campos son dimensiones del
+        cubo) en lugar de sobre las filas.
+        """
+        if self.df_actual is None or self.nombre_archivo_actual not in self.dataframes:
+            return None
+        entrada = self.dataframes[self.nombre_archivo_actual]
+        dimensiones = tuple(dimensiones or DIMENSIONES_CUBO)
+        if not self.filtro:
+            return entrada.cubo(dimensiones)
+        cubo = entrada.cubo(dimensiones + tuple(self.filtro))
+        if cubo is None:
+            return None
+        return construir_cubo(cubo[mascara_filtro(cubo, self.campos_actual, self.filtro)],
+                              self.campos_actual, dimensiones)
+
+    def filas_centro(self, codigo_centro):
+        """Filas del dataset actual de un centro, a través del índice de centros (o None)"""
+        if self.df_actual is None or self.nombre_archivo_actual not in self.dataframes:
+            return None
+        entrada = self.dataframes[self.nombre_archivo_actual]
+        indice = entrada.indice_centros()
+        if indice is None or codigo_centro not in indice:
+            return None
+        posiciones = indice[codigo_centro]
+        if self._mascara_actual is not None:
+            posiciones = posiciones[self._mascara_actual[posiciones]]
+            if len(posiciones) == 0:
+                return None
+        return entrada.df.take(posiciones)
 
     # ========== MÉTODOS PARA CSV DE EVALUACIÓN ==========
 
+    @memorizar
     def obtener_resumen_por_nivel_evaluacion(self):
         """Obtiene resumen de evaluaciones por nivel"""
-        if self.df_actual is None or 'Nivell' not in self.df_actual.columns:
+        col_nivel = self.columna('nivel')
+        if self.df_actual is None or col_nivel is None:
             return None
 
-        col_numero = self.buscar_columna(['mero', 'Avalua'])
+        col_numero = self.columna('numero')
         if col_numero is None:
             return None
 
-        resumen = self.df_actual.groupby('Nivell')[col_numero].sum()
+        resumen = self.cubo('nivel').groupby(col_nivel, observed=True)[col_numero].sum()
         return resumen
 
+    @memorizar
     def obtener_resumen_por_consecuencia(self):
         """Obtiene resumen por consecuencias de evaluación"""
         if self.df_actual is None:
             return None
 
-        col_consecuencias = self.buscar_columna(['Conseq', 'Avalua'])
-        col_numero = self.buscar_columna(['mero', 'Avalua'])
+        col_consecuencias = self.columna('consecuencias')
+        col_numero = self.columna('numero')
 
         if col_consecuencias is None or col_numero is None:
             return None
 
-        resumen = self.df_actual.groupby(col_consecuencias)[col_numero].sum()
+        resumen = self.cubo('consecuencias').groupby(col_consecuencias, observed=True)[col_numero].sum()
         return resumen
 
+    @memorizar
     def obtener_estadisticas_aulas_acollida(self):
         """Obtiene estadísticas de estudiantes en Aulas de Acogida"""
         if self.df_actual is None:
             return None
 
-        col_aula_acollida = self.buscar_columna(['Aula', 'acollida'])
-        col_numero = self.buscar_columna(['mero', 'Avalua'])
+        col_aula_acollida = self.columna('aula_acollida')
+        col_numero = self.columna('numero')
 
         if col_aula_acollida is None or col_numero is None:
             return None
 
         stats = {}
+        cubo = self.cubo('aula_acollida', 'nivel', 'consecuencias', 'resultado')
 
         # Total por aula de acogida (Sí/No)
-        resumen_aula = self.df_actual.groupby(col_aula_acollida)[col_numero].sum()
+        resumen_aula = cubo.groupby(col_aula_acollida, observed=True)[col_numero].sum()
         stats['por_aula_acollida'] = resumen_aula
 
         # Filtrar estudiantes en aula de acogida
-        df_acollida = self.df_actual[
-            self.df_actual[col_aula_acollida].str.contains('S', na=False, case=False)
-        ]
+        df_acollida = cubo[mascara_etiqueta(cubo[col_aula_acollida], 'S')]
 
         if len(df_acollida) > 0:
             total_acollida = df_acollida[col_numero].sum()
-            total_general = self.df_actual[col_numero].sum()
+            total_general = cubo[col_numero].sum()
 
             stats['total_acollida'] = total_acollida
             stats['porcentaje_acollida'] = (total_acollida / total_general * 100) if total_general > 0 else 0
 
             # Por nivel
-            if 'Nivell' in df_acollida.columns:
-                stats['por_nivel'] = df_acollida.groupby('Nivell')[col_numero].sum()
+            col_nivel = self.columna('nivel')
+            if col_nivel:
+                stats['por_nivel'] = df_acollida.groupby(col_nivel, observed=True)[col_numero].sum()
 
             # Por consecuencias
-            col_consecuencias = self.buscar_columna(['Conseq', 'Avalua'])
+            col_consecuencias = self.columna('consecuencias')
             if col_consecuencias:
-                stats['por_consecuencias'] = df_acollida.groupby(col_consecuencias)[col_numero].sum()
+                stats['por_consecuencias'] = df_acollida.groupby(col_consecuencias, observed=True)[col_numero].sum()
 
                 # Calcular tasa de promoción en aula de acogida
-                promovidos = df_acollida[
-                    df_acollida[col_consecuencias].str.contains('Promociona', na=False)
-                ][col_numero].sum()
+                promovidos = totales_por_resultado(df_acollida, col_numero)[ResultadoEvaluacion.PROMOCIONA.value]
                 stats['tasa_promocion_acollida'] = (promovidos / total_acollida * 100) if total_acollida > 0 else 0
 
         return stats if stats else None
 
+    @memorizar
     def obtener_analisis_detallado_aulas_acollida(self):
         """Obtiene análisis detallado de estudiantes en aulas de acogida:
         nivel, nacionalidad y consecuencias de evaluación"""
         if self.df_actual is None:
             return None
 
-        col_aula = self.buscar_columna(['Aula', 'acollida'])
-        col_numero = self.buscar_columna(['mero', 'Avalua'])
-        col_nacionalidad = self.buscar_columna(['Zona', 'Nacionalitat'])
-        col_nivel = 'Nivell'
-        col_consecuencias = self.buscar_columna(['Conseq', 'Avalua'])
+        col_aula = self.columna('aula_acollida')
+        col_numero = self.columna('numero')
+        col_nacionalidad = self.columna('nacionalidad')
+        col_nivel = self.columna('nivel')
+        col_consecuencias = self.columna('consecuencias')
 
         if col_aula is None or col_numero is None:
             return None
 
         # Filtrar solo estudiantes en aulas de acogida
-        df_acollida = self.df_actual[
-            self.df_actual[col_aula].str.contains('S', na=False, case=False)
-        ]
+        cubo = self.cubo('aula_acollida', 'nivel', 'nacionalidad', 'consecuencias', 'resultado')
+        df_acollida = cubo[mascara_etiqueta(cubo[col_aula], 'S')]
 
         if len(df_acollida) == 0:
             return None
@@ -213,35 +2035,19 @@ class AnalizadorEducativo:
 
         # 1. Análisis por nivel
         if col_nivel in df_acollida.columns:
-            resultado['por_nivel'] = df_acollida.groupby(col_nivel)[col_numero].sum().sort_index()
+            resultado['por_nivel'] = df_acollida.groupby(col_nivel, observed=True)[col_numero].sum().sort_index()
 
         # 2. Análisis por nacionalidad
         if col_nacionalidad:
-            resultado['por_nacionalidad'] = df_acollida.groupby(col_nacionalidad)[col_numero].sum().sort_values(ascending=False)
+            resultado['por_nacionalidad'] = df_acollida.groupby(col_nacionalidad, observed=True)[col_numero].sum().sort_values(ascending=False)
 
         # 3. Análisis por consecuencias (promocionan o no)
         if col_consecuencias:
-            resultado['por_consecuencias'] = df_acollida.groupby(col_consecuencias)[col_numero].sum().sort_values(ascending=False)
-
-            # Clasificar en promocionan vs no promocionan
-            # En catalán: "Accedeix", "Obté el títol", "Passa de curs" = promociona
-            # Pero NO "Roman" (permanece), "No passa", "No obté", "No accedeix"
-
-            # Filtrar promocionados (incluir los que pasan)
-            patron_promocion = r'Accedeix al curs següent|Passa de curs|Obté el títol'
+            resultado['por_consecuencias'] = df_acollida.groupby(col_consecuencias, observed=True)[col_numero].sum().sort_values(ascending=False)
 
-            # Filtrar NO promocionados (excluir explícitamente)
-            patron_no_promocion = r'Roman|No passa|No obté|No accedeix'
-
-            promovidos = df_acollida[
-                (df_acollida[col_consecuencias].str.contains(patron_promocion, na=False, case=False, regex=True)) &
-                (~df_acollida[col_consecuencias].str.contains(patron_no_promocion, na=False, case=False, regex=True))
-            ][col_numero].sum()
-
-            no_promovidos = df_acollida[
-                (~df_acollida[col_consecuencias].str.contains(patron_promocion, na=False, case=False, regex=True)) |
-                (df_acollida[col_consecuencias].str.contains(patron_no_promocion, na=False, case=False, regex=True))
-            ][col_numero].sum()
+            # Clasificar en promocionan vs no promocionan (ver ResultadoEvaluacion)
+            promovidos = totales_por_resultado(df_acollida, col_numero)[ResultadoEvaluacion.PROMOCIONA.value]
+            no_promovidos = df_acollida[col_numero].sum() - promovidos
 
             resultado['resumen_promocion'] = {
                 'promocionan': promovidos,
@@ -251,34 +2057,62 @@ class AnalizadorEducativo:
 
         # 4. Análisis cruzado: nivel x nacionalidad
         if col_nivel in df_acollida.columns and col_nacionalidad:
-            nivel_nacionalidad = df_acollida.groupby([col_nivel, col_nacionalidad])[col_numero].sum()
+            nivel_nacionalidad = df_acollida.groupby([col_nivel, col_nacionalidad], observed=True)[col_numero].sum()
             resultado['nivel_x_nacionalidad'] = nivel_nacionalidad
 
         # 5. Análisis cruzado: nacionalidad x consecuencias
         if col_nacionalidad and col_consecuencias:
-            nac_consec = df_acollida.groupby([col_nacionalidad, col_consecuencias])[col_numero].sum()
+            nac_consec = df_acollida.groupby([col_nacionalidad, col_consecuencias], observed=True)[col_numero].sum()
             resultado['nacionalidad_x_consecuencias'] = nac_consec
 
+            # Promoción por nacionalidad: total con consecuencia conocida y promocionados
+            por_resultado = totales_por_resultado(df_acollida, col_numero, por=col_nacionalidad)
+            promocion_nacionalidad = pd.DataFrame({
+                'total': por_resultado.sum(axis=1),
+                'promocionan': por_resultado[ResultadoEvaluacion.PROMOCIONA.value]
+            })
+            promocion_nacionalidad['tasa'] = (promocion_nacionalidad['promocionan']
+                                              / promocion_nacionalidad['total'].where(promocion_nacionalidad['total'] > 0)
+                                              * 100).fillna(0)
+            resultado['promocion_por_nacionalidad'] = promocion_nacionalidad
+
         # 6. Total de estudiantes
         resultado['total_estudiantes'] = df_acollida[col_numero].sum()
 
         return resultado
 
+    @memorizar
+    def obtener_centros_aulas_acollida(self):
+        """Estudiantes en aulas de acogida por centro, de mayor a menor, o None
+
+        Sale del cubo por centro y aula de acogida, así que respeta el filtro activo.
+        """
+        col_centro = self.columna('centro')
+        col_aula = self.columna('aula_acollida')
+        col_numero = self.columna('numero')
+        if self.df_actual is None or col_centro is None or col_aula is None or col_numero is None:
+            return None
+
+        cubo = self.cubo('centro', 'aula_acollida')
+        if cubo is None:
+            return None
+        df_acollida = cubo[mascara_etiqueta(cubo[col_aula], 'S')]
+        return df_acollida.groupby(col_centro, observed=True)[col_numero].sum().sort_values(ascending=False)
+
+    @memorizar
     def obtener_estadisticas_sudamerica(self):
         """Obtiene estadísticas específicas de CENTRE I SUDAMÈRICA"""
         if self.df_actual is None:
             return None
 
-        col_nacionalidad = self.buscar_columna(['Zona', 'Nacionalitat'])
-        col_numero = self.buscar_columna(['mero', 'Avalua'])
+        col_nacionalidad = self.columna('nacionalidad')
+        col_numero = self.columna('numero')
 
         if col_nacionalidad is None or col_numero is None:
             return None
 
         # Filtrar por CENTRE I SUDAMERICA (buscar variantes)
-        df_sudamerica = self.df_actual[
-            self.df_actual[col_nacionalidad].str.contains('CENTRE I SUDAM', na=False, case=False)
-        ]
+        df_sudamerica = self.df_actual[mascara_etiqueta(self.df_actual[col_nacionalidad], PATRON_SUDAMERICA)]
 
         if len(df_sudamerica) == 0:
             return None
@@ -289,49 +2123,40 @@ class AnalizadorEducativo:
         }
 
         # Por nivel
-        if 'Nivell' in df_sudamerica.columns:
-            stats['por_nivel'] = df_sudamerica.groupby('Nivell')[col_numero].sum()
+        col_nivel = self.columna('nivel')
+        if col_nivel:
+            stats['por_nivel'] = df_sudamerica.groupby(col_nivel, observed=True)[col_numero].sum()
 
         # Por consecuencias
-        col_consecuencias = self.buscar_columna(['Conseq', 'Avalua'])
+        col_consecuencias = self.columna('consecuencias')
         if col_consecuencias:
-            stats['por_consecuencias'] = df_sudamerica.groupby(col_consecuencias)[col_numero].sum()
+            stats['por_consecuencias'] = df_sudamerica.groupby(col_consecuencias, observed=True)[col_numero].sum()
 
             # Calcular tasa de promoción
             # En catalán: "Accedeix", "Obté el títol", "Passa de curs" = promociona
             # Pero NO "Roman" (permanece), "No passa", "No obté", "No accedeix"
             total_sudamerica = df_sudamerica[col_numero].sum()
 
-            # Filtrar promocionados (incluir los que pasan)
-            patron_promocion = r'Accedeix al curs següent|Passa de curs|Obté el títol'
-
-            # Filtrar NO promocionados (excluir explícitamente)
-            patron_no_promocion = r'Roman|No passa|No obté|No accedeix'
-
-            promovidos = df_sudamerica[
-                (df_sudamerica[col_consecuencias].str.contains(patron_promocion, na=False, case=False, regex=True)) &
-                (~df_sudamerica[col_consecuencias].str.contains(patron_no_promocion, na=False, case=False, regex=True))
-            ][col_numero].sum()
+            promovidos = totales_por_resultado(df_sudamerica, col_numero)[ResultadoEvaluacion.PROMOCIONA.value]
 
             stats['tasa_promocion'] = (promovidos / total_sudamerica * 100) if total_sudamerica > 0 else 0
 
         return stats
 
+    @memorizar
     def obtener_estadisticas_espana(self):
         """Obtiene estadísticas específicas de estudiantes de ESPAÑA (nativos)"""
         if self.df_actual is None:
             return None
 
-        col_nacionalidad = self.buscar_columna(['Zona', 'Nacionalitat'])
-        col_numero = self.buscar_columna(['mero', 'Avalua'])
+        col_grupo = self.columna('grupo_nacionalidad')
+        col_numero = self.columna('numero')
 
-        if col_nacionalidad is None or col_numero is None:
+        if col_grupo is None or col_numero is None:
             return None
 
         # Filtrar por ESPAÑA (ESPANYA)
-        df_espana = self.df_actual[
-            self.df_actual[col_nacionalidad].str.contains('ESPAN', na=False, case=False)
-        ]
+        df_espana = self.df_actual[mascara_grupo(self.df_actual, GRUPO_LOCAL)]
 
         if len(df_espana) == 0:
             return None
@@ -342,32 +2167,44 @@ class AnalizadorEducativo:
         }
 
         # Por nivel
-        if 'Nivell' in df_espana.columns:
-            stats['por_nivel'] = df_espana.groupby('Nivell')[col_numero].sum()
+        col_nivel = self.columna('nivel')
+        if col_nivel:
+            stats['por_nivel'] = df_espana.groupby(col_nivel, observed=True)[col_numero].sum()
 
         # Por consecuencias
-        col_consecuencias = self.buscar_columna(['Conseq', 'Avalua'])
+        col_consecuencias = self.columna('consecuencias')
         if col_consecuencias:
-            stats['por_consecuencias'] = df_espana.groupby(col_consecuencias)[col_numero].sum()
+            stats['por_consecuencias'] = df_espana.groupby(col_consecuencias, observed=True)[col_numero].sum()
 
             # Calcular tasa de promoción
             total_espana = df_espana[col_numero].sum()
 
-            # Filtrar promocionados (incluir los que pasan)
-            patron_promocion = r'Accedeix al curs següent|Passa de curs|Obté el títol'
-
-            # Filtrar NO promocionados (excluir explícitamente)
-            patron_no_promocion = r'Roman|No passa|No obté|No accedeix'
-
-            promovidos = df_espana[
-                (df_espana[col_consecuencias].str.contains(patron_promocion, na=False, case=False, regex=True)) &
-                (~df_espana[col_consecuencias].str.contains(patron_no_promocion, na=False, case=False, regex=True))
-            ][col_numero].sum()
+            promovidos = totales_por_resultado(df_espana, col_numero)[ResultadoEvaluacion.PROMOCIONA.value]
 
             stats['tasa_promocion'] = (promovidos / total_espana * 100) if total_espana > 0 else 0
 
         return stats
 
+    @memorizar
+    def obtener_tabla_competencias(self, por='nacionalidad', por_nivel=True):
+        """Tabla de competencias por grupo, nivel y lengua (ver tabla_competencias)
+
+        Args:
+            por: Campo lógico que define los grupos (p. ej. 'nacionalidad' o
+                'grupo_nacionalidad'); None para todo el dataset
+            por_nivel: Si es True, separa además por nivel
+        """
+        if self.df_actual is None:
+            return None
+        grupos = None
+        if por is not None:
+            col_grupo = self.columna(por)
+            if col_grupo is None:
+                return None
+            grupos = self.df_actual[col_grupo]
+        return tabla_competencias(self.df_actual, self.campos_actual, grupos, por_nivel)
+
+    @memorizar
     def obtener_competencias_sudamerica(self, por_nivel=False):
         """Obtiene competencias específicas de CENTRE I SUDAMÈRICA
 
@@ -377,320 +2214,54 @@ class AnalizadorEducativo:
         if self.df_actual is None:
             return None
 
-        col_nacionalidad = self.buscar_columna(['Zona', 'nacionalitat'])
+        col_nacionalidad = self.columna('nacionalidad')
         if col_nacionalidad is None:
             return None
 
-        # Filtrar por CENTRE I SUDAMERICA
-        df_sudamerica = self.df_actual[
-            self.df_actual[col_nacionalidad].str.contains('CENTRE I SUDAM', na=False, case=False)
-        ]
-
-        if len(df_sudamerica) == 0:
-            return None
-
-        if por_nivel and 'Nivell' in df_sudamerica.columns:
-            # Devolver estadísticas separadas por nivel
-            stats_por_nivel = {}
-
-            for nivel in sorted(df_sudamerica['Nivell'].unique()):
-                df_nivel = df_sudamerica[df_sudamerica['Nivell'] == nivel]
-                stats = {}
-
-                # Català
-                col_num_cat = self.buscar_columna(['mero', 'alumnes', 'Catal'])
-                col_mit_cat = self.buscar_columna(['Catal', 'mitjana'])
-
-                if col_num_cat and col_mit_cat:
-                    mitjana_cat_num = pd.to_numeric(df_nivel[col_mit_cat], errors='coerce')
-                    num_cat_num = pd.to_numeric(df_nivel[col_num_cat], errors='coerce')
-
-                    # Filtrar valores válidos (no NaN) para calcular media ponderada
-                    df_validos = df_nivel[[col_num_cat, col_mit_cat]].copy()
-                    df_validos['num'] = num_cat_num
-                    df_validos['mit'] = mitjana_cat_num
-                    df_validos = df_validos.dropna(subset=['num', 'mit'])
-
-                    if len(df_validos) > 0:
-                        # Media ponderada: sum(num_alumnos * media) / sum(num_alumnos)
-                        media_ponderada = (df_validos['num'] * df_validos['mit']).sum() / df_validos['num'].sum()
-                        stats['Català'] = {
-                            'total_alumnos': num_cat_num.sum(),
-                            'media': media_ponderada,
-                            'mediana': mitjana_cat_num.median()
-                        }
-                    else:
-                        stats['Català'] = {
-                            'total_alumnos': num_cat_num.sum(),
-                            'media': None,
-                            'mediana': None
-                        }
-
-                # Castellà
-                col_num_cas = self.buscar_columna(['mero', 'alumnes', 'Castell'])
-                col_mit_cas = self.buscar_columna(['Castell', 'mitjana'])
-
-                if col_num_cas and col_mit_cas:
-                    mitjana_cas_num = pd.to_numeric(df_nivel[col_mit_cas], errors='coerce')
-                    num_cas_num = pd.to_numeric(df_nivel[col_num_cas], errors='coerce')
-
-                    # Filtrar valores válidos (no NaN) para calcular media ponderada
-                    df_validos = df_nivel[[col_num_cas, col_mit_cas]].copy()
-                    df_validos['num'] = num_cas_num
-                    df_validos['mit'] = mitjana_cas_num
-                    df_validos = df_validos.dropna(subset=['num', 'mit'])
-
-                    if len(df_validos) > 0:
-                        # Media ponderada: sum(num_alumnos * media) / sum(num_alumnos)
-                        media_ponderada = (df_validos['num'] * df_validos['mit']).sum() / df_validos['num'].sum()
-                        stats['Castellà'] = {
-                            'total_alumnos': num_cas_num.sum(),
-                            'media': media_ponderada,
-                            'mediana': mitjana_cas_num.median()
-                        }
-                    else:
-                        stats['Castellà'] = {
-                            'total_alumnos': num_cas_num.sum(),
-                            'media': None,
-                            'mediana': None
-                        }
-
-                if stats:
-                    stats_por_nivel[nivel] = stats
-
-            return stats_por_nivel if stats_por_nivel else None
-
-        else:
-            # Devolver estadísticas globales (comportamiento original)
-            stats = {}
-
-            # Català
-            col_num_cat = self.buscar_columna(['mero', 'alumnes', 'Catal'])
-            col_mit_cat = self.buscar_columna(['Catal', 'mitjana'])
-
-            if col_num_cat and col_mit_cat:
-                mitjana_cat_num = pd.to_numeric(df_sudamerica[col_mit_cat], errors='coerce')
-                num_cat_num = pd.to_numeric(df_sudamerica[col_num_cat], errors='coerce')
-
-                # Filtrar valores válidos (no NaN) para calcular media ponderada
-                df_validos = df_sudamerica[[col_num_cat, col_mit_cat]].copy()
-                df_validos['num'] = num_cat_num
-                df_validos['mit'] = mitjana_cat_num
-                df_validos = df_validos.dropna(subset=['num', 'mit'])
-
-                if len(df_validos) > 0:
-                    # Media ponderada: sum(num_alumnos * media) / sum(num_alumnos)
-                    media_ponderada = (df_validos['num'] * df_validos['mit']).sum() / df_validos['num'].sum()
-                    stats['Català'] = {
-                        'total_alumnos': num_cat_num.sum(),
-                        'media': media_ponderada,
-                        'mediana': mitjana_cat_num.median()
-                    }
-
-            # Castellà
-            col_num_cas = self.buscar_columna(['mero', 'alumnes', 'Castell'])
-            col_mit_cas = self.buscar_columna(['Castell', 'mitjana'])
-
-            if col_num_cas and col_mit_cas:
-                mitjana_cas_num = pd.to_numeric(df_sudamerica[col_mit_cas], errors='coerce')
-                num_cas_num = pd.to_numeric(df_sudamerica[col_num_cas], errors='coerce')
-
-                # Filtrar valores válidos (no NaN) para calcular media ponderada
-                df_validos = df_sudamerica[[col_num_cas, col_mit_cas]].copy()
-                df_validos['num'] = num_cas_num
-                df_validos['mit'] = mitjana_cas_num
-                df_validos = df_validos.dropna(subset=['num', 'mit'])
-
-                if len(df_validos) > 0:
-                    # Media ponderada: sum(num_alumnos * media) / sum(num_alumnos)
-                    media_ponderada = (df_validos['num'] * df_validos['mit']).sum() / df_validos['num'].sum()
-                    stats['Castellà'] = {
-                        'total_alumnos': num_cas_num.sum(),
-                        'media': media_ponderada,
-                        'mediana': mitjana_cas_num.median()
-                    }
-
-            return stats if stats else None
+        # Un solo grupo (True) con las filas de CENTRE I SUDAMERICA
+        en_sudamerica = mascara_etiqueta(self.df_actual[col_nacionalidad], PATRON_SUDAMERICA)
+        tabla = tabla_competencias(self.df_actual, self.campos_actual, en_sudamerica, por_nivel)
+        return vista_competencias(tabla, True, por_nivel)
 
+    @memorizar
     def obtener_competencias_espana(self, por_nivel=False):
         """Obtiene competencias específicas de estudiantes de ESPAÑA
 
         Args:
             por_nivel: Si es True, devuelve estadísticas separadas por nivel
         """
-        if self.df_actual is None:
-            return None
-
-        col_nacionalidad = self.buscar_columna(['Zona', 'nacionalitat'])
-        if col_nacionalidad is None:
-            return None
-
-        # Filtrar por ESPAÑA (puede aparecer como ESPANYA, ESPAÑA, etc.)
-        df_espana = self.df_actual[
-            self.df_actual[col_nacionalidad].str.contains('ESPAN', na=False, case=False)
-        ]
-
-        if len(df_espana) == 0:
-            return None
-
-        if por_nivel and 'Nivell' in df_espana.columns:
-            # Devolver estadísticas separadas por nivel
-            stats_por_nivel = {}
-
-            for nivel in sorted(df_espana['Nivell'].unique()):
-                df_nivel = df_espana[df_espana['Nivell'] == nivel]
-                stats = {}
-
-                # Català
-                col_num_cat = self.buscar_columna(['mero', 'alumnes', 'Catal'])
-                col_mit_cat = self.buscar_columna(['Catal', 'mitjana'])
-
-                if col_num_cat and col_mit_cat:
-                    mitjana_cat_num = pd.to_numeric(df_nivel[col_mit_cat], errors='coerce')
-                    num_cat_num = pd.to_numeric(df_nivel[col_num_cat], errors='coerce')
-
-                    # Filtrar valores válidos (no NaN) para calcular media ponderada
-                    df_validos = df_nivel[[col_num_cat, col_mit_cat]].copy()
-                    df_validos['num'] = num_cat_num
-                    df_validos['mit'] = mitjana_cat_num
-                    df_validos = df_validos.dropna(subset=['num', 'mit'])
-
-                    if len(df_validos) > 0:
-                        # Media ponderada: sum(num_alumnos * media) / sum(num_alumnos)
-                        media_ponderada = (df_validos['num'] * df_validos['mit']).sum() / df_validos['num'].sum()
-                        stats['Català'] = {
-                            'total_alumnos': num_cat_num.sum(),
-                            'media': media_ponderada,
-                            'mediana': mitjana_cat_num.median()
-                        }
-                    else:
-                        stats['Català'] = {
-                            'total_alumnos': num_cat_num.sum(),
-                            'media': None,
-                            'mediana': None
-                        }
-
-                # Castellà
-                col_num_cas = self.buscar_columna(['mero', 'alumnes', 'Castell'])
-                col_mit_cas = self.buscar_columna(['Castell', 'mitjana'])
-
-                if col_num_cas and col_mit_cas:
-                    mitjana_cas_num = pd.to_numeric(df_nivel[col_mit_cas], errors='coerce')
-                    num_cas_num = pd.to_numeric(df_nivel[col_num_cas], errors='coerce')
-
-                    # Filtrar valores válidos (no NaN) para calcular media ponderada
-                    df_validos = df_nivel[[col_num_cas, col_mit_cas]].copy()
-                    df_validos['num'] = num_cas_num
-                    df_validos['mit'] = mitjana_cas_num
-                    df_validos = df_validos.dropna(subset=['num', 'mit'])
-
-                    if len(df_validos) > 0:
-                        # Media ponderada: sum(num_alumnos * media) / sum(num_alumnos)
-                        media_ponderada = (df_validos['num'] * df_validos['mit']).sum() / df_validos['num'].sum()
-                        stats['Castellà'] = {
-                            'total_alumnos': num_cas_num.sum(),
-                            'media': media_ponderada,
-                            'mediana': mitjana_cas_num.median()
-                        }
-                    else:
-                        stats['Castellà'] = {
-                            'total_alumnos': num_cas_num.sum(),
-                            'media': None,
-                            'mediana': None
-                        }
-
-                if stats:
-                    stats_por_nivel[nivel] = stats
-
-            return stats_por_nivel if stats_por_nivel else None
-
-        else:
-            # Devolver estadísticas globales (comportamiento original)
-            stats = {}
-
-            # Català
-            col_num_cat = self.buscar_columna(['mero', 'alumnes', 'Catal'])
-            col_mit_cat = self.buscar_columna(['Catal', 'mitjana'])
-
-            if col_num_cat and col_mit_cat:
-                mitjana_cat_num = pd.to_numeric(df_espana[col_mit_cat], errors='coerce')
-                num_cat_num = pd.to_numeric(df_espana[col_num_cat], errors='coerce')
-
-                # Filtrar valores válidos (no NaN) para calcular media ponderada
-                df_validos = df_espana[[col_num_cat, col_mit_cat]].copy()
-                df_validos['num'] = num_cat_num
-                df_validos['mit'] = mitjana_cat_num
-                df_validos = df_validos.dropna(subset=['num', 'mit'])
-
-                if len(df_validos) > 0:
-                    # Media ponderada: sum(num_alumnos * media) / sum(num_alumnos)
-                    media_ponderada = (df_validos['num'] * df_validos['mit']).sum() / df_validos['num'].sum()
-                    stats['Català'] = {
-                        'total_alumnos': num_cat_num.sum(),
-                        'media': media_ponderada,
-                        'mediana': mitjana_cat_num.median()
-                    }
-
-            # Castellà
-            col_num_cas = self.buscar_columna(['mero', 'alumnes', 'Castell'])
-            col_mit_cas = self.buscar_columna(['Castell', 'mitjana'])
-
-            if col_num_cas and col_mit_cas:
-                mitjana_cas_num = pd.to_numeric(df_espana[col_mit_cas], errors='coerce')
-                num_cas_num = pd.to_numeric(df_espana[col_num_cas], errors='coerce')
-
-                # Filtrar valores válidos (no NaN) para calcular media ponderada
-                df_validos = df_espana[[col_num_cas, col_mit_cas]].copy()
-                df_validos['num'] = num_cas_num
-                df_validos['mit'] = mitjana_cas_num
-                df_validos = df_validos.dropna(subset=['num', 'mit'])
-
-                if len(df_validos) > 0:
-                    # Media ponderada: sum(num_alumnos * media) / sum(num_alumnos)
-                    media_ponderada = (df_validos['num'] * df_validos['mit']).sum() / df_validos['num'].sum()
-                    stats['Castellà'] = {
-                        'total_alumnos': num_cas_num.sum(),
-                        'media': media_ponderada,
-                        'mediana': mitjana_cas_num.median()
-                    }
-
-            return stats if stats else None
+        tabla = self.obtener_tabla_competencias('grupo_nacionalidad', por_nivel)
+        return vista_competencias(tabla, GRUPO_LOCAL, por_nivel)
 
     # ========== MÉTODOS PARA CSV DE COMPETENCIAS ==========
 
+    @memorizar
     def obtener_resumen_por_nivel_competencias(self):
         """Obtiene resumen de competencias por nivel"""
-        if self.df_actual is None or 'Nivell' not in self.df_actual.columns:
+        col_nivel = self.columna('nivel')
+        if self.df_actual is None or col_nivel is None:
             return None
 
         resumen = {}
 
-        # Crear copia del dataframe para trabajar
-        df_trabajo = self.df_actual.copy()
+        # Las columnas numéricas ya vienen tipadas desde la carga
+        df_trabajo = self.df_actual
 
         # Buscar columnas de competencias
-        col_num_catala = self.buscar_columna(['mero', 'alumnes', 'Catal'])
-        col_mitjana_catala = self.buscar_columna(['Catal', 'mitjana'])
-        col_num_castella = self.buscar_columna(['mero', 'alumnes', 'Castell'])
-        col_mitjana_castella = self.buscar_columna(['Castell', 'mitjana'])
+        col_num_catala = self.columna('num_catala')
+        col_mitjana_catala = self.columna('mitjana_catala')
+        col_num_castella = self.columna('num_castella')
+        col_mitjana_castella = self.columna('mitjana_castella')
 
         if col_num_catala and col_mitjana_catala:
-            # Convertir a numérico (manejar comas decimales)
-            df_trabajo[col_num_catala] = pd.to_numeric(df_trabajo[col_num_catala], errors='coerce')
-            df_trabajo[col_mitjana_catala] = pd.to_numeric(df_trabajo[col_mitjana_catala], errors='coerce')
-
-            resumen_catala = df_trabajo.groupby('Nivell').agg({
+            resumen_catala = df_trabajo.groupby(col_nivel, observed=True).agg({
                 col_num_catala: 'sum',
                 col_mitjana_catala: 'mean'
             })
             resumen['Català'] = resumen_catala
 
         if col_num_castella and col_mitjana_castella:
-            # Convertir a numérico
-            df_trabajo[col_num_castella] = pd.to_numeric(df_trabajo[col_num_castella], errors='coerce')
-            df_trabajo[col_mitjana_castella] = pd.to_numeric(df_trabajo[col_mitjana_castella], errors='coerce')
-
-            resumen_castella = df_trabajo.groupby('Nivell').agg({
+            resumen_castella = df_trabajo.groupby(col_nivel, observed=True).agg({
                 col_num_castella: 'sum',
                 col_mitjana_castella: 'mean'
             })
@@ -698,6 +2269,7 @@ class AnalizadorEducativo:
 
         return resumen if resumen else None
 
+    @memorizar
     def obtener_estadisticas_competencias(self):
         """Obtiene estadísticas de competencias básicas"""
         if self.df_actual is None:
@@ -706,13 +2278,12 @@ class AnalizadorEducativo:
         stats = {}
 
         # Català
-        col_num_catala = self.buscar_columna(['mero', 'alumnes', 'Catal'])
-        col_mitjana_catala = self.buscar_columna(['Catal', 'mitjana'])
+        col_num_catala = self.columna('num_catala')
+        col_mitjana_catala = self.columna('mitjana_catala')
 
         if col_num_catala and col_mitjana_catala:
-            # Convertir a numérico (las columnas pueden venir como string)
-            mitjana_catala_num = pd.to_numeric(self.df_actual[col_mitjana_catala], errors='coerce')
-            num_catala_num = pd.to_numeric(self.df_actual[col_num_catala], errors='coerce')
+            mitjana_catala_num = self.df_actual[col_mitjana_catala]
+            num_catala_num = self.df_actual[col_num_catala]
 
             stats['Català'] = {
                 'total_alumnos': num_catala_num.sum(),
@@ -722,13 +2293,12 @@ class AnalizadorEducativo:
             }
 
         # Castellà
-        col_num_castella = self.buscar_columna(['mero', 'alumnes', 'Castell'])
-        col_mitjana_castella = self.buscar_columna(['Castell', 'mitjana'])
+        col_num_castella = self.columna('num_castella')
+        col_mitjana_castella = self.columna('mitjana_castella')
 
         if col_num_castella and col_mitjana_castella:
-            # Convertir a numérico
-            mitjana_castella_num = pd.to_numeric(self.df_actual[col_mitjana_castella], errors='coerce')
-            num_castella_num = pd.to_numeric(self.df_actual[col_num_castella], errors='coerce')
+            mitjana_castella_num = self.df_actual[col_mitjana_castella]
+            num_castella_num = self.df_actual[col_num_castella]
 
             stats['Castellà'] = {
                 'total_alumnos': num_castella_num.sum(),
@@ -739,28 +2309,42 @@ class AnalizadorEducativo:
 
         return stats if stats else None
 
+    @memorizar
+    def obtener_distribucion_notas(self, intervalos=20):
+        """Histograma de las notas medias por lengua: {lengua: (frecuencias, bordes)}, o None"""
+        if self.df_actual is None:
+            return None
+
+        distribucion = {}
+        for lengua, _, campo_media in LENGUAS_COMPETENCIAS:
+            col_media = self.columna(campo_media)
+            if col_media:
+                notas = self.df_actual[col_media].dropna().to_numpy()
+                distribucion[lengua] = np.histogram(notas, bins=intervalos)
+        return distribucion if distribucion else None
+
     # ========== MÉTODOS PARA ANÁLISIS DE DIVERSIDAD ====================
 
+    @memorizar
     def obtener_resumen_diversidad(self):
         """Obtiene resumen completo de diversidad"""
         if self.df_actual is None:
             return None
 
-        col_nacionalidad = self.buscar_columna(['Zona', 'Nacionalitat'])
-        col_numero = self.buscar_columna(['mero', 'Avalua'])
+        col_nacionalidad = self.columna('nacionalidad')
+        col_numero = self.columna('numero')
 
         if col_nacionalidad is None or col_numero is None:
             return None
 
         stats = {}
+        cubo = self.cubo('nacionalidad', 'grupo_nacionalidad')
 
         # Total general
-        stats['total_estudiantes'] = self.df_actual[col_numero].sum()
+        stats['total_estudiantes'] = cubo[col_numero].sum()
 
         # Españoles vs Extranjeros
-        df_espana = self.df_actual[
-            self.df_actual[col_nacionalidad].str.contains('ESPANYA', na=False, case=False)
-        ]
+        df_espana = cubo[mascara_grupo(cubo, GRUPO_LOCAL)]
         total_espana = df_espana[col_numero].sum()
         total_extranjeros = stats['total_estudiantes'] - total_espana
 
@@ -770,140 +2354,728 @@ class AnalizadorEducativo:
         stats['porcentaje_extranjeros'] = (total_extranjeros / stats['total_estudiantes'] * 100) if stats['total_estudiantes'] > 0 else 0
 
         # Top nacionalidades
-        resumen_nacionalidad = self.df_actual.groupby(col_nacionalidad)[col_numero].sum()
+        resumen_nacionalidad = cubo.groupby(col_nacionalidad, observed=True)[col_numero].sum()
         stats['top_nacionalidades'] = resumen_nacionalidad.sort_values(ascending=False)
 
         return stats
 
+    @memorizar
+    def obtener_diversidad_por_nivel(self, top_n=6):
+        """Estudiantes de las `top_n` nacionalidades más numerosas por nivel
+
+        Returns:
+            DataFrame con un nivel por fila y una nacionalidad por columna
+            (de más a menos estudiantes), o None si faltan columnas
+        """
+        col_nivel = self.columna('nivel')
+        col_nacionalidad = self.columna('nacionalidad')
+        col_numero = self.columna('numero')
+        if self.df_actual is None or col_nivel is None or col_nacionalidad is None or col_numero is None:
+            return None
+
+        cubo = self.cubo('nivel', 'nacionalidad')
+        top = self.obtener_resumen_diversidad()['top_nacionalidades'].head(top_n).index
+        niveles = sorted(cubo[col_nivel].dropna().unique())
+        tabla = cubo[cubo[col_nacionalidad].isin(top)].groupby(
+            [col_nivel, col_nacionalidad], observed=True)[col_numero].sum().unstack(fill_value=0)
+        return tabla.reindex(index=niveles, columns=top, fill_value=0)
+
+    @memorizar
     def obtener_comparativa_grupos(self):
         """Obtiene comparativa de rendimiento entre grupos culturales"""
         if self.df_actual is None:
             return None
 
-        col_nacionalidad = self.buscar_columna(['Zona', 'Nacionalitat'])
-        col_numero = self.buscar_columna(['mero', 'Avalua'])
-        col_consecuencias = self.buscar_columna(['Conseq', 'Avalua'])
+        col_grupo = self.columna('grupo_nacionalidad')
+        col_numero = self.columna('numero')
+        col_consecuencias = self.columna('consecuencias')
 
-        if col_nacionalidad is None or col_numero is None or col_consecuencias is None:
+        if col_grupo is None or col_numero is None or col_consecuencias is None:
             return None
 
-        # Definir grupos culturales
-        grupos = {
-            'ESPAÑA': ['ESPANYA'],
-            'MAGREB': ['MAGREB'],
-            'AMÉRICA': ['CENTRE I SUDAM', 'AMÈRICA'],
-            'EUROPA': ['RESTA UNIÓ EUROPEA', 'EUROPA'],
-            'ASIA/OCEANÍA': ['ÀSIA', 'OCEANIA'],
-            'RESTO ÁFRICA': ['RESTA ÀFRICA'],
-        }
-
         resultados = {}
 
-        for grupo, patrones in grupos.items():
-            # Filtrar por grupo
-            mascara = pd.Series([False] * len(self.df_actual))
-            for patron in patrones:
-                mascara |= self.df_actual[col_nacionalidad].str.contains(patron, na=False, case=False)
-
-            df_grupo = self.df_actual[mascara]
-
-            if len(df_grupo) > 0:
-                total = df_grupo[col_numero].sum()
-
-                # En catalán: "Accedeix", "Obté el títol", "Passa de curs" = promociona
-                # Pero NO "Roman" (permanece), "No passa", "No obté", "No accedeix"
-
-                # Filtrar promocionados (incluir los que pasan)
-                patron_promocion = r'Accedeix al curs següent|Passa de curs|Obté el títol'
+        # Grupos culturales definidos en GRUPOS_NACIONALIDAD: una sola
+        # agrupación por grupo y resultado (ver ResultadoEvaluacion)
+        totales = self.df_actual.groupby(col_grupo, observed=True)[col_numero].sum()
+        por_resultado = totales_por_resultado(self.df_actual, col_numero, por=col_grupo)
+
+        for grupo, total in totales.items():
+            if grupo == GRUPO_SIN_CLASIFICAR:
+                continue
+            promovidos = por_resultado.at[grupo, ResultadoEvaluacion.PROMOCIONA.value] \
+                if grupo in por_resultado.index else 0
+            repiten = por_resultado.at[grupo, ResultadoEvaluacion.REPITE.value] \
+                if grupo in por_resultado.index else 0
+
+            resultados[grupo] = {
+                'total': total,
+                'promovidos': promovidos,
+                'tasa_promocion': (promovidos / total * 100) if total > 0 else 0,
+                'repiten': repiten,
+                'tasa_repeticion': (repiten / total * 100) if total > 0 else 0
+            }
 
-                # Filtrar NO promocionados (excluir explícitamente)
-                patron_no_promocion = r'Roman|No passa|No obté|No accedeix'
+        return resultados if resultados else None
 
-                promovidos = df_grupo[
-                    (df_grupo[col_consecuencias].str.contains(patron_promocion, na=False, case=False, regex=True)) &
-                    (~df_grupo[col_consecuencias].str.contains(patron_no_promocion, na=False, case=False, regex=True))
-                ][col_numero].sum()
+    @memorizar
+    def obtener_ranking_centros(self, minimo_estudiantes=MINIMO_ESTUDIANTES_RANKING, top_n=None):
+        """Ranking de centros por porcentaje de alumnado extranjero
 
-                # Repiten: buscar "Roman", "Repeteix", "Repetir", "No passa"
-                repiten = df_grupo[
-                    df_grupo[col_consecuencias].str.contains('Roman|Repeteix|Repetir|No passa', na=False, case=False, regex=True)
-                ][col_numero].sum()
+        Totales y extranjeros de todos los centros salen de una sola
+        agrupación del cubo de agregados por centro y grupo de nacionalidad.
 
-                resultados[grupo] = {
-                    'total': total,
-                    'promovidos': promovidos,
-                    'tasa_promocion': (promovidos / total * 100) if total > 0 else 0,
-                    'repiten': repiten,
-                    'tasa_repeticion': (repiten / total * 100) if total > 0 else 0
-                }
+        Args:
+            minimo_estudiantes: Solo se incluyen centros con al menos estos estudiantes
+            top_n: Número de centros a devolver (None = todos)
 
-        return resultados if resultados else None
+        Returns:
+            DataFrame con 'centro', 'total', 'extranjeros' y 'porcentaje',
+            ordenado de mayor a menor porcentaje, o None si faltan columnas
+        """
+        col_centro = self.columna('centro')
+        col_numero = self.columna('numero')
+        if self.df_actual is None or col_centro is None or col_numero is None \
+                or self.columna('grupo_nacionalidad') is None:
+            return None
 
-    def obtener_analisis_por_centro(self, codigo_centro=None):
-        """Obtiene análisis por centro educativo"""
+        cubo = self.cubo('centro', 'grupo_nacionalidad')
+        totales = cubo.assign(
+            locales=cubo[col_numero].where(mascara_grupo(cubo, GRUPO_LOCAL), 0)
+        ).groupby(col_centro, sort=False)[[col_numero, 'locales']].sum()
+
+        ranking = pd.DataFrame({
+            'centro': totales.index,
+            'total': totales[col_numero].to_numpy(),
+            'extranjeros': (totales[col_numero] - totales['locales']).to_numpy()
+        })
+        ranking = ranking[ranking['total'] >= minimo_estudiantes]
+        ranking['porcentaje'] = ranking['extranjeros'] / ranking['total'] * 100
+        ranking = ranking.sort_values('porcentaje', ascending=False, kind='stable').reset_index(drop=True)
+        return ranking if top_n is None else ranking.head(top_n)
+
+    @memorizar
+    def obtener_analisis_por_centro(self, codigo_centro=None, minimo_estudiantes=MINIMO_ESTUDIANTES_RANKING,
+                                    top_n=TOP_CENTROS_RANKING):
+        """Obtiene análisis por centro educativo
+
+        Sin codigo_centro devuelve el top de centros más diversos (ver
+        obtener_ranking_centros) como lista de dicts.
+        """
         if self.df_actual is None:
             return None
 
-        col_centro = self.buscar_columna(['Centre', 'Codi'])
-        col_numero = self.buscar_columna(['mero', 'Avalua'])
-        col_nacionalidad = self.buscar_columna(['Zona', 'Nacionalitat'])
-        col_aula = self.buscar_columna(['Aula', 'acollida'])
+        col_centro = self.columna('centro')
+        col_numero = self.columna('numero')
+        col_nacionalidad = self.columna('nacionalidad')
+        col_aula = self.columna('aula_acollida')
 
         if col_centro is None or col_numero is None:
             return None
 
         if codigo_centro:
-            # Análisis de un centro específico
-            df_centro = self.df_actual[self.df_actual[col_centro] == codigo_centro]
+            # Análisis de un centro específico: solo se leen sus filas
+            df_centro = self.filas_centro(codigo_centro)
 
-            if len(df_centro) == 0:
+            if df_centro is None:
                 return None
 
             stats = {
                 'total_estudiantes': df_centro[col_numero].sum(),
-                'registros': len(df_centro)
+                'registros': int(df_centro[COL_REGISTROS_AGREGADOS].sum())
+                             if COL_REGISTROS_AGREGADOS in df_centro.columns else len(df_centro)
             }
 
             if col_nacionalidad:
-                stats['por_nacionalidad'] = df_centro.groupby(col_nacionalidad)[col_numero].sum()
+                stats['por_nacionalidad'] = df_centro.groupby(col_nacionalidad, observed=True)[col_numero].sum()
 
             if col_aula:
-                df_acollida = df_centro[
-                    df_centro[col_aula].str.contains('S', na=False, case=False)
-                ]
+                df_acollida = df_centro[mascara_etiqueta(df_centro[col_aula], 'S')]
                 stats['en_aula_acollida'] = df_acollida[col_numero].sum() if len(df_acollida) > 0 else 0
 
             return stats
         else:
             # Top centros diversos
-            if col_nacionalidad:
-                # Calcular % extranjeros por centro
-                centros_stats = []
-
-                for centro in self.df_actual[col_centro].unique():
-                    df_centro = self.df_actual[self.df_actual[col_centro] == centro]
-                    total_centro = df_centro[col_numero].sum()
-
-                    if total_centro >= 50:  # Solo centros con al menos 50 estudiantes
-                        df_espana = df_centro[
-                            df_centro[col_nacionalidad].str.contains('ESPANYA', na=False, case=False)
-                        ]
-                        total_espana = df_espana[col_numero].sum()
-                        total_extranjeros = total_centro - total_espana
-                        porcentaje_extranjeros = (total_extranjeros / total_centro * 100) if total_centro > 0 else 0
-
-                        centros_stats.append({
-                            'centro': centro,
-                            'total': total_centro,
-                            'extranjeros': total_extranjeros,
-                            'porcentaje': porcentaje_extranjeros
-                        })
-
-                # Ordenar por % extranjeros
-                centros_stats.sort(key=lambda x: x['porcentaje'], reverse=True)
-                return centros_stats[:20]  # Top 20
+            ranking = self.obtener_ranking_centros(minimo_estudiantes, top_n)
+            if ranking is None:
+                return None
+            return ranking.to_dict('records')
+
+    def obtener_analisis_centros(self, codigos):
+        """Análisis de una lista de centros (ver obtener_analisis_por_centro)
+
+        Returns:
+            DataFrame con una fila por código, en el orden recibido: 'centro',
+            'encontrado', 'total_estudiantes', 'registros' y 'en_aula_acollida'
+            (vacíos si el centro no está), o None si no hay datos de centros
+        """
+        if self.df_actual is None or self.columna('centro') is None or self.columna('numero') is None:
+            return None
+
+        filas = []
+        for codigo in codigos:
+            stats = self.obtener_analisis_por_centro(codigo)
+            filas.append({
+                'centro': codigo,
+                'encontrado': stats is not None,
+                'total_estudiantes': stats['total_estudiantes'] if stats else None,
+                'registros': stats['registros'] if stats else None,
+                'en_aula_acollida': stats.get('en_aula_acollida') if stats else None
+            })
+        return pd.DataFrame(filas, columns=['centro', 'encontrado', 'total_estudiantes',
+                                            'registros', 'en_aula_acollida'])
+
+    # ========== COMPARACIONES ENTRE CURSOS (PANEL) ==========
+
+    @memorizar_panel
+    def obtener_evolucion_niveles(self):
+        """Estudiantes evaluados por nivel (filas) y curso (columnas), o None"""
+        totales = self.panel.totales(TipoCSV.EVALUACION)
+        if totales is None or 'nivel' not in totales.index.names:
+            return None
+        return totales.groupby(level=['nivel', 'curso'])['numero'].sum().unstack('curso')
 
+    @memorizar_panel
+    def obtener_tasas_promocion_cursos(self, por_grupo=False):
+        """Tasa de promoción (%) de cada curso sobre el total de evaluados, o None
+
+        Con por_grupo devuelve un DataFrame con un curso por fila y un grupo de
+        nacionalidad por columna.
+        """
+        totales = self.panel.totales(TipoCSV.EVALUACION)
+        if totales is None or 'resultado' not in totales.index.names:
+            return None
+        claves = ['curso', 'grupo_nacionalidad'] if por_grupo else ['curso']
+        if not set(claves) <= set(totales.index.names):
+            return None
+        promociona = totales.index.get_level_values('resultado') == ResultadoEvaluacion.PROMOCIONA.value
+        total = totales.groupby(level=claves)['numero'].sum()
+        promovidos = totales[promociona].groupby(level=claves)['numero'].sum().reindex(total.index, fill_value=0)
+        tasas = (promovidos / total * 100).where(total > 0, 0)
+        return tasas.unstack('grupo_nacionalidad') if por_grupo else tasas
+
+    @memorizar_panel
+    def obtener_evolucion_competencias(self):
+        """Media de cada lengua (columnas 'Català' y 'Castellà') por curso, o None"""
+        totales = self.panel.totales(TipoCSV.COMPETENCIAS)
+        if totales is None:
             return None
+        por_curso = totales.groupby(level='curso').sum()
+        medias = {nombre: por_curso[f'suma_{mit}'] / por_curso[f'valores_{mit}'].where(por_curso[f'valores_{mit}'] > 0)
+                  for nombre, _, mit in LENGUAS_COMPETENCIAS if f'suma_{mit}' in por_curso.columns}
+        return pd.DataFrame(medias) if medias else None
+
+
+# Filtros de la pestaña Datos con lista desplegable (el de centro es un campo de texto)
+ETIQUETAS_FILTRO = {
+    'curso': "Curso:",
+    'nivel': "Nivel:",
+    'grupo_nacionalidad': "Grupo nacionalidad:",
+    'aula_acollida': "Aula acogida:",
+    'resultado': "Resultado:",
+}
+
+
+def interpretar_codigo_centro(texto):
+    """Código de centro escrito por el usuario: entero si es numérico, si no el texto"""
+    texto = texto.strip()
+    try:
+        return int(texto)
+    except ValueError:
+        return texto
+
+
+# Tipos de archivo de los diálogos de carga (CSV planos y comprimidos)
+TIPOS_ARCHIVO_CSV = [
+    ("CSV files", "*.csv *.csv.gz *.gz *.zip *.zst"),
+    ("All files", "*.*")
+]
+
+
+# Cada cuánto (ms) comprueba la interfaz si han terminado los trabajos en segundo plano
+INTERVALO_REVISION_TAREAS_MS = 100
+
+
+class TareasSegundoPlano:
+    """Trabajos en hilos cuyo resultado se entrega en el hilo de Tk
+
+    Tk solo se puede usar desde el hilo principal: los trabajos no tocan la
+    interfaz y sus callbacks se ejecutan desde root.after. Hay como máximo un
+    trabajo en curso por canal (una pestaña o la carga de archivos). Un
+    trabajo cancelado termina en su hilo, pero su resultado se descarta.
+
+    Los trabajos leen el estado del analizador; lo que lo modifica (cargar,
+    filtrar, quitar archivos) se pasa a despues() para que no se mezcle con
+    un cálculo a medias.
+    """
+
+    def __init__(self, root, al_cambiar=None, max_hilos=2):
+        self.root = root
+        self.al_cambiar = al_cambiar  # recibe el número de trabajos en curso
+        self._pool = ThreadPoolExecutor(max_workers=max_hilos)
+        self._trabajos = {}  # canal -> (futuro, al_terminar, al_fallar)
+        self._hilos = []  # futuros aún en marcha, incluidos los cancelados
+        self._pendientes = []  # acciones que esperan a que no quede ningún hilo
+        self._revisando = False
+
+    def en_curso(self, canal=None):
+        """Si hay un trabajo en curso en el canal (o en cualquiera, sin canal)"""
+        return canal in self._trabajos if canal is not None else bool(self._trabajos)
+
+    def lanzar(self, canal, trabajo, al_terminar, al_fallar):
+        """Ejecuta trabajo() en un hilo; devuelve False si el canal ya está ocupado"""
+        if canal in self._trabajos:
+            return False
+        futuro = self._pool.submit(trabajo)
+        self._trabajos[canal] = (futuro, al_terminar, al_fallar)
+        self._hilos.append(futuro)
+        self._notificar()
+        self._programar_revision()
+        return True
+
+    def despues(self, accion):
+        """Ejecuta accion() en cuanto no quede ningún hilo trabajando (ya, si no hay)"""
+        self._hilos = [futuro for futuro in self._hilos if not futuro.done()]
+        if not self._hilos:
+            accion()
+            return
+        self._pendientes.append(accion)
+        self._programar_revision()
+
+    def cancelar(self, canal=None, excepto=()):
+        """Descarta el trabajo del canal (o todos, sin canal, salvo los canales de `excepto`)"""
+        canales = [canal] if canal is not None else [c for c in self._trabajos if c not in excepto]
+        for canal in canales:
+            trabajo = self._trabajos.pop(canal, None)
+            if trabajo is not None:
+                trabajo[0].cancel()
+        self._notificar()
+
+    def cerrar(self):
+        """Descarta los trabajos pendientes sin esperar a los que están en marcha"""
+        self._trabajos.clear()
+        self._pendientes.clear()
+        # Los que aún no han empezado no llegan a ejecutarse
+        for futuro in self._hilos:
+            futuro.cancel()
+        self._pool.shutdown(wait=False)
+
+    def _notificar(self):
+        if self.al_cambiar is not None:
+            self.al_cambiar(len(self._trabajos))
+
+    def _programar_revision(self):
+        if not self._revisando:
+            self._revisando = True
+            self.root.after(INTERVALO_REVISION_TAREAS_MS, self._revisar)
+
+    def _revisar(self):
+        self._revisando = False
+        terminados = [(canal, trabajo) for canal, trabajo in self._trabajos.items() if trabajo[0].done()]
+        try:
+            for canal, (futuro, al_terminar, al_fallar) in terminados:
+                del self._trabajos[canal]
+                if futuro.exception() is None:
+                    al_terminar(futuro.result())
+                else:
+                    al_fallar(futuro.exception())
+            self._hilos = [futuro for futuro in self._hilos if not futuro.done()]
+            while self._pendientes and not self._hilos:
+                self._pendientes.pop(0)()
+        finally:
+            if terminados:
+                self._notificar()
+            if self._trabajos or self._pendientes:
+                self._programar_revision()
+
+
+@functools.lru_cache(maxsize=None)
+def matplotlib_tk():
+    """Importa matplotlib y seaborn la primera vez que se dibuja un gráfico
+
+    Importarlos al arrancar retrasaba varios segundos la aparición de la
+    ventana. Devuelve Figure, FigureCanvasTkAgg y el módulo de mapas de color.
+    """
+    import matplotlib
+    import matplotlib.cm
+    import seaborn as sns
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    from matplotlib.figure import Figure
+
+    # Configurar estilo de gráficos
+    sns.set_style("whitegrid")
+    matplotlib.rcParams['figure.figsize'] = (12, 6)
+    matplotlib.rcParams['font.size'] = 10
+    return Figure, FigureCanvasTkAgg, matplotlib.cm
+
+
+# Límite de la caché de gráficos ya construidos (coste estimado de sus imágenes)
+TAMANO_MAXIMO_GRAFICOS_BYTES = 128 * 1024 ** 2
+
+
+def tamano_figura(fig):
+    """Bytes estimados de una figura: los de su imagen RGBA a su tamaño y resolución"""
+    ancho, alto = fig.get_size_inches() * fig.dpi
+    return int(ancho * alto * 4)
+
+
+class GestorFiguras:
+    """Un FigureCanvasTkAgg por marco de la interfaz y caché de figuras construidas
+
+    Un gráfico nuevo en un marco borra la figura de su lienzo y dibuja encima
+    en lugar de crear otra, salvo que esa figura esté en la caché: entonces
+    se dibuja en una nueva. Los gráficos decorados con @grafico_memorizado
+    guardan su figura en la caché y al volver a pedirlos se muestra sin
+    recalcularla. Las figuras se crean con matplotlib.figure.Figure, fuera
+    del registro de pyplot, así que se liberan en cuanto nada las usa: al
+    vaciar el marco (también si lo vacía otra vista) o al salir de la caché.
+    """
+
+    def __init__(self, tamano_maximo_cache=TAMANO_MAXIMO_GRAFICOS_BYTES):
+        self._lienzos = {}  # marco -> FigureCanvasTkAgg
+        self._vivas = weakref.WeakSet()  # todas las figuras creadas que siguen en memoria
+        self._guardadas = weakref.WeakSet()  # figuras que se han guardado en la caché
+        self._claves = {}  # marco -> clave con la que guardar la figura que se muestre
+        # Claves: (huella de los datos, gráfico, tamaño del marco); ver grafico_memorizado
+        self.cache = CacheResultados(tamano_maximo_cache, medir=tamano_figura)
+
+    def figura(self, marco, figsize):
+        """Figura vacía para dibujar en el marco; quita el resto de su contenido
+
+        `figsize` solo se usa al crear el lienzo: después la figura ocupa el marco.
+        """
+        lienzo = self._lienzos.get(marco)
+        if lienzo is not None and lienzo.figure not in self._guardadas:
+            fig = lienzo.figure
+            fig.clear()
+        else:
+            Figure, _, _ = matplotlib_tk()
+            fig = Figure(figsize=figsize)
+            self._vivas.add(fig)
+        self._colocar(marco, fig)
+        return fig
+
+    def _colocar(self, marco, fig):
+        """Pone la figura en el lienzo del marco (lo crea si no existe) y quita el resto del marco"""
+        lienzo = self._lienzos.get(marco)
+        widget = lienzo.get_tk_widget() if lienzo is not None else None
+        for hijo in marco.winfo_children():
+            if hijo is not widget:
+                hijo.destroy()
+
+        if lienzo is None:
+            _, FigureCanvasTkAgg, _ = matplotlib_tk()
+            lienzo = FigureCanvasTkAgg(fig, master=marco)
+            lienzo.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+            lienzo.get_tk_widget().bind('<Destroy>', lambda e, m=marco: self._olvidar(m), '+')
+            self._lienzos[marco] = lienzo
+        elif lienzo.figure is not fig:
+            # La figura toma la resolución y el tamaño actuales del lienzo
+            fig.set_dpi(lienzo.figure.dpi)
+            ancho, alto = widget.winfo_width(), widget.winfo_height()
+            if ancho > 1 and alto > 1:
+                fig.set_size_inches(ancho / fig.dpi, alto / fig.dpi, forward=False)
+            lienzo.figure = fig
+            fig.set_canvas(lienzo)
+        return lienzo
+
+    def colores(self, mapa, valores):
+        """Colores del mapa de matplotlib ('Set3', 'viridis'...) para los valores"""
+        return getattr(matplotlib_tk()[2], mapa)(valores)
+
+    def mostrar(self, marco):
+        """Dibuja en pantalla la figura del marco (y la guarda si se pidió con guardar_siguiente)"""
+        lienzo = self._lienzos[marco]
+        lienzo.draw()
+        clave = self._claves.pop(marco, None)
+        if clave is not None:
+            self.cache.guardar(clave, lienzo.figure)
+            self._guardadas.add(lienzo.figure)
+
+    def tamano(self, marco):
+        """Tamaño en píxeles del marco, parte de la clave de los gráficos guardados"""
+        return (marco.winfo_width(), marco.winfo_height())
+
+    def guardar_siguiente(self, marco, clave):
+        """La próxima figura que se muestre en el marco se guarda con esa clave (None: ninguna)"""
+        if clave is None:
+            self._claves.pop(marco, None)
+        else:
+            self._claves[marco] = clave
+
+    def mostrar_guardada(self, marco, clave):
+        """Muestra la figura guardada con esa clave; False si no está en la caché"""
+        encontrado, fig = self.cache.buscar(clave)
+        if not encontrado:
+            return False
+        self._colocar(marco, fig).draw()
+        return True
+
+    def liberar(self, marco=None):
+        """Destruye el lienzo del marco (o todos) y suelta su figura"""
+        for marco in ([marco] if marco is not None else list(self._lienzos)):
+            lienzo = self._lienzos.get(marco)
+            if lienzo is not None:
+                lienzo.get_tk_widget().destroy()
+                self._olvidar(marco)
+
+    def _olvidar(self, marco):
+        lienzo = self._lienzos.pop(marco, None)
+        if lienzo is not None and lienzo.figure not in self._guardadas:
+            lienzo.figure.clear()
+
+    def figuras_vivas(self):
+        """Figuras creadas que siguen en memoria (tras recolectar la basura)
+
+        Debería ser como mucho el número de marcos con gráfico más las
+        figuras de la caché; si crece con cada gráfico, hay una fuga.
+        """
+        gc.collect()
+        return len(self._vivas)
+
+
+def grafico_memorizado(marco, huella='huella_datos'):
+    """Decorador de un gráfico de VentanaAnalisis que guarda su figura en la caché de gráficos
+
+    `marco` es el atributo de la ventana donde se dibuja y `huella` el método
+    del analizador que identifica sus datos (huella_datos incluye el filtro
+    activo; huella_panel, para las comparativas entre cursos). Al cambiar los
+    datos, el analizador descarta las figuras de ese ámbito (ver al_invalidar).
+    """
+    def decorador(metodo):
+        @functools.wraps(metodo)
+        def envoltorio(self):
+            clave = self.clave_grafico(envoltorio)
+            if clave is None:
+                return metodo(self)
+            frame = getattr(self, marco)
+            if self.figuras.mostrar_guardada(frame, clave):
+                return
+            self.figuras.guardar_siguiente(frame, clave)
+            try:
+                return metodo(self)
+            finally:
+                self.figuras.guardar_siguiente(frame, None)
+        envoltorio.marco_grafico = marco
+        envoltorio.huella_grafico = huella
+        return envoltorio
+    return decorador
+
+
+# Alto de fila (px) de la tabla de datos si el tema no lo define
+ALTO_FILA_TABLA = 20
+
+
+def orden_filas(serie, ascendente=True):
+    """Posiciones que ordenan la serie (estable, vacíos al final)"""
+    ordenada = serie.reset_index(drop=True).sort_values(
+        ascending=ascendente, kind='stable', na_position='last')
+    return ordenada.index.to_numpy()
+
+
+def valores_pagina(df, posiciones, columnas=None):
+    """Filas del DataFrame en esas posiciones, como listas de valores para un Treeview
+
+    Con `columnas` solo se toman esas, y en ese orden; la selección se hace
+    sobre la página, no sobre el DataFrame completo.
+    """
+    pagina = df.iloc[posiciones]
+    if columnas is not None:
+        pagina = pagina[columnas]
+    return [['' if pd.isna(valor) else valor for valor in fila]
+            for fila in pagina.itertuples(index=False, name=None)]
+
+
+class TablaVirtual:
+    """Treeview que solo contiene las filas visibles de un DataFrame
+
+    La barra de desplazamiento recorre el DataFrame completo; al moverla se
+    reescriben los valores de las mismas filas del Treeview con la ventana
+    correspondiente, así que el coste no depende del número de filas. Pulsar
+    una cabecera ordena por esa columna (otra vez, en orden inverso) con un
+    argsort que se guarda mientras no cambien los datos.
+    """
+
+    def __init__(self, padre):
+        self.tree = ttk.Treeview(padre, show='headings')
+        self.scroll_y = ttk.Scrollbar(padre, orient='vertical', command=self.desplazar)
+        self.scroll_x = ttk.Scrollbar(padre, orient='horizontal', command=self.tree.xview)
+        self.tree.configure(xscrollcommand=self.scroll_x.set)
+        self.label_posicion = ttk.Label(padre, text="")
+
+        alto = ttk.Style().lookup('Treeview', 'rowheight')
+        self.alto_fila = int(alto) if alto else ALTO_FILA_TABLA
+        self.filas_visibles = 1
+
+        self.df = None
+        self.columnas = []
+        self.inicio = 0
+        self.orden = None  # posiciones en el orden elegido; None, el del archivo
+        self.columna_orden = None
+        self.ascendente = True
+        self._ordenes = {}  # (columna, ascendente) -> posiciones, para self.df
+
+        self.tree.bind('<Configure>', self._redimensionar)
+        # Windows da delta en múltiplos de 120 y macOS en ±1: solo cuenta el signo
+        self.tree.bind('<MouseWheel>', lambda e: self.desplazar('scroll', -3 if e.delta > 0 else 3, 'units'))
+        self.tree.bind('<Button-4>', lambda e: self.desplazar('scroll', -3, 'units'))
+        self.tree.bind('<Button-5>', lambda e: self.desplazar('scroll', 3, 'units'))
+        self.tree.bind('<Prior>', lambda e: self.desplazar('scroll', -1, 'pages'))
+        self.tree.bind('<Next>', lambda e: self.desplazar('scroll', 1, 'pages'))
+        self.tree.bind('<Home>', lambda e: self.desplazar('moveto', 0))
+        self.tree.bind('<End>', lambda e: self.desplazar('moveto', 1))
+
+    def mostrar(self, df, columnas=None):
+        """Muestra el DataFrame desde el principio, conservando la columna de orden si sigue
+
+        `columnas` limita las que se ven sin copiar el DataFrame; así, volver a
+        mostrar el mismo objeto conserva los órdenes ya calculados.
+        """
+        if df is not self.df:
+            self._ordenes = {}
+        self.df = df
+        self.columnas = columnas = list(df.columns) if columnas is None else list(columnas)
+        self.inicio = 0
+        self.tree['columns'] = columnas
+        for col in columnas:
+            self.tree.heading(col, text=col, command=lambda c=col: self.ordenar(c))
+            self.tree.column(col, width=120)
+
+        if self.columna_orden in columnas:
+            self._aplicar_orden()
+        else:
+            self.columna_orden = None
+            self.orden = None
+        self._dibujar()
+
+    def vaciar(self):
+        """Quita los datos y las filas del Treeview"""
+        self.df = None
+        self.columnas = []
+        self.orden = None
+        self.columna_orden = None
+        self._ordenes = {}
+        self.tree.delete(*self.tree.get_children())
+        self.scroll_y.set(0, 1)
+        self.label_posicion.config(text="")
+
+    def ordenar(self, columna):
+        """Ordena por la columna; si ya lo estaba, invierte el orden"""
+        if self.df is None:
+            return
+        self.ascendente = not self.ascendente if columna == self.columna_orden else True
+        self.columna_orden = columna
+        self._aplicar_orden()
+        self.inicio = 0
+        self._dibujar()
+
+    def _aplicar_orden(self):
+        clave = (self.columna_orden, self.ascendente)
+        if clave not in self._ordenes:
+            self._ordenes[clave] = orden_filas(self.df[self.columna_orden], self.ascendente)
+        self.orden = self._ordenes[clave]
+        for col in self.tree['columns']:
+            flecha = (" ▲" if self.ascendente else " ▼") if col == self.columna_orden else ""
+            self.tree.heading(col, text=f"{col}{flecha}")
+
+    def desplazar(self, accion, cantidad, unidad=None):
+        """Comando de la barra vertical ('moveto' fracción o 'scroll' n units/pages)"""
+        if self.df is None:
+            return
+        total = len(self.df)
+        if accion == 'moveto':
+            inicio = int(float(cantidad) * total)
+        else:
+            paso = self.filas_visibles if unidad == 'pages' else 1
+            inicio = self.inicio + int(cantidad) * paso
+        inicio = max(0, min(inicio, total - self.filas_visibles))
+        if inicio != self.inicio:
+            self.inicio = inicio
+            self._dibujar()
+
+    def _redimensionar(self, event):
+        # La primera fila del Treeview es la de cabeceras
+        filas = max(1, event.height // self.alto_fila - 1)
+        if filas != self.filas_visibles:
+            self.filas_visibles = filas
+            if self.df is not None:
+                self.inicio = max(0, min(self.inicio, len(self.df) - filas))
+                self._dibujar()
+
+    def _dibujar(self):
+        total = len(self.df)
+        fin = min(total, self.inicio + self.filas_visibles)
+        posiciones = self.orden[self.inicio:fin] if self.orden is not None else np.arange(self.inicio, fin)
+        filas = valores_pagina(self.df, posiciones, self.columnas)
+
+        # Se reutilizan las filas del Treeview y solo se crean o borran las que sobran
+        items = self.tree.get_children()
+        for item, valores in zip(items, filas):
+            self.tree.item(item, values=valores)
+        for valores in filas[len(items):]:
+            self.tree.insert('', 'end', values=valores)
+        if len(items) > len(filas):
+            self.tree.delete(*items[len(filas):])
+
+        if total:
+            self.scroll_y.set(self.inicio / total, fin / total)
+            self.label_posicion.config(text=f"Filas {self.inicio + 1:,}–{fin:,} de {total:,}")
+        else:
+            self.scroll_y.set(0, 1)
+            self.label_posicion.config(text="Sin filas")
+
+
+# Pestañas de la ventana: (clave, título). El contenido de cada una lo crea
+# VentanaAnalisis.crear_pestana_<clave>; solo la primera se crea al arrancar,
+# el resto la primera vez que se selecciona.
+PESTANAS = [
+    ('resumen', "📊 Resumen"),
+    ('visualizaciones', "📈 Gráficos"),
+    ('datos', "📋 Datos"),
+    ('comparaciones', "🔄 Comparaciones"),
+    ('aulas_acogida_detalle', "🏫 Aulas Acogida Detalle"),
+    ('diversidad_cultural', "🌍 Diversidad Cultural"),
+    ('comparativa_grupos', "⚖️ Comparativa Grupos"),
+    ('analisis_centros', "🏢 Análisis por Centro"),
+]
+
+
+# Cálculos del analizador que necesita cada vista. Se hacen en segundo plano
+# (quedan memorizados) y la vista, ya en el hilo de Tk, solo dibuja. Las
+# vistas que no están aquí se ejecutan directamente.
+CALCULOS_VISTAS = {
+    'grafico_por_nivel': lambda a: a.obtener_resumen_por_nivel_evaluacion(),
+    'grafico_por_consecuencias': lambda a: a.obtener_resumen_por_consecuencia(),
+    'grafico_por_nacionalidad': lambda a: a.obtener_resumen_diversidad(),
+    'grafico_aulas_acollida': lambda a: a.obtener_estadisticas_aulas_acollida(),
+    'grafico_sudamerica_evaluacion': lambda a: (a.obtener_estadisticas_sudamerica(),
+                                                a.obtener_resumen_por_nivel_evaluacion()),
+    'grafico_espana_evaluacion': lambda a: (a.obtener_estadisticas_espana(),
+                                            a.obtener_resumen_por_nivel_evaluacion()),
+    'grafico_competencias_por_nivel': lambda a: a.obtener_resumen_por_nivel_competencias(),
+    'grafico_comparacion_lenguas': lambda a: a.obtener_estadisticas_competencias(),
+    'grafico_distribucion_notas': lambda a: a.obtener_distribucion_notas(),
+    'grafico_sudamerica_competencias': lambda a: (a.obtener_competencias_sudamerica(),
+                                                  a.obtener_estadisticas_competencias()),
+    'comparar_evolucion_niveles': lambda a: a.obtener_evolucion_niveles(),
+    'comparar_tasas_promocion': lambda a: a.obtener_tasas_promocion_cursos(),
+    'comparar_tasas_promocion_grupos': lambda a: a.obtener_tasas_promocion_cursos(por_grupo=True),
+    'comparar_evolucion_competencias': lambda a: a.obtener_evolucion_competencias(),
+    'mostrar_analisis_completo_aulas': lambda a: a.obtener_analisis_detallado_aulas_acollida(),
+    'grafico_nivel_nacionalidad_aulas': lambda a: a.obtener_analisis_detallado_aulas_acollida(),
+    'grafico_promocion_por_nacionalidad_aulas': lambda a: a.obtener_analisis_detallado_aulas_acollida(),
+    'mostrar_tabla_detallada_aulas': lambda a: a.obtener_analisis_detallado_aulas_acollida(),
+    'mostrar_resumen_diversidad': lambda a: a.obtener_resumen_diversidad(),
+    'grafico_circular_diversidad': lambda a: a.obtener_resumen_diversidad(),
+    'grafico_top_origenes': lambda a: a.obtener_resumen_diversidad(),
+    'grafico_diversidad_por_nivel': lambda a: a.obtener_diversidad_por_nivel(),
+    'mostrar_tabla_comparativa': lambda a: a.obtener_comparativa_grupos(),
+    'grafico_tasas_promocion': lambda a: a.obtener_comparativa_grupos(),
+    'grafico_brechas': lambda a: a.obtener_comparativa_grupos(),
+    'mostrar_top_centros_diversos': lambda a: a.obtener_analisis_por_centro(),
+    'mostrar_centros_aulas': lambda a: a.obtener_centros_aulas_acollida(),
+    'exportar_ranking_centros': lambda a: a.obtener_ranking_centros(),
+}
 
 
 class VentanaAnalisis:
@@ -913,7 +3085,60 @@ class VentanaAnalisis:
         self.root.geometry("1400x900")
 
         self.analizador = AnalizadorEducativo()
+        self.figuras = GestorFiguras()
+        # Las figuras guardadas dejan de valer con los resultados del analizador
+        self.analizador.al_invalidar.append(self.figuras.cache.invalidar)
         self.crear_interfaz()
+        self.tareas = TareasSegundoPlano(self.root, self.actualizar_estado_tareas)
+        self.root.protocol("WM_DELETE_WINDOW", self.cerrar)
+
+    def cerrar(self):
+        """Cierra la ventana descartando los trabajos en segundo plano"""
+        self.tareas.cerrar()
+        self.root.destroy()
+
+    def vista(self, canal, mostrar):
+        """Comando de botón que prepara los datos de la vista en segundo plano y luego la muestra"""
+        def comando():
+            calcular = CALCULOS_VISTAS.get(mostrar.__name__)
+            if calcular is None or self.analizador.df_actual is None:
+                mostrar()
+                return
+            # Un gráfico ya guardado se muestra sin pasar por el segundo plano
+            clave = self.clave_grafico(mostrar)
+            if clave is not None and clave in self.figuras.cache:
+                mostrar()
+                return
+            # Si el cálculo falla se muestra el error: repetirlo en el hilo de Tk bloquearía la ventana
+            if not self.tareas.lanzar(canal, lambda: calcular(self.analizador), lambda _: mostrar(),
+                                      lambda e: messagebox.showerror("Error", f"Error al calcular: {str(e)}")):
+                messagebox.showinfo("En curso", "Ya hay un cálculo en curso en esta pestaña")
+        return comando
+
+    def clave_grafico(self, grafico):
+        """Clave del gráfico (decorado con @grafico_memorizado) en la caché de gráficos
+
+        None si no se guarda: no es un gráfico memorizado o no hay datos.
+        """
+        marco = getattr(grafico, 'marco_grafico', None)
+        if marco is None or self.analizador.df_actual is None:
+            return None
+        huella = getattr(self.analizador, grafico.huella_grafico)()
+        return (huella, grafico.__name__, self.figuras.tamano(getattr(self, marco)))
+
+    def actualizar_estado_tareas(self, en_curso):
+        """Muestra la barra de progreso y el botón de cancelar mientras hay trabajos"""
+        if en_curso:
+            self.label_estado.config(text=f"⏳ Calculando... ({en_curso} en curso)")
+            self.frame_estado.grid()
+            self.barra_progreso.start(15)
+        else:
+            self.barra_progreso.stop()
+            self.frame_estado.grid_remove()
+
+    def cancelar_tareas(self):
+        """Descarta los trabajos en segundo plano en curso"""
+        self.tareas.cancelar()
 
     def crear_interfaz(self):
         """Crea la interfaz gráfica principal"""
@@ -929,18 +3154,24 @@ class VentanaAnalisis:
         ttk.Button(frame_superior, text="📂 Cargar Múltiples CSV",
                    command=self.cargar_multiples_archivos).grid(row=0, column=1, padx=5)
 
+        ttk.Button(frame_superior, text="➖ Quitar Archivo",
+                   command=self.quitar_archivo).grid(row=0, column=2, padx=5)
+
         ttk.Button(frame_superior, text="🗑️ Limpiar Datos",
-                   command=self.limpiar_datos).grid(row=0, column=2, padx=5)
+                   command=self.limpiar_datos).grid(row=0, column=3, padx=5)
+
+        ttk.Button(frame_superior, text="🧹 Vaciar Caché",
+                   command=self.vaciar_cache).grid(row=0, column=4, padx=5)
 
         # Label de archivo actual
         self.label_archivo = ttk.Label(frame_superior, text="Ningún archivo cargado",
                                        font=('Arial', 10, 'bold'))
-        self.label_archivo.grid(row=0, column=3, padx=20)
+        self.label_archivo.grid(row=0, column=5, padx=20)
 
         # Label de tipo de CSV
         self.label_tipo = ttk.Label(frame_superior, text="",
                                     font=('Arial', 9), foreground='blue')
-        self.label_tipo.grid(row=0, column=4, padx=10)
+        self.label_tipo.grid(row=0, column=6, padx=10)
 
         # Frame central - Notebook con pestañas
         self.notebook = ttk.Notebook(self.root)
@@ -950,21 +3181,39 @@ class VentanaAnalisis:
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(1, weight=1)
 
-        # Crear pestañas (ahora con enfoque en diversidad e inclusión)
-        self.crear_pestana_resumen()
-        self.crear_pestana_visualizaciones()
-        self.crear_pestana_datos()
-        self.crear_pestana_comparaciones()
-        self.crear_pestana_aulas_acogida_detalle()
-        self.crear_pestana_diversidad_cultural()
-        self.crear_pestana_comparativa_grupos()
-        self.crear_pestana_analisis_centros()
-
-    def crear_pestana_resumen(self):
-        """Crea la pestaña de resumen estadístico"""
-        frame = ttk.Frame(self.notebook)
-        self.notebook.add(frame, text="📊 Resumen")
+        # Frame inferior - Progreso de los trabajos en segundo plano (oculto si no hay)
+        self.frame_estado = ttk.Frame(self.root, padding="5")
+        self.frame_estado.grid(row=2, column=0, sticky=(tk.W, tk.E))
+        self.label_estado = ttk.Label(self.frame_estado, text="")
+        self.label_estado.grid(row=0, column=0, padx=5)
+        self.barra_progreso = ttk.Progressbar(self.frame_estado, mode='indeterminate', length=200)
+        self.barra_progreso.grid(row=0, column=1, padx=5)
+        ttk.Button(self.frame_estado, text="✖ Cancelar",
+                   command=self.cancelar_tareas).grid(row=0, column=2, padx=5)
+        self.frame_estado.grid_remove()
+
+        # Crear pestañas (ahora con enfoque en diversidad e inclusión): de
+        # momento vacías, el contenido se crea al seleccionarlas (ver PESTANAS)
+        self.pestanas_creadas = set()
+        self.pestanas_pendientes = {}  # nombre Tk del marco -> clave de la pestaña
+        for clave, titulo in PESTANAS:
+            frame = ttk.Frame(self.notebook)
+            self.notebook.add(frame, text=titulo)
+            self.pestanas_pendientes[str(frame)] = clave
+        self.notebook.bind('<<NotebookTabChanged>>', self.crear_pestana_seleccionada)
+        self.crear_pestana_seleccionada()
+
+    def crear_pestana_seleccionada(self, event=None):
+        """Crea el contenido de la pestaña seleccionada si aún no existe"""
+        marco = self.notebook.select()
+        clave = self.pestanas_pendientes.pop(marco, None)
+        if clave is None:
+            return
+        self.pestanas_creadas.add(clave)
+        getattr(self, f'crear_pestana_{clave}')(self.root.nametowidget(marco))
 
+    def crear_pestana_resumen(self, frame):
+        """Crea la pestaña de resumen estadístico"""
         # Text widget para mostrar estadísticas
         self.texto_resumen = tk.Text(frame, wrap=tk.WORD, font=('Courier', 10))
         scrollbar = ttk.Scrollbar(frame, orient='vertical', command=self.texto_resumen.yview)
@@ -976,11 +3225,8 @@ class VentanaAnalisis:
         frame.columnconfigure(0, weight=1)
         frame.rowconfigure(0, weight=1)
 
-    def crear_pestana_visualizaciones(self):
+    def crear_pestana_visualizaciones(self, frame):
         """Crea la pestaña de visualizaciones"""
-        frame = ttk.Frame(self.notebook)
-        self.notebook.add(frame, text="📈 Gráficos")
-
         # Frame de controles
         self.frame_controles_graficos = ttk.Frame(frame)
         self.frame_controles_graficos.grid(row=0, column=0, sticky=(tk.W, tk.E), padx=5, pady=5)
@@ -994,44 +3240,58 @@ class VentanaAnalisis:
         frame.columnconfigure(0, weight=1)
         frame.rowconfigure(1, weight=1)
 
-    def crear_pestana_datos(self):
-        """Crea la pestaña de visualización de datos en tabla"""
-        frame = ttk.Frame(self.notebook)
-        self.notebook.add(frame, text="📋 Datos")
+        # La pestaña puede crearse con datos ya cargados
+        self.actualizar_botones_graficos()
 
-        # Frame de controles
-        frame_controles = ttk.Frame(frame)
+    def crear_pestana_datos(self, frame):
+        """Crea la pestaña de visualización de datos en tabla"""
+        # Frame de controles: el filtro se aplica al archivo actual en todas las
+        # pestañas salvo Comparaciones, que usa los totales de todos los cursos
+        frame_controles = ttk.LabelFrame(frame, text="🔎 Filtro del archivo actual (todas las pestañas salvo Comparaciones)",
+                                         padding="5")
         frame_controles.grid(row=0, column=0, sticky=(tk.W, tk.E), padx=5, pady=5)
 
-        ttk.Label(frame_controles, text="Filtrar por Nivel:").grid(row=0, column=0, padx=5)
-        self.combo_nivel = ttk.Combobox(frame_controles, state='readonly', width=15)
-        self.combo_nivel.grid(row=0, column=1, padx=5)
-        self.combo_nivel.bind('<<ComboboxSelected>>', self.actualizar_tabla)
+        self.combos_filtro = {}
+        self.valores_combos_filtro = {}
+        for columna, (campo, etiqueta) in enumerate(ETIQUETAS_FILTRO.items()):
+            ttk.Label(frame_controles, text=etiqueta).grid(row=0, column=columna, padx=5, sticky=tk.W)
+            combo = ttk.Combobox(frame_controles, state='readonly', width=18)
+            combo.grid(row=1, column=columna, padx=5)
+            self.combos_filtro[campo] = combo
+            self.valores_combos_filtro[campo] = []
+
+        columna = len(ETIQUETAS_FILTRO)
+        ttk.Label(frame_controles, text="Centros (códigos):").grid(row=0, column=columna, padx=5, sticky=tk.W)
+        self.entry_filtro_centro = ttk.Entry(frame_controles, width=20)
+        self.entry_filtro_centro.grid(row=1, column=columna, padx=5)
+
+        ttk.Button(frame_controles, text="Aplicar Filtro",
+                   command=self.aplicar_filtro).grid(row=1, column=columna + 1, padx=5)
 
         ttk.Button(frame_controles, text="Mostrar Todos",
-                   command=self.mostrar_todos_datos).grid(row=0, column=2, padx=5)
+                   command=self.mostrar_todos_datos).grid(row=1, column=columna + 2, padx=5)
 
         ttk.Button(frame_controles, text="Exportar a Excel",
-                   command=self.exportar_excel).grid(row=0, column=3, padx=5)
+                   command=self.exportar_excel).grid(row=1, column=columna + 3, padx=5)
 
-        # Treeview para mostrar datos
-        self.tree = ttk.Treeview(frame, show='headings')
-        scrollbar_y = ttk.Scrollbar(frame, orient='vertical', command=self.tree.yview)
-        scrollbar_x = ttk.Scrollbar(frame, orient='horizontal', command=self.tree.xview)
-        self.tree.configure(yscrollcommand=scrollbar_y.set, xscrollcommand=scrollbar_x.set)
+        self.label_filtro = ttk.Label(frame_controles, text="", foreground='blue')
+        self.label_filtro.grid(row=2, column=0, columnspan=columna + 4, padx=5, pady=(5, 0), sticky=tk.W)
 
-        self.tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        scrollbar_y.grid(row=1, column=1, sticky=(tk.N, tk.S))
-        scrollbar_x.grid(row=2, column=0, sticky=(tk.W, tk.E))
+        # Tabla virtual: solo se dibujan las filas visibles del dataset
+        self.tabla_datos = TablaVirtual(frame)
+        self.tabla_datos.tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.tabla_datos.scroll_y.grid(row=1, column=1, sticky=(tk.N, tk.S))
+        self.tabla_datos.scroll_x.grid(row=2, column=0, sticky=(tk.W, tk.E))
+        self.tabla_datos.label_posicion.grid(row=3, column=0, padx=5, sticky=tk.W)
 
         frame.columnconfigure(0, weight=1)
         frame.rowconfigure(1, weight=1)
 
-    def crear_pestana_comparaciones(self):
-        """Crea la pestaña para comparar múltiples archivos"""
-        frame = ttk.Frame(self.notebook)
-        self.notebook.add(frame, text="🔄 Comparaciones")
+        # La pestaña puede crearse con datos ya cargados
+        self.actualizar_filtros()
 
+    def crear_pestana_comparaciones(self, frame):
+        """Crea la pestaña para comparar múltiples archivos"""
         ttk.Label(frame, text="Comparación entre diferentes cursos académicos",
                   font=('Arial', 12, 'bold')).grid(row=0, column=0, pady=10)
 
@@ -1046,8 +3306,14 @@ class VentanaAnalisis:
         frame.columnconfigure(0, weight=1)
         frame.rowconfigure(2, weight=1)
 
+        # La pestaña puede crearse con datos ya cargados
+        self.actualizar_botones_comparacion()
+
     def actualizar_botones_graficos(self):
         """Actualiza los botones de gráficos según el tipo de CSV"""
+        if 'visualizaciones' not in self.pestanas_creadas:
+            return
+
         # Limpiar botones anteriores
         for widget in self.frame_controles_graficos.winfo_children():
             widget.destroy()
@@ -1055,102 +3321,183 @@ class VentanaAnalisis:
         if self.analizador.tipo_csv_actual == TipoCSV.EVALUACION:
             # Botones para CSV de Evaluación
             ttk.Button(self.frame_controles_graficos, text="Gráfico por Nivel",
-                       command=self.grafico_por_nivel).grid(row=0, column=0, padx=5)
+                       command=self.vista('graficos', self.grafico_por_nivel)).grid(row=0, column=0, padx=5)
 
             ttk.Button(self.frame_controles_graficos, text="Gráfico por Consecuencias",
-                       command=self.grafico_por_consecuencias).grid(row=0, column=1, padx=5)
+                       command=self.vista('graficos', self.grafico_por_consecuencias)).grid(row=0, column=1, padx=5)
 
             ttk.Button(self.frame_controles_graficos, text="Gráfico por Nacionalidad",
-                       command=self.grafico_por_nacionalidad).grid(row=0, column=2, padx=5)
+                       command=self.vista('graficos', self.grafico_por_nacionalidad)).grid(row=0, column=2, padx=5)
 
             # NUEVO: Botón para Aulas de Acogida
             ttk.Button(self.frame_controles_graficos, text="🏫 Aulas de Acogida",
-                       command=self.grafico_aulas_acollida).grid(row=0, column=3, padx=5)
+                       command=self.vista('graficos', self.grafico_aulas_acollida)).grid(row=0, column=3, padx=5)
 
             # NUEVO: Botón específico para Sudamérica
             ttk.Button(self.frame_controles_graficos, text="📊 Análisis Sudamérica",
-                       command=self.grafico_sudamerica_evaluacion).grid(row=0, column=4, padx=5)
+                       command=self.vista('graficos', self.grafico_sudamerica_evaluacion)).grid(row=0, column=4, padx=5)
 
             # NUEVO: Botón específico para España (nativos)
             ttk.Button(self.frame_controles_graficos, text="🇪🇸 Análisis España",
-                       command=self.grafico_espana_evaluacion).grid(row=0, column=5, padx=5)
+                       command=self.vista('graficos', self.grafico_espana_evaluacion)).grid(row=0, column=5, padx=5)
 
         elif self.analizador.tipo_csv_actual == TipoCSV.COMPETENCIAS:
             # Botones para CSV de Competencias
             ttk.Button(self.frame_controles_graficos, text="Gráfico Medias por Nivel",
-                       command=self.grafico_competencias_por_nivel).grid(row=0, column=0, padx=5)
+                       command=self.vista('graficos', self.grafico_competencias_por_nivel)).grid(row=0, column=0, padx=5)
 
             ttk.Button(self.frame_controles_graficos, text="Comparación Català vs Castellà",
-                       command=self.grafico_comparacion_lenguas).grid(row=0, column=1, padx=5)
+                       command=self.vista('graficos', self.grafico_comparacion_lenguas)).grid(row=0, column=1, padx=5)
 
             ttk.Button(self.frame_controles_graficos, text="Distribución de Notas",
-                       command=self.grafico_distribucion_notas).grid(row=0, column=2, padx=5)
+                       command=self.vista('graficos', self.grafico_distribucion_notas)).grid(row=0, column=2, padx=5)
 
             # NUEVO: Botón específico para Sudamérica
             ttk.Button(self.frame_controles_graficos, text="📊 Análisis Sudamérica",
-                       command=self.grafico_sudamerica_competencias).grid(row=0, column=3, padx=5)
+                       command=self.vista('graficos', self.grafico_sudamerica_competencias)).grid(row=0, column=3, padx=5)
 
     def actualizar_botones_comparacion(self):
         """Actualiza los botones de comparación según el tipo de CSV"""
+        if 'comparaciones' not in self.pestanas_creadas:
+            return
+
         # Limpiar botones anteriores
         for widget in self.frame_controles_comparacion.winfo_children():
             widget.destroy()
 
         if self.analizador.tipo_csv_actual == TipoCSV.EVALUACION:
             ttk.Button(self.frame_controles_comparacion, text="Comparar Evolución por Nivel",
-                       command=self.comparar_evolucion_niveles).grid(row=0, column=0, padx=5)
+                       command=self.vista('comparacion', self.comparar_evolucion_niveles)).grid(row=0, column=0, padx=5)
 
             ttk.Button(self.frame_controles_comparacion, text="Comparar Tasas de Promoción",
-                       command=self.comparar_tasas_promocion).grid(row=0, column=1, padx=5)
+                       command=self.vista('comparacion', self.comparar_tasas_promocion)).grid(row=0, column=1, padx=5)
+
+            ttk.Button(self.frame_controles_comparacion, text="Tasas por Grupo de Nacionalidad",
+                       command=self.vista('comparacion', self.comparar_tasas_promocion_grupos)).grid(row=0, column=2, padx=5)
 
         elif self.analizador.tipo_csv_actual == TipoCSV.COMPETENCIAS:
             ttk.Button(self.frame_controles_comparacion, text="Evolución de Medias",
-                       command=self.comparar_evolucion_competencias).grid(row=0, column=0, padx=5)
+                       command=self.vista('comparacion', self.comparar_evolucion_competencias)).grid(row=0, column=0, padx=5)
 
     def cargar_archivo(self):
         """Carga un archivo CSV individual"""
         ruta = filedialog.askopenfilename(
             title="Seleccionar archivo CSV",
-            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+            filetypes=TIPOS_ARCHIVO_CSV
         )
 
         if ruta:
-            exito, mensaje = self.analizador.cargar_csv(ruta)
-            if exito:
-                tipo_str = "Evaluación" if self.analizador.tipo_csv_actual == TipoCSV.EVALUACION else \
-                          "Competencias Básicas" if self.analizador.tipo_csv_actual == TipoCSV.COMPETENCIAS else \
-                          "Desconocido"
-
-                self.label_archivo.config(text=f"Archivo: {self.analizador.nombre_archivo_actual}")
-                self.label_tipo.config(text=f"Tipo: {tipo_str}")
-
-                self.actualizar_resumen()
-                self.actualizar_filtros()
-                self.actualizar_botones_graficos()
-                self.actualizar_botones_comparacion()
-                messagebox.showinfo("Éxito", mensaje)
-            else:
-                messagebox.showerror("Error", mensaje)
+            # Un zip con varios CSV se carga como una selección múltiple
+            if len(expandir_rutas([ruta])) > 1:
+                self.cargar_rutas(expandir_rutas([ruta]))
+                return
+
+            # El parseo va en segundo plano; el registro, en el hilo de Tk
+            def registrar(resultado):
+                self.analizador.registrar_dataset(resultado)
+                self.mostrar_dataset_actual()
+                messagebox.showinfo("Éxito", self.analizador.mensaje_carga(resultado))
+
+            self.lanzar_carga(
+                lambda: leer_csv(ruta, None, self.analizador.cache),
+                lambda resultado: self.cambiar_datos(lambda: registrar(resultado)),
+                lambda e: messagebox.showerror("Error", f"Error al cargar archivo: {str(e)}")
+            )
 
     def cargar_multiples_archivos(self):
         """Carga múltiples archivos CSV"""
         rutas = filedialog.askopenfilenames(
             title="Seleccionar archivos CSV",
-            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+            filetypes=TIPOS_ARCHIVO_CSV
         )
 
         if rutas:
-            cargados = 0
-            for ruta in rutas:
-                exito, _ = self.analizador.cargar_csv(ruta)
-                if exito:
-                    cargados += 1
+            self.cargar_rutas(rutas)
 
-            messagebox.showinfo("Éxito", f"{cargados} archivos cargados correctamente")
-            self.actualizar_resumen()
-            self.actualizar_filtros()
-            self.actualizar_botones_graficos()
-            self.actualizar_botones_comparacion()
+    def lanzar_carga(self, trabajo, al_terminar, al_fallar):
+        """Lanza una carga de archivos en segundo plano (una cada vez)"""
+        if not self.tareas.lanzar('carga', trabajo, al_terminar, al_fallar):
+            messagebox.showinfo("En curso", "Ya se están cargando archivos")
+
+    def cambiar_datos(self, accion):
+        """Ejecuta una acción que modifica los datos cuando no quede ningún cálculo en marcha
+
+        Los cálculos pendientes se descartan: serían de los datos anteriores.
+        Una carga en curso se conserva: sus archivos se registran antes de la acción.
+        """
+        self.tareas.cancelar(excepto=('carga',))
+        self.tareas.despues(accion)
+
+    def cargar_rutas(self, rutas):
+        """Carga varios archivos en segundo plano y muestra el informe de cada uno"""
+        self.lanzar_carga(
+            lambda: self.analizador.leer_multiples_csv(rutas),
+            lambda lecturas: self.cambiar_datos(lambda: self.registrar_lecturas(lecturas)),
+            lambda e: messagebox.showerror("Error", f"Error al cargar archivos: {str(e)}")
+        )
+
+    def registrar_lecturas(self, lecturas):
+        """Registra los archivos leídos por cargar_rutas y muestra el informe"""
+        informe = self.analizador.registrar_lecturas(lecturas)
+        cargados = sum(1 for item in informe if item['exito'])
+
+        texto = f"{cargados} de {len(informe)} archivos cargados correctamente\n\n"
+        for item in informe:
+            if item['exito']:
+                primera_linea = item['mensaje'].split('\n')[0]
+                texto += f"✅ {item['nombre']} ({item['tiempo']:.2f} s): {primera_linea}\n"
+            else:
+                texto += f"❌ {item['nombre']} ({item['tiempo']:.2f} s): {item['mensaje']}\n"
+
+        if cargados == len(informe):
+            messagebox.showinfo("Éxito", texto)
+        else:
+            messagebox.showwarning("Carga parcial", texto)
+
+        if cargados == 0:
+            return
+
+        self.mostrar_dataset_actual()
+
+    def mostrar_dataset_actual(self):
+        """Actualiza etiquetas, resumen, filtros y botones para el dataset actual"""
+        if self.analizador.nombre_archivo_actual is None:
+            self.label_archivo.config(text="Ningún archivo cargado")
+            self.label_tipo.config(text="")
+        else:
+            tipo_str = "Evaluación" if self.analizador.tipo_csv_actual == TipoCSV.EVALUACION else \
+                      "Competencias Básicas" if self.analizador.tipo_csv_actual == TipoCSV.COMPETENCIAS else \
+                      "Desconocido"
+            self.label_archivo.config(text=f"Archivo: {self.analizador.nombre_archivo_actual}")
+            self.label_tipo.config(text=f"Tipo: {tipo_str}")
+
+        self.actualizar_resumen()
+        self.actualizar_filtros()
+        self.actualizar_botones_graficos()
+        self.actualizar_botones_comparacion()
+
+    def quitar_archivo(self):
+        """Quita el archivo actual de la sesión sin recalcular el resto"""
+        nombre = self.analizador.nombre_archivo_actual
+        if nombre is None:
+            messagebox.showwarning("Advertencia", "No hay datos cargados")
+            return
+
+        respuesta = messagebox.askyesno(
+            "Confirmar",
+            f"¿Quieres quitar {nombre} de la sesión?"
+        )
+        if not respuesta:
+            return
+
+        def quitar():
+            self.analizador.eliminar_dataset(nombre)
+            if 'comparaciones' in self.pestanas_creadas:
+                for widget in self.frame_comparacion.winfo_children():
+                    widget.destroy()
+            self.mostrar_dataset_actual()
+
+        self.cambiar_datos(quitar)
 
     def limpiar_datos(self):
         """Limpia todos los datos cargados y reinicia la interfaz"""
@@ -1164,11 +3511,13 @@ class VentanaAnalisis:
         if not respuesta:
             return
 
+        self.cambiar_datos(self.reiniciar_interfaz)
+
+    def reiniciar_interfaz(self):
+        """Borra los datos del analizador y vacía todas las pestañas"""
         # Limpiar datos del analizador
-        self.analizador.dataframes = {}
-        self.analizador.df_actual = None
-        self.analizador.nombre_archivo_actual = None
-        self.analizador.tipo_csv_actual = TipoCSV.DESCONOCIDO
+        self.analizador.limpiar()
+        self.figuras.liberar()
 
         # Actualizar labels
         self.label_archivo.config(text="Ningún archivo cargado")
@@ -1178,27 +3527,20 @@ class VentanaAnalisis:
         self.texto_resumen.delete(1.0, tk.END)
         self.texto_resumen.insert(tk.END, "No hay datos cargados")
 
-        self.texto_datos.delete(1.0, tk.END)
-        self.texto_datos.insert(tk.END, "No hay datos cargados")
-
-        # Limpiar frames de visualización
-        for widget in self.frame_graficos.winfo_children():
-            widget.destroy()
-
-        for widget in self.frame_comparacion.winfo_children():
-            widget.destroy()
-
-        for widget in self.frame_contenido_aulas_detalle.winfo_children():
-            widget.destroy()
-
-        for widget in self.frame_contenido_diversidad.winfo_children():
-            widget.destroy()
-
-        for widget in self.frame_contenido_grupos.winfo_children():
-            widget.destroy()
-
-        for widget in self.frame_contenido_centros.winfo_children():
-            widget.destroy()
+        if 'datos' in self.pestanas_creadas:
+            self.tabla_datos.vaciar()
+
+        # Limpiar frames de visualización (las pestañas sin crear ya están vacías)
+        marcos = [('visualizaciones', 'frame_grafico'),
+                  ('comparaciones', 'frame_comparacion'),
+                  ('aulas_acogida_detalle', 'frame_contenido_aulas_detalle'),
+                  ('diversidad_cultural', 'frame_contenido_diversidad'),
+                  ('comparativa_grupos', 'frame_contenido_comparativa'),
+                  ('analisis_centros', 'frame_contenido_centros')]
+        for pestana, marco in marcos:
+            if pestana in self.pestanas_creadas:
+                for widget in getattr(self, marco).winfo_children():
+                    widget.destroy()
 
         # Actualizar filtros
         self.actualizar_filtros()
@@ -1206,6 +3548,19 @@ class VentanaAnalisis:
         # Mensaje de confirmación
         messagebox.showinfo("Limpieza completada", "Todos los datos han sido eliminados correctamente")
 
+    def vaciar_cache(self):
+        """Elimina los archivos de la caché en disco"""
+        respuesta = messagebox.askyesno(
+            "Confirmar",
+            "¿Quieres vaciar la caché de archivos ya procesados?\n\n"
+            "Los datos cargados en la sesión no se ven afectados."
+        )
+        if not respuesta:
+            return
+
+        liberados = self.analizador.purgar_cache()
+        messagebox.showinfo("Caché vaciada", f"Se han liberado {liberados / 1024**2:.1f} MB")
+
     def actualizar_resumen(self):
         """Actualiza el texto del resumen estadístico"""
         self.texto_resumen.delete(1.0, tk.END)
@@ -1229,7 +3584,7 @@ class VentanaAnalisis:
                           "Competencias" if tipo_archivo == TipoCSV.COMPETENCIAS else \
                           "Desconocido"
                 marcador = "→ " if nombre == self.analizador.nombre_archivo_actual else "  "
-                num_registros = len(info['df'])
+                num_registros = info['filas']
                 texto += f"{marcador}{i}. {nombre}\n"
                 texto += f"   Tipo: {tipo_str} | Registros: {num_registros:,}\n"
             texto += f"\n{'='*70}\n"
@@ -1244,7 +3599,10 @@ class VentanaAnalisis:
                   "Competencias Básicas" if stats['tipo_csv'] == TipoCSV.COMPETENCIAS else \
                   "Desconocido"
         texto += f"Tipo de archivo: {tipo_str}\n"
-        texto += f"Total de registros: {stats['total_registros']:,}\n\n"
+        texto += f"Total de registros: {stats['total_registros']:,}\n"
+        if stats['agregado']:
+            texto += f"Modo streaming: datos agregados en {stats['filas_agregadas']:,} combinaciones\n"
+        texto += "\n"
         texto += f"Columnas disponibles:\n"
         for i, col in enumerate(stats['columnas'], 1):
             valores_unicos = stats['valores_unicos'][col]
@@ -1439,150 +3797,63 @@ class VentanaAnalisis:
         texto += "📊 DISTRIBUCIÓN POR RANGOS DE NOTAS\n"
         texto += f"{'='*70}\n"
 
-        # Calcular rangos para cada lengua
-        if self.analizador.df_actual is not None:
-            col_catala = self.analizador.buscar_columna(['Català', 'competència'])
-            col_castella = self.analizador.buscar_columna(['Castellà', 'competència'])
-            col_numero = self.analizador.buscar_columna(['mero', 'avaluats'])
-
-            if col_numero:
-                for nombre_lengua, col_lengua in [('Català', col_catala), ('Castellà', col_castella)]:
-                    if col_lengua:
-                        df_lengua = self.analizador.df_actual[[col_lengua, col_numero]].copy()
-                        df_lengua = df_lengua[df_lengua[col_lengua].notna()]
-
-                        # Definir rangos
-                        total = df_lengua[col_numero].sum()
-                        if total > 0:
-                            texto += f"\n{nombre_lengua}:\n"
-
-                            # Suspenso (0-49)
-                            suspensos = df_lengua[df_lengua[col_lengua] < 50][col_numero].sum()
-                            texto += f"  Suspenso (0-49):  {suspensos:>8,.0f} ({suspensos/total*100:5.1f}%)\n"
-
-                            # Aprobado (50-69)
-                            aprobados = df_lengua[(df_lengua[col_lengua] >= 50) & (df_lengua[col_lengua] < 70)][col_numero].sum()
-                            texto += f"  Aprobado (50-69): {aprobados:>8,.0f} ({aprobados/total*100:5.1f}%)\n"
-
-                            # Notable (70-89)
-                            notables = df_lengua[(df_lengua[col_lengua] >= 70) & (df_lengua[col_lengua] < 90)][col_numero].sum()
-                            texto += f"  Notable (70-89):  {notables:>8,.0f} ({notables/total*100:5.1f}%)\n"
-
-                            # Excelente (90-100)
-                            excelentes = df_lengua[df_lengua[col_lengua] >= 90][col_numero].sum()
-                            texto += f"  Excelente (90-100):{excelentes:>8,.0f} ({excelentes/total*100:5.1f}%)\n"
-
-        # NUEVA SECCIÓN: Análisis específico de CENTRE I SUDAMÈRICA
-        texto += f"\n{'='*70}\n"
-        texto += "📊 ANÁLISIS ESPECÍFICO: CENTRE I SUDAMÈRICA\n"
-        texto += f"{'='*70}\n"
-
-        # Obtener estadísticas por nivel
-        stats_sudamerica_por_nivel = self.analizador.obtener_competencias_sudamerica(por_nivel=True)
-
-        if stats_sudamerica_por_nivel:
-            # Obtener también las medias globales por nivel para comparación
-            resumen_nivel = self.analizador.obtener_resumen_por_nivel_competencias()
-
-            for nivel in sorted(stats_sudamerica_por_nivel.keys()):
-                texto += f"\n--- Nivel {nivel} ---\n"
-                stats_nivel = stats_sudamerica_por_nivel[nivel]
-
-                for lengua, datos in stats_nivel.items():
-                    texto += f"\n{lengua}:\n"
-                    texto += f"  Total alumnos: {datos['total_alumnos']:,.0f}\n"
-
-                    # Manejar valores None
-                    if datos['media'] is not None:
-                        texto += f"  Media: {datos['media']:.2f}\n"
-                    else:
-                        texto += f"  Media: No disponible (sin datos válidos)\n"
-
-                    if datos['mediana'] is not None:
-                        texto += f"  Mediana: {datos['mediana']:.2f}\n"
-                    else:
-                        texto += f"  Mediana: No disponible (sin datos válidos)\n"
-
-                    # Añadir comparativa con media global del mismo nivel (solo si hay datos)
-                    if datos['media'] is not None and resumen_nivel and lengua in resumen_nivel:
-                        df_resumen = resumen_nivel[lengua]
-                        if nivel in df_resumen.index:
-                            col_mit = [c for c in df_resumen.columns if 'mitjana' in c][0]
-                            media_global_nivel = df_resumen.loc[nivel, col_mit]
-                            diferencia = datos['media'] - media_global_nivel
-                            texto += f"  Media global (Nivel {nivel}): {media_global_nivel:.2f}\n"
-                            texto += f"  Diferencia: {diferencia:+.2f} puntos "
-
-                            if abs(diferencia) < 2:
-                                texto += "(→ similar)\n"
-                            elif diferencia > 0:
-                                texto += "(✅ superior)\n"
-                            else:
-                                texto += "(⚠️ inferior)\n"
-
-            # Añadir análisis de evolución entre niveles para CENTRE I SUDAMÈRICA
-            niveles_ordenados = sorted(stats_sudamerica_por_nivel.keys())
-            if len(niveles_ordenados) >= 2:
-                texto += f"\n{'─'*70}\n"
-                texto += f"📈 Evolución CENTRE I SUDAMÈRICA ({niveles_ordenados[0]} → {niveles_ordenados[-1]}):\n"
-                texto += f"{'─'*70}\n"
-
-                nivel_inicial = niveles_ordenados[0]
-                nivel_final = niveles_ordenados[-1]
+        # Calcular rangos para cada lengua
+        if self.analizador.df_actual is not None:
+            col_catala = self.analizador.columna('competencia_catala')
+            col_castella = self.analizador.columna('competencia_castella')
+            col_numero = self.analizador.columna('num_avaluats')
 
-                for lengua in stats_sudamerica_por_nivel[nivel_inicial].keys():
-                    if lengua in stats_sudamerica_por_nivel[nivel_final]:
-                        media_inicial = stats_sudamerica_por_nivel[nivel_inicial][lengua]['media']
-                        media_final = stats_sudamerica_por_nivel[nivel_final][lengua]['media']
+            if col_numero:
+                for nombre_lengua, col_lengua in [('Català', col_catala), ('Castellà', col_castella)]:
+                    if col_lengua:
+                        df_lengua = self.analizador.df_actual[[col_lengua, col_numero]].copy()
+                        df_lengua = df_lengua[df_lengua[col_lengua].notna()]
 
-                        texto += f"\n{lengua}:\n"
+                        # Definir rangos
+                        total = df_lengua[col_numero].sum()
+                        if total > 0:
+                            texto += f"\n{nombre_lengua}:\n"
 
-                        # Solo calcular diferencia si ambos valores existen
-                        if media_inicial is not None and media_final is not None:
-                            diferencia = media_final - media_inicial
-                            porcentaje = (diferencia / media_inicial * 100) if media_inicial > 0 else 0
+                            # Suspenso (0-49)
+                            suspensos = df_lengua[df_lengua[col_lengua] < 50][col_numero].sum()
+                            texto += f"  Suspenso (0-49):  {suspensos:>8,.0f} ({suspensos/total*100:5.1f}%)\n"
 
-                            texto += f"  Nivel {nivel_inicial}: {media_inicial:.2f}\n"
-                            texto += f"  Nivel {nivel_final}: {media_final:.2f}\n"
-                            texto += f"  Cambio: {diferencia:+.2f} puntos ({porcentaje:+.2f}%) "
+                            # Aprobado (50-69)
+                            aprobados = df_lengua[(df_lengua[col_lengua] >= 50) & (df_lengua[col_lengua] < 70)][col_numero].sum()
+                            texto += f"  Aprobado (50-69): {aprobados:>8,.0f} ({aprobados/total*100:5.1f}%)\n"
 
-                            if diferencia > 0:
-                                texto += "✅\n"
-                            elif diferencia < 0:
-                                texto += "⚠️\n"
-                            else:
-                                texto += "→\n"
-                        else:
-                            # Si alguno de los valores es None
-                            if media_inicial is not None:
-                                texto += f"  Nivel {nivel_inicial}: {media_inicial:.2f}\n"
-                            else:
-                                texto += f"  Nivel {nivel_inicial}: No disponible\n"
+                            # Notable (70-89)
+                            notables = df_lengua[(df_lengua[col_lengua] >= 70) & (df_lengua[col_lengua] < 90)][col_numero].sum()
+                            texto += f"  Notable (70-89):  {notables:>8,.0f} ({notables/total*100:5.1f}%)\n"
 
-                            if media_final is not None:
-                                texto += f"  Nivel {nivel_final}: {media_final:.2f}\n"
-                            else:
-                                texto += f"  Nivel {nivel_final}: No disponible\n"
+                            # Excelente (90-100)
+                            excelentes = df_lengua[df_lengua[col_lengua] >= 90][col_numero].sum()
+                            texto += f"  Excelente (90-100):{excelentes:>8,.0f} ({excelentes/total*100:5.1f}%)\n"
 
-                            texto += f"  Cambio: No se puede calcular (datos insuficientes) →\n"
-        else:
-            texto += "\nNo hay datos de CENTRE I SUDAMÈRICA en este archivo.\n"
+        # Secciones por grupo: vistas sobre la tabla de competencias
+        resumen_nivel = self.analizador.obtener_resumen_por_nivel_competencias()
+        texto += self._texto_competencias_grupo(
+            "CENTRE I SUDAMÈRICA", self.analizador.obtener_competencias_sudamerica(por_nivel=True), resumen_nivel)
+        texto += self._texto_competencias_grupo(
+            "ESPAÑA", self.analizador.obtener_competencias_espana(por_nivel=True), resumen_nivel)
 
-        # NUEVA SECCIÓN: Análisis específico de ESPAÑA
-        texto += f"\n{'='*70}\n"
-        texto += "📊 ANÁLISIS ESPECÍFICO: ESPAÑA\n"
-        texto += f"{'='*70}\n"
+        return texto
 
-        # Obtener estadísticas por nivel
-        stats_espana_por_nivel = self.analizador.obtener_competencias_espana(por_nivel=True)
+    def _texto_competencias_grupo(self, nombre, stats_por_nivel, resumen_nivel):
+        """Sección del resumen de competencias para un grupo de nacionalidad
 
-        if stats_espana_por_nivel:
-            # Obtener también las medias globales por nivel para comparación
-            resumen_nivel = self.analizador.obtener_resumen_por_nivel_competencias()
+        Args:
+            stats_por_nivel: Resultado de obtener_competencias_*(por_nivel=True)
+            resumen_nivel: Medias globales por nivel, para la comparativa
+        """
+        texto = f"\n{'='*70}\n"
+        texto += f"📊 ANÁLISIS ESPECÍFICO: {nombre}\n"
+        texto += f"{'='*70}\n"
 
-            for nivel in sorted(stats_espana_por_nivel.keys()):
+        if stats_por_nivel:
+            for nivel in sorted(stats_por_nivel.keys()):
                 texto += f"\n--- Nivel {nivel} ---\n"
-                stats_nivel = stats_espana_por_nivel[nivel]
+                stats_nivel = stats_por_nivel[nivel]
 
                 for lengua, datos in stats_nivel.items():
                     texto += f"\n{lengua}:\n"
@@ -1616,20 +3887,20 @@ class VentanaAnalisis:
                             else:
                                 texto += "(⚠️ inferior)\n"
 
-            # Añadir análisis de evolución entre niveles para ESPAÑA
-            niveles_ordenados = sorted(stats_espana_por_nivel.keys())
+            # Añadir análisis de evolución entre niveles del grupo
+            niveles_ordenados = sorted(stats_por_nivel.keys())
             if len(niveles_ordenados) >= 2:
                 texto += f"\n{'─'*70}\n"
-                texto += f"📈 Evolución ESPAÑA ({niveles_ordenados[0]} → {niveles_ordenados[-1]}):\n"
+                texto += f"📈 Evolución {nombre} ({niveles_ordenados[0]} → {niveles_ordenados[-1]}):\n"
                 texto += f"{'─'*70}\n"
 
                 nivel_inicial = niveles_ordenados[0]
                 nivel_final = niveles_ordenados[-1]
 
-                for lengua in stats_espana_por_nivel[nivel_inicial].keys():
-                    if lengua in stats_espana_por_nivel[nivel_final]:
-                        media_inicial = stats_espana_por_nivel[nivel_inicial][lengua]['media']
-                        media_final = stats_espana_por_nivel[nivel_final][lengua]['media']
+                for lengua in stats_por_nivel[nivel_inicial].keys():
+                    if lengua in stats_por_nivel[nivel_final]:
+                        media_inicial = stats_por_nivel[nivel_inicial][lengua]['media']
+                        media_final = stats_por_nivel[nivel_final][lengua]['media']
 
                         texto += f"\n{lengua}:\n"
 
@@ -1662,110 +3933,155 @@ class VentanaAnalisis:
 
                             texto += f"  Cambio: No se puede calcular (datos insuficientes) →\n"
         else:
-            texto += "\nNo hay datos de ESPAÑA en este archivo.\n"
+            texto += f"\nNo hay datos de {nombre} en este archivo.\n"
 
         return texto
 
     def actualizar_filtros(self):
-        """Actualiza los valores de los filtros (comboboxes)"""
-        if self.analizador.df_actual is not None and 'Nivell' in self.analizador.df_actual.columns:
-            niveles = ['Todos'] + sorted(self.analizador.df_actual['Nivell'].unique().tolist())
-            self.combo_nivel['values'] = niveles
-            self.combo_nivel.current(0)
+        """Actualiza los valores de los filtros (comboboxes) con los del dataset completo"""
+        if 'datos' not in self.pestanas_creadas:
+            return
+
+        for campo, combo in self.combos_filtro.items():
+            valores = self.analizador.valores_filtro(campo)
+            self.valores_combos_filtro[campo] = valores
+            combo['values'] = ['Todos'] + [str(valor) for valor in valores]
+            combo.current(0)
+            combo.configure(state='readonly' if valores else 'disabled')
+        self.entry_filtro_centro.delete(0, tk.END)
+        self.actualizar_etiqueta_filtro()
+
+    def filtro_seleccionado(self):
+        """Filtro {campo: valores} elegido en los controles de la pestaña Datos"""
+        filtro = {}
+        for campo, combo in self.combos_filtro.items():
+            # La posición 0 es 'Todos'; el resto, los valores con su tipo original
+            posicion = combo.current()
+            if posicion > 0:
+                filtro[campo] = [self.valores_combos_filtro[campo][posicion - 1]]
+        codigos = [interpretar_codigo_centro(codigo) for codigo in
+                   re.split(r'[\s,;]+', self.entry_filtro_centro.get()) if codigo]
+        if codigos:
+            filtro['centro'] = codigos
+        return filtro
+
+    def aplicar_filtro(self):
+        """Activa el filtro elegido para el archivo actual (todas las pestañas salvo Comparaciones)"""
+        if self.analizador.df_actual is None:
+            messagebox.showwarning("Advertencia", "No hay datos cargados")
+            return
+
+        filtro = self.filtro_seleccionado()
+
+        def aplicar():
+            try:
+                self.analizador.establecer_filtro(filtro)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+
+            self.actualizar_etiqueta_filtro()
+            self.actualizar_resumen()
+            self.actualizar_tabla()
+
+        self.cambiar_datos(aplicar)
+
+    def actualizar_etiqueta_filtro(self):
+        """Muestra cuántas filas deja pasar el filtro activo"""
+        entrada = self.analizador.dataframes.get(self.analizador.nombre_archivo_actual)
+        if entrada is None or not self.analizador.filtro:
+            self.label_filtro.config(text="Sin filtro")
+            return
+        self.label_filtro.config(
+            text=f"Filtro activo: {len(self.analizador.df_actual):,} de {entrada.filas:,} filas")
 
     # ========== GRÁFICOS PARA EVALUACIÓN ==========
 
+    @grafico_memorizado('frame_grafico')
     def grafico_por_nivel(self):
         """Genera gráfico de barras por nivel (Evaluación)"""
         if self.analizador.df_actual is None:
             messagebox.showwarning("Advertencia", "No hay datos cargados")
             return
 
-        # Limpiar frame anterior
-        for widget in self.frame_grafico.winfo_children():
-            widget.destroy()
+        resumen = self.analizador.obtener_resumen_por_nivel_evaluacion()
+        if resumen is None:
+            messagebox.showwarning("Advertencia", "No se encontró la columna de nivel")
+            return
 
         # Crear figura
-        fig, ax = plt.subplots(figsize=(10, 6))
+        fig = self.figuras.figura(self.frame_grafico, figsize=(10, 6))
+        ax = fig.subplots()
 
-        resumen = self.analizador.obtener_resumen_por_nivel_evaluacion()
-        if resumen is not None:
-            resumen.plot(kind='bar', ax=ax, color='steelblue')
-            ax.set_title('Número de Estudiantes Evaluados por Nivel', fontsize=14, fontweight='bold')
-            ax.set_xlabel('Nivel', fontsize=12)
-            ax.set_ylabel('Número de Estudiantes', fontsize=12)
-            ax.tick_params(axis='x', rotation=0)
+        resumen.plot(kind='bar', ax=ax, color='steelblue')
+        ax.set_title('Número de Estudiantes Evaluados por Nivel', fontsize=14, fontweight='bold')
+        ax.set_xlabel('Nivel', fontsize=12)
+        ax.set_ylabel('Número de Estudiantes', fontsize=12)
+        ax.tick_params(axis='x', rotation=0)
 
-            # Añadir valores en las barras
-            for i, v in enumerate(resumen):
-                ax.text(i, v + max(resumen)*0.01, f'{int(v):,}',
-                       ha='center', va='bottom', fontsize=10)
+        # Añadir valores en las barras
+        for i, v in enumerate(resumen):
+            ax.text(i, v + max(resumen)*0.01, f'{int(v):,}',
+                   ha='center', va='bottom', fontsize=10)
 
-            plt.tight_layout()
+        fig.tight_layout()
 
-            # Integrar en tkinter
-            canvas = FigureCanvasTkAgg(fig, master=self.frame_grafico)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        # Integrar en tkinter
+        self.figuras.mostrar(self.frame_grafico)
 
+    @grafico_memorizado('frame_grafico')
     def grafico_por_consecuencias(self):
         """Genera gráfico por consecuencias de evaluación"""
         if self.analizador.df_actual is None:
             messagebox.showwarning("Advertencia", "No hay datos cargados")
             return
 
-        # Limpiar frame anterior
-        for widget in self.frame_grafico.winfo_children():
-            widget.destroy()
+        resumen = self.analizador.obtener_resumen_por_consecuencia()
+        if resumen is None:
+            messagebox.showwarning("Advertencia", "No se encontró la columna de consecuencias")
+            return
 
         # Crear figura
-        fig, ax = plt.subplots(figsize=(12, 6))
+        fig = self.figuras.figura(self.frame_grafico, figsize=(12, 6))
+        ax = fig.subplots()
 
-        resumen = self.analizador.obtener_resumen_por_consecuencia()
-        if resumen is not None:
-            resumen = resumen.sort_values(ascending=False)
-            resumen.plot(kind='barh', ax=ax, color='coral')
-            ax.set_title('Distribución por Consecuencias de Evaluación',
-                        fontsize=14, fontweight='bold')
-            ax.set_xlabel('Número de Estudiantes', fontsize=12)
-            ax.set_ylabel('Consecuencia', fontsize=12)
+        resumen = resumen.sort_values(ascending=False)
+        resumen.plot(kind='barh', ax=ax, color='coral')
+        ax.set_title('Distribución por Consecuencias de Evaluación',
+                    fontsize=14, fontweight='bold')
+        ax.set_xlabel('Número de Estudiantes', fontsize=12)
+        ax.set_ylabel('Consecuencia', fontsize=12)
 
-            # Añadir valores en las barras
-            for i, v in enumerate(resumen):
-                ax.text(v + max(resumen)*0.01, i, f'{int(v):,}',
-                       ha='left', va='center', fontsize=9)
+        # Añadir valores en las barras
+        for i, v in enumerate(resumen):
+            ax.text(v + max(resumen)*0.01, i, f'{int(v):,}',
+                   ha='left', va='center', fontsize=9)
 
-            plt.tight_layout()
+        fig.tight_layout()
 
-            # Integrar en tkinter
-            canvas = FigureCanvasTkAgg(fig, master=self.frame_grafico)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-        else:
-            messagebox.showwarning("Advertencia", "No se encontró la columna de consecuencias")
+        # Integrar en tkinter
+        self.figuras.mostrar(self.frame_grafico)
 
+    @grafico_memorizado('frame_grafico')
     def grafico_por_nacionalidad(self):
         """Genera gráfico por zona de nacionalidad"""
         if self.analizador.df_actual is None:
             messagebox.showwarning("Advertencia", "No hay datos cargados")
             return
 
-        col_nacionalidad = self.analizador.buscar_columna(['Zona', 'Nacionalitat'])
-        col_numero = self.analizador.buscar_columna(['mero', 'Avalua'])
+        col_nacionalidad = self.analizador.columna('nacionalidad')
+        col_numero = self.analizador.columna('numero')
 
         if col_nacionalidad is None or col_numero is None:
             messagebox.showwarning("Advertencia", "Columnas necesarias no encontradas")
             return
 
-        # Limpiar frame anterior
-        for widget in self.frame_grafico.winfo_children():
-            widget.destroy()
-
         # Crear figura
-        fig, ax = plt.subplots(figsize=(12, 8))
+        fig = self.figuras.figura(self.frame_grafico, figsize=(12, 8))
+        ax = fig.subplots()
 
-        resumen = self.analizador.df_actual.groupby(col_nacionalidad)[col_numero].sum()
-        resumen = resumen.sort_values(ascending=False).head(15)  # Top 15
+        # Estudiantes por nacionalidad, de mayor a menor (ver obtener_resumen_diversidad)
+        resumen = self.analizador.obtener_resumen_diversidad()['top_nacionalidades'].head(15)  # Top 15
 
         resumen.plot(kind='barh', ax=ax, color='mediumseagreen')
         ax.set_title('Top 15 Zonas de Nacionalidad',
@@ -1778,13 +4094,12 @@ class VentanaAnalisis:
             ax.text(v + max(resumen)*0.01, i, f'{int(v):,}',
                    ha='left', va='center', fontsize=9)
 
-        plt.tight_layout()
+        fig.tight_layout()
 
         # Integrar en tkinter
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_grafico)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.figuras.mostrar(self.frame_grafico)
 
+    @grafico_memorizado('frame_grafico')
     def grafico_aulas_acollida(self):
         """Genera gráfico para Aulas de Acogida"""
         if self.analizador.df_actual is None:
@@ -1796,12 +4111,8 @@ class VentanaAnalisis:
             messagebox.showwarning("Advertencia", "No hay datos de Aulas de Acogida en este archivo")
             return
 
-        # Limpiar frame anterior
-        for widget in self.frame_grafico.winfo_children():
-            widget.destroy()
-
         # Crear figura con 3 subplots
-        fig = plt.figure(figsize=(14, 10))
+        fig = self.figuras.figura(self.frame_grafico, figsize=(14, 10))
         gs = fig.add_gridspec(2, 2, hspace=0.3, wspace=0.3)
         ax1 = fig.add_subplot(gs[0, :])  # Gráfico superior ocupa toda la fila
         ax2 = fig.add_subplot(gs[1, 0])
@@ -1863,77 +4174,70 @@ class VentanaAnalisis:
                 bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
 
         # Integrar en tkinter
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_grafico)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.figuras.mostrar(self.frame_grafico)
 
     # ========== GRÁFICOS PARA COMPETENCIAS ==========
 
+    @grafico_memorizado('frame_grafico')
     def grafico_competencias_por_nivel(self):
         """Genera gráfico de medias de competencias por nivel"""
         if self.analizador.df_actual is None:
             messagebox.showwarning("Advertencia", "No hay datos cargados")
             return
 
-        # Limpiar frame anterior
-        for widget in self.frame_grafico.winfo_children():
-            widget.destroy()
+        resumen = self.analizador.obtener_resumen_por_nivel_competencias()
+        if not resumen:
+            messagebox.showwarning("Advertencia", "No se pudieron calcular las competencias")
+            return
 
         # Crear figura
-        fig, ax = plt.subplots(figsize=(10, 6))
+        fig = self.figuras.figura(self.frame_grafico, figsize=(10, 6))
+        ax = fig.subplots()
 
-        resumen = self.analizador.obtener_resumen_por_nivel_competencias()
-        if resumen:
-            x = np.arange(len(resumen.get('Català', pd.DataFrame()).index))
-            width = 0.35
+        x = np.arange(len(resumen.get('Català', pd.DataFrame()).index))
+        width = 0.35
 
-            if 'Català' in resumen:
-                df_cat = resumen['Català']
-                col_mit_cat = [c for c in df_cat.columns if 'mitjana' in c][0]
-                medias_cat = df_cat[col_mit_cat].values
-                ax.bar(x - width/2, medias_cat, width, label='Català', color='steelblue')
-
-            if 'Castellà' in resumen:
-                df_cas = resumen['Castellà']
-                col_mit_cas = [c for c in df_cas.columns if 'mitjana' in c][0]
-                medias_cas = df_cas[col_mit_cas].values
-                ax.bar(x + width/2, medias_cas, width, label='Castellà', color='coral')
-
-            ax.set_xlabel('Nivel', fontsize=12)
-            ax.set_ylabel('Media', fontsize=12)
-            ax.set_title('Medias de Competencias por Nivel', fontsize=14, fontweight='bold')
-            ax.set_xticks(x)
-            ax.set_xticklabels(df_cat.index if 'Català' in resumen else df_cas.index)
-            ax.legend()
-            ax.set_ylim(0, 100)
-            ax.grid(axis='y', alpha=0.3)
-
-            plt.tight_layout()
-
-            # Integrar en tkinter
-            canvas = FigureCanvasTkAgg(fig, master=self.frame_grafico)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-        else:
-            messagebox.showwarning("Advertencia", "No se pudieron calcular las competencias")
+        if 'Català' in resumen:
+            df_cat = resumen['Català']
+            col_mit_cat = [c for c in df_cat.columns if 'mitjana' in c][0]
+            medias_cat = df_cat[col_mit_cat].values
+            ax.bar(x - width/2, medias_cat, width, label='Català', color='steelblue')
+
+        if 'Castellà' in resumen:
+            df_cas = resumen['Castellà']
+            col_mit_cas = [c for c in df_cas.columns if 'mitjana' in c][0]
+            medias_cas = df_cas[col_mit_cas].values
+            ax.bar(x + width/2, medias_cas, width, label='Castellà', color='coral')
+
+        ax.set_xlabel('Nivel', fontsize=12)
+        ax.set_ylabel('Media', fontsize=12)
+        ax.set_title('Medias de Competencias por Nivel', fontsize=14, fontweight='bold')
+        ax.set_xticks(x)
+        ax.set_xticklabels(df_cat.index if 'Català' in resumen else df_cas.index)
+        ax.legend()
+        ax.set_ylim(0, 100)
+        ax.grid(axis='y', alpha=0.3)
+
+        fig.tight_layout()
+
+        # Integrar en tkinter
+        self.figuras.mostrar(self.frame_grafico)
 
+    @grafico_memorizado('frame_grafico')
     def grafico_comparacion_lenguas(self):
         """Genera gráfico comparando Català y Castellà"""
         if self.analizador.df_actual is None:
             messagebox.showwarning("Advertencia", "No hay datos cargados")
             return
 
-        # Limpiar frame anterior
-        for widget in self.frame_grafico.winfo_children():
-            widget.destroy()
-
         stats = self.analizador.obtener_estadisticas_competencias()
         if not stats:
             messagebox.showwarning("Advertencia", "No se pudieron calcular estadísticas")
             return
 
         # Crear figura con 2 subplots
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
+        fig = self.figuras.figura(self.frame_grafico, figsize=(14, 6))
+        ax1, ax2 = fig.subplots(1, 2)
 
         lenguas = list(stats.keys())
         medias = [stats[l]['media_global'] for l in lenguas]
@@ -1963,44 +4267,37 @@ class VentanaAnalisis:
             ax2.text(bar.get_x() + bar.get_width()/2., height + 0.1,
                     f'{std:.2f}', ha='center', va='bottom', fontsize=10)
 
-        plt.tight_layout()
+        fig.tight_layout()
 
         # Integrar en tkinter
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_grafico)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.figuras.mostrar(self.frame_grafico)
 
+    @grafico_memorizado('frame_grafico')
     def grafico_distribucion_notas(self):
         """Genera histograma de distribución de notas"""
         if self.analizador.df_actual is None:
             messagebox.showwarning("Advertencia", "No hay datos cargados")
             return
 
-        # Limpiar frame anterior
-        for widget in self.frame_grafico.winfo_children():
-            widget.destroy()
-
-        col_cat = self.analizador.buscar_columna(['Catal', 'mitjana'])
-        col_cas = self.analizador.buscar_columna(['Castell', 'mitjana'])
+        col_cat = self.analizador.columna('mitjana_catala')
+        col_cas = self.analizador.columna('mitjana_castella')
 
         if col_cat is None and col_cas is None:
             messagebox.showwarning("Advertencia", "No se encontraron columnas de medias")
             return
 
-        # Crear figura
-        fig, ax = plt.subplots(figsize=(12, 6))
+        distribucion = self.analizador.obtener_distribucion_notas()
 
-        if col_cat:
-            # Convertir a numérico antes de graficar
-            datos_cat = pd.to_numeric(self.analizador.df_actual[col_cat], errors='coerce').dropna()
-            ax.hist(datos_cat, bins=20, alpha=0.6,
-                   label='Català', color='steelblue', edgecolor='black')
+        # Crear figura
+        fig = self.figuras.figura(self.frame_grafico, figsize=(12, 6))
+        ax = fig.subplots()
 
-        if col_cas:
-            # Convertir a numérico antes de graficar
-            datos_cas = pd.to_numeric(self.analizador.df_actual[col_cas], errors='coerce').dropna()
-            ax.hist(datos_cas, bins=20, alpha=0.6,
-                   label='Castellà', color='coral', edgecolor='black')
+        # Histogramas ya calculados: cada intervalo se dibuja con su frecuencia como peso
+        for lengua, color in [('Català', 'steelblue'), ('Castellà', 'coral')]:
+            if lengua in distribucion:
+                frecuencias, bordes = distribucion[lengua]
+                ax.hist(bordes[:-1], bins=bordes, weights=frecuencias, alpha=0.6,
+                       label=lengua, color=color, edgecolor='black')
 
         ax.set_title('Distribución de Notas Medias', fontsize=14, fontweight='bold')
         ax.set_xlabel('Nota Media', fontsize=12)
@@ -2008,15 +4305,14 @@ class VentanaAnalisis:
         ax.legend()
         ax.grid(axis='y', alpha=0.3)
 
-        plt.tight_layout()
+        fig.tight_layout()
 
         # Integrar en tkinter
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_grafico)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.figuras.mostrar(self.frame_grafico)
 
     # ========== GRÁFICOS ESPECÍFICOS PARA SUDAMÉRICA ==========
 
+    @grafico_memorizado('frame_grafico')
     def grafico_sudamerica_evaluacion(self):
         """Genera gráfico comparativo para CENTRE I SUDAMÈRICA (Evaluación)"""
         if self.analizador.df_actual is None:
@@ -2028,12 +4324,9 @@ class VentanaAnalisis:
             messagebox.showwarning("Advertencia", "No hay datos de CENTRE I SUDAMÈRICA en este archivo")
             return
 
-        # Limpiar frame anterior
-        for widget in self.frame_grafico.winfo_children():
-            widget.destroy()
-
         # Crear figura con 2 subplots
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
+        fig = self.figuras.figura(self.frame_grafico, figsize=(14, 6))
+        ax1, ax2 = fig.subplots(1, 2)
 
         # Gráfico 1: Distribución por nivel (Sudamérica vs Total)
         resumen_total = self.analizador.obtener_resumen_por_nivel_evaluacion()
@@ -2068,13 +4361,12 @@ class VentanaAnalisis:
             ax2.text(bar.get_x() + bar.get_width()/2., height + 2,
                     f'{valor:.1f}%', ha='center', va='bottom', fontsize=11, fontweight='bold')
 
-        plt.tight_layout()
+        fig.tight_layout()
 
         # Integrar en tkinter
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_grafico)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.figuras.mostrar(self.frame_grafico)
 
+    @grafico_memorizado('frame_grafico')
     def grafico_sudamerica_competencias(self):
         """Genera gráfico comparativo para CENTRE I SUDAMÈRICA (Competencias)"""
         if self.analizador.df_actual is None:
@@ -2088,12 +4380,9 @@ class VentanaAnalisis:
 
         stats_total = self.analizador.obtener_estadisticas_competencias()
 
-        # Limpiar frame anterior
-        for widget in self.frame_grafico.winfo_children():
-            widget.destroy()
-
         # Crear figura
-        fig, ax = plt.subplots(figsize=(12, 6))
+        fig = self.figuras.figura(self.frame_grafico, figsize=(12, 6))
+        ax = fig.subplots()
 
         lenguas = list(stats_sudamerica.keys())
         x = np.arange(len(lenguas))
@@ -2121,15 +4410,14 @@ class VentanaAnalisis:
                 ax.text(bar.get_x() + bar.get_width()/2., height + 1,
                        f'{height:.1f}', ha='center', va='bottom', fontsize=10)
 
-        plt.tight_layout()
+        fig.tight_layout()
 
         # Integrar en tkinter
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_grafico)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.figuras.mostrar(self.frame_grafico)
 
     # ========== GRÁFICOS ESPECÍFICOS PARA ESPAÑA ==========
 
+    @grafico_memorizado('frame_grafico')
     def grafico_espana_evaluacion(self):
         """Genera gráfico y análisis para estudiantes de ESPAÑA (nativos)"""
         if self.analizador.df_actual is None:
@@ -2141,12 +4429,8 @@ class VentanaAnalisis:
             messagebox.showwarning("Advertencia", "No hay datos de estudiantes de ESPAÑA en este archivo")
             return
 
-        # Limpiar frame anterior
-        for widget in self.frame_grafico.winfo_children():
-            widget.destroy()
-
         # Crear figura con 2 filas
-        fig = plt.figure(figsize=(14, 10))
+        fig = self.figuras.figura(self.frame_grafico, figsize=(14, 10))
         gs = fig.add_gridspec(2, 2, hspace=0.3, wspace=0.3)
         ax1 = fig.add_subplot(gs[0, 0])
         ax2 = fig.add_subplot(gs[0, 1])
@@ -2196,7 +4480,7 @@ class VentanaAnalisis:
             else:
                 top_consecuencias = consecuencias
 
-            colors = plt.cm.Set3(range(len(top_consecuencias)))
+            colors = self.figuras.colores('Set3', range(len(top_consecuencias)))
             bars3 = ax3.bar(range(len(top_consecuencias)), top_consecuencias.values, color=colors)
             ax3.set_xlabel('Consecuencias de Evaluación', fontsize=12)
             ax3.set_ylabel('Número de Estudiantes', fontsize=12)
@@ -2213,13 +4497,11 @@ class VentanaAnalisis:
                         f'{int(valor)}\n({porcentaje:.1f}%)',
                         ha='center', va='bottom', fontsize=9, fontweight='bold')
 
-        plt.suptitle(f'ANÁLISIS ESTUDIANTES DE ESPAÑA (Nativos) - Total: {int(stats_espana["total_estudiantes"])} estudiantes',
+        fig.suptitle(f'ANÁLISIS ESTUDIANTES DE ESPAÑA (Nativos) - Total: {int(stats_espana["total_estudiantes"])} estudiantes',
                      fontsize=16, fontweight='bold', y=0.98)
 
         # Integrar en tkinter
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_grafico)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.figuras.mostrar(self.frame_grafico)
 
     # ========== TABLA DE DATOS ==========
 
@@ -2228,35 +4510,19 @@ class VentanaAnalisis:
         if self.analizador.df_actual is None:
             return
 
-        # Limpiar tabla
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        # Obtener filtro
-        nivel_seleccionado = self.combo_nivel.get()
-
-        # Filtrar datos
-        if nivel_seleccionado == 'Todos' or nivel_seleccionado == '':
-            df_filtrado = self.analizador.df_actual
-        else:
-            df_filtrado = self.analizador.df_actual[
-                self.analizador.df_actual['Nivell'] == nivel_seleccionado
-            ]
-
-        # Configurar columnas
-        self.tree['columns'] = list(df_filtrado.columns)
-        for col in df_filtrado.columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=120)
-
-        # Insertar datos (limitar a primeras 1000 filas para performance)
-        for idx, row in df_filtrado.head(1000).iterrows():
-            self.tree.insert('', 'end', values=list(row))
+        # df_actual ya tiene aplicado el filtro activo; la tabla recorre todas sus filas
+        df_filtrado = self.analizador.df_actual
+        self.tabla_datos.mostrar(df_filtrado, columnas_visibles(df_filtrado))
 
     def mostrar_todos_datos(self):
-        """Muestra todos los datos sin filtrar"""
-        self.combo_nivel.set('Todos')
-        self.actualizar_tabla()
+        """Quita el filtro activo y muestra todos los datos"""
+        def quitar_filtro():
+            self.analizador.establecer_filtro({})
+            self.actualizar_filtros()
+            self.actualizar_resumen()
+            self.actualizar_tabla()
+
+        self.cambiar_datos(quitar_filtro)
 
     def exportar_excel(self):
         """Exporta los datos filtrados a Excel"""
@@ -2271,14 +4537,9 @@ class VentanaAnalisis:
 
         if ruta:
             try:
-                nivel_seleccionado = self.combo_nivel.get()
-                if nivel_seleccionado == 'Todos' or nivel_seleccionado == '':
-                    df_exportar = self.analizador.df_actual
-                else:
-                    df_exportar = self.analizador.df_actual[
-                        self.analizador.df_actual['Nivell'] == nivel_seleccionado
-                    ]
-
+                # df_actual ya tiene aplicado el filtro activo
+                df_exportar = self.analizador.df_actual
+                df_exportar = df_exportar[columnas_visibles(df_exportar)]
                 df_exportar.to_excel(ruta, index=False, engine='openpyxl')
                 messagebox.showinfo("Éxito", f"Datos exportados correctamente a:\n{ruta}")
             except Exception as e:
@@ -2286,6 +4547,7 @@ class VentanaAnalisis:
 
     # ========== COMPARACIONES ==========
 
+    @grafico_memorizado('frame_comparacion', 'huella_panel')
     def comparar_evolucion_niveles(self):
         """Compara la evolución de estudiantes por nivel entre diferentes cursos (Evaluación)"""
         if len(self.analizador.dataframes) < 2:
@@ -2293,32 +4555,21 @@ class VentanaAnalisis:
                                  "Necesitas cargar al menos 2 archivos para comparar")
             return
 
-        # Limpiar frame anterior
-        for widget in self.frame_comparacion.winfo_children():
-            widget.destroy()
-
-        # Crear figura
-        fig, ax = plt.subplots(figsize=(12, 7))
-
-        # Recopilar datos de todos los archivos de tipo EVALUACION
-        datos_comparacion = {}
-        for nombre, info in self.analizador.dataframes.items():
-            df = info['df']
-            tipo = info['tipo']
+        # Estudiantes por nivel y curso, de una agrupación sobre el panel de cursos
+        evolucion = self.analizador.obtener_evolucion_niveles()
 
-            if tipo == TipoCSV.EVALUACION:
-                col_numero = self.analizador.buscar_columna(['mero', 'Avalua'])
-                if 'Nivell' in df.columns and col_numero:
-                    resumen = df.groupby('Nivell')[col_numero].sum()
-                    datos_comparacion[nombre] = resumen
-
-        if not datos_comparacion:
+        if evolucion is None:
             messagebox.showwarning("Advertencia", "No hay suficientes archivos de evaluación")
             return
 
+        # Crear figura
+        fig = self.figuras.figura(self.frame_comparacion, figsize=(12, 7))
+        ax = fig.subplots()
+
         # Crear gráfico de líneas
-        for nombre, datos in datos_comparacion.items():
-            ax.plot(datos.index, datos.values, marker='o', label=nombre, linewidth=2)
+        for curso, datos in evolucion.items():
+            datos = datos.dropna()
+            ax.plot(datos.index, datos.values, marker='o', label=curso, linewidth=2)
 
         ax.set_title('Evolución de Estudiantes por Nivel (Comparación entre Cursos)',
                     fontsize=14, fontweight='bold')
@@ -2327,13 +4578,12 @@ class VentanaAnalisis:
         ax.legend(loc='best')
         ax.grid(True, alpha=0.3)
 
-        plt.tight_layout()
+        fig.tight_layout()
 
         # Integrar en tkinter
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_comparacion)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.figuras.mostrar(self.frame_comparacion)
 
+    @grafico_memorizado('frame_comparacion', 'huella_panel')
     def comparar_tasas_promocion(self):
         """Compara tasas de promoción entre diferentes cursos"""
         if len(self.analizador.dataframes) < 2:
@@ -2341,43 +4591,20 @@ class VentanaAnalisis:
                                  "Necesitas cargar al menos 2 archivos para comparar")
             return
 
-        # Limpiar frame anterior
-        for widget in self.frame_comparacion.winfo_children():
-            widget.destroy()
+        # Calcular tasas de promoción por curso sobre el panel de cursos
+        tasas_cursos = self.analizador.obtener_tasas_promocion_cursos()
 
-        # Crear figura
-        fig, ax = plt.subplots(figsize=(12, 7))
-
-        # Calcular tasas de promoción
-        datos_promocion = {}
-        for nombre, info in self.analizador.dataframes.items():
-            df = info['df']
-            tipo = info['tipo']
-
-            if tipo == TipoCSV.EVALUACION:
-                # Buscar columnas correctas
-                col_consecuencias = None
-                col_numero = None
-
-                for col in df.columns:
-                    if 'Conseq' in col and 'Avalua' in col:
-                        col_consecuencias = col
-                    if 'mero' in col and 'Avalua' in col:
-                        col_numero = col
-
-                if col_consecuencias and col_numero:
-                    total = df[col_numero].sum()
-                    promovidos = df[df[col_consecuencias].str.contains('Promociona', na=False)][col_numero].sum()
-                    tasa = (promovidos / total * 100) if total > 0 else 0
-                    datos_promocion[nombre] = tasa
-
-        if not datos_promocion:
+        if tasas_cursos is None or len(tasas_cursos) == 0:
             messagebox.showwarning("Advertencia", "No se pudieron calcular las tasas de promoción")
             return
 
+        # Crear figura
+        fig = self.figuras.figura(self.frame_comparacion, figsize=(12, 7))
+        ax = fig.subplots()
+
         # Crear gráfico de barras
-        cursos = list(datos_promocion.keys())
-        tasas = list(datos_promocion.values())
+        cursos = [str(curso) for curso in tasas_cursos.index]
+        tasas = list(tasas_cursos.values)
 
         bars = ax.bar(range(len(cursos)), tasas, color='lightgreen', edgecolor='darkgreen')
         ax.set_xticks(range(len(cursos)))
@@ -2392,13 +4619,46 @@ class VentanaAnalisis:
             ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 1,
                    f'{tasa:.1f}%', ha='center', va='bottom', fontsize=10, fontweight='bold')
 
-        plt.tight_layout()
+        fig.tight_layout()
+
+        # Integrar en tkinter
+        self.figuras.mostrar(self.frame_comparacion)
+
+    @grafico_memorizado('frame_comparacion', 'huella_panel')
+    def comparar_tasas_promocion_grupos(self):
+        """Compara las tasas de promoción de cada grupo de nacionalidad entre cursos"""
+        if len(self.analizador.dataframes) < 2:
+            messagebox.showwarning("Advertencia",
+                                 "Necesitas cargar al menos 2 archivos para comparar")
+            return
+
+        tasas_grupos = self.analizador.obtener_tasas_promocion_cursos(por_grupo=True)
+        if tasas_grupos is None or len(tasas_grupos) == 0:
+            messagebox.showwarning("Advertencia", "No se pudieron calcular las tasas de promoción")
+            return
+
+        fig = self.figuras.figura(self.frame_comparacion, figsize=(12, 7))
+        ax = fig.subplots()
+
+        cursos = [str(curso) for curso in tasas_grupos.index]
+        for grupo, tasas in tasas_grupos.items():
+            ax.plot(range(len(cursos)), tasas.values, marker='o', label=grupo, linewidth=2)
+
+        ax.set_xticks(range(len(cursos)))
+        ax.set_xticklabels(cursos, rotation=45, ha='right')
+        ax.set_title('Tasas de Promoción por Grupo de Nacionalidad y Curso',
+                    fontsize=14, fontweight='bold')
+        ax.set_ylabel('Tasa de Promoción (%)', fontsize=12)
+        ax.set_ylim(0, 100)
+        ax.legend(loc='best')
+        ax.grid(True, alpha=0.3)
+
+        fig.tight_layout()
 
         # Integrar en tkinter
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_comparacion)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.figuras.mostrar(self.frame_comparacion)
 
+    @grafico_memorizado('frame_comparacion', 'huella_panel')
     def comparar_evolucion_competencias(self):
         """Compara la evolución de las medias de competencias entre cursos"""
         if len(self.analizador.dataframes) < 2:
@@ -2406,39 +4666,24 @@ class VentanaAnalisis:
                                  "Necesitas cargar al menos 2 archivos para comparar")
             return
 
-        # Limpiar frame anterior
-        for widget in self.frame_comparacion.winfo_children():
-            widget.destroy()
+        # Medias por curso sobre el panel de cursos
+        evolucion = self.analizador.obtener_evolucion_competencias()
 
-        # Crear figura
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
-
-        # Recopilar datos
-        datos_catala = {}
-        datos_castella = {}
-
-        for nombre, info in self.analizador.dataframes.items():
-            df = info['df']
-            tipo = info['tipo']
-
-            if tipo == TipoCSV.COMPETENCIAS:
-                # Buscar columnas
-                for col in df.columns:
-                    if 'Catal' in col and 'mitjana' in col:
-                        # Convertir a numérico antes de calcular media
-                        datos_catala[nombre] = pd.to_numeric(df[col], errors='coerce').mean()
-                    if 'Castell' in col and 'mitjana' in col:
-                        # Convertir a numérico antes de calcular media
-                        datos_castella[nombre] = pd.to_numeric(df[col], errors='coerce').mean()
-
-        if not datos_catala and not datos_castella:
+        if evolucion is None:
             messagebox.showwarning("Advertencia", "No hay suficientes archivos de competencias")
             return
 
+        # Crear figura
+        fig = self.figuras.figura(self.frame_comparacion, figsize=(14, 6))
+        ax1, ax2 = fig.subplots(1, 2)
+
+        datos_catala = evolucion['Català'].dropna() if 'Català' in evolucion else pd.Series(dtype=float)
+        datos_castella = evolucion['Castellà'].dropna() if 'Castellà' in evolucion else pd.Series(dtype=float)
+
         # Gráfico Català
-        if datos_catala:
-            cursos = list(datos_catala.keys())
-            medias = list(datos_catala.values())
+        if len(datos_catala) > 0:
+            cursos = [str(curso) for curso in datos_catala.index]
+            medias = list(datos_catala.values)
             ax1.plot(range(len(cursos)), medias, marker='o', linewidth=2, color='steelblue')
             ax1.set_xticks(range(len(cursos)))
             ax1.set_xticklabels(cursos, rotation=45, ha='right')
@@ -2451,9 +4696,9 @@ class VentanaAnalisis:
                 ax1.text(i, media + 2, f'{media:.1f}', ha='center', fontsize=9)
 
         # Gráfico Castellà
-        if datos_castella:
-            cursos = list(datos_castella.keys())
-            medias = list(datos_castella.values())
+        if len(datos_castella) > 0:
+            cursos = [str(curso) for curso in datos_castella.index]
+            medias = list(datos_castella.values)
             ax2.plot(range(len(cursos)), medias, marker='o', linewidth=2, color='coral')
             ax2.set_xticks(range(len(cursos)))
             ax2.set_xticklabels(cursos, rotation=45, ha='right')
@@ -2465,32 +4710,27 @@ class VentanaAnalisis:
             for i, media in enumerate(medias):
                 ax2.text(i, media + 2, f'{media:.1f}', ha='center', fontsize=9)
 
-        plt.tight_layout()
+        fig.tight_layout()
 
         # Integrar en tkinter
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_comparacion)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.figuras.mostrar(self.frame_comparacion)
 
     # ==================== PESTAÑA 5: AULAS DE ACOGIDA DETALLADO ====================
 
-    def crear_pestana_aulas_acogida_detalle(self):
+    def crear_pestana_aulas_acogida_detalle(self, frame):
         """Crea la pestaña de análisis detallado de aulas de acogida"""
-        frame = ttk.Frame(self.notebook)
-        self.notebook.add(frame, text="🏫 Aulas Acogida Detalle")
-
         # Frame de controles
         frame_controles = ttk.Frame(frame)
         frame_controles.pack(side=tk.TOP, fill=tk.X, padx=5, pady=5)
 
         ttk.Button(frame_controles, text="📊 Análisis Completo",
-                   command=self.mostrar_analisis_completo_aulas).grid(row=0, column=0, padx=5)
+                   command=self.vista('aulas', self.mostrar_analisis_completo_aulas)).grid(row=0, column=0, padx=5)
         ttk.Button(frame_controles, text="📈 Por Nivel y Nacionalidad",
-                   command=self.grafico_nivel_nacionalidad_aulas).grid(row=0, column=1, padx=5)
+                   command=self.vista('aulas', self.grafico_nivel_nacionalidad_aulas)).grid(row=0, column=1, padx=5)
         ttk.Button(frame_controles, text="✅ Promoción por Nacionalidad",
-                   command=self.grafico_promocion_por_nacionalidad_aulas).grid(row=0, column=2, padx=5)
+                   command=self.vista('aulas', self.grafico_promocion_por_nacionalidad_aulas)).grid(row=0, column=2, padx=5)
         ttk.Button(frame_controles, text="📊 Tabla Detallada",
-                   command=self.mostrar_tabla_detallada_aulas).grid(row=0, column=3, padx=5)
+                   command=self.vista('aulas', self.mostrar_tabla_detallada_aulas)).grid(row=0, column=3, padx=5)
 
         # Frame para contenido
         self.frame_contenido_aulas_detalle = ttk.Frame(frame)
@@ -2596,17 +4836,16 @@ class VentanaAnalisis:
 
         texto_widget.insert(tk.END, texto)
 
+    @grafico_memorizado('frame_contenido_aulas_detalle')
     def grafico_nivel_nacionalidad_aulas(self):
         """Gráfico de distribución por nivel y nacionalidad"""
-        for widget in self.frame_contenido_aulas_detalle.winfo_children():
-            widget.destroy()
-
         datos = self.analizador.obtener_analisis_detallado_aulas_acollida()
         if not datos or 'nivel_x_nacionalidad' not in datos:
             messagebox.showwarning("Advertencia", "No hay datos suficientes")
             return
 
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
+        fig = self.figuras.figura(self.frame_contenido_aulas_detalle, figsize=(14, 6))
+        ax1, ax2 = fig.subplots(1, 2)
 
         # Gráfico 1: Por nivel
         if 'por_nivel' in datos:
@@ -2626,7 +4865,7 @@ class VentanaAnalisis:
         # Gráfico 2: Top 8 nacionalidades
         if 'por_nacionalidad' in datos:
             top_nac = datos['por_nacionalidad'].head(8)
-            colors = plt.cm.Oranges(np.linspace(0.4, 0.9, len(top_nac)))
+            colors = self.figuras.colores('Oranges', np.linspace(0.4, 0.9, len(top_nac)))
             bars = ax2.barh(range(len(top_nac)), top_nac.values, color=colors, edgecolor='black')
             ax2.set_yticks(range(len(top_nac)))
             ax2.set_yticklabels([nac[:25] for nac in top_nac.index])
@@ -2638,54 +4877,27 @@ class VentanaAnalisis:
                 ax2.text(valor + max(top_nac.values)*0.01, i,
                         f'{int(valor)}', ha='left', va='center', fontsize=9)
 
-        plt.tight_layout()
+        fig.tight_layout()
 
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_contenido_aulas_detalle)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.figuras.mostrar(self.frame_contenido_aulas_detalle)
 
+    @grafico_memorizado('frame_contenido_aulas_detalle')
     def grafico_promocion_por_nacionalidad_aulas(self):
         """Gráfico de tasas de promoción por nacionalidad en aulas de acogida"""
-        for widget in self.frame_contenido_aulas_detalle.winfo_children():
-            widget.destroy()
-
         datos = self.analizador.obtener_analisis_detallado_aulas_acollida()
-        if not datos or 'nacionalidad_x_consecuencias' not in datos:
+        if not datos or 'promocion_por_nacionalidad' not in datos:
             messagebox.showwarning("Advertencia", "No hay datos suficientes")
             return
 
-        # Calcular tasa de promoción por nacionalidad
-        nac_consec = datos['nacionalidad_x_consecuencias']
-
-        tasas_por_nac = {}
-        for (nac, consec), total in nac_consec.items():
-            if nac not in tasas_por_nac:
-                tasas_por_nac[nac] = {'total': 0, 'promocionan': 0}
-
-            tasas_por_nac[nac]['total'] += total
-
-            # En catalán: "Accedeix", "Obté el títol", "Passa de curs" = promociona
-            # Pero NO "Roman" (permanece), "No passa", "No obté", "No accedeix"
-            if (('Accedeix al curs següent' in consec or 'Passa de curs' in consec or 'Obté el títol' in consec) and
-                ('Roman' not in consec and 'No passa' not in consec and 'No obté' not in consec and 'No accedeix' not in consec)):
-                tasas_por_nac[nac]['promocionan'] += total
-
-        # Calcular porcentajes
-        for nac in tasas_por_nac:
-            total = tasas_por_nac[nac]['total']
-            prom = tasas_por_nac[nac]['promocionan']
-            tasas_por_nac[nac]['tasa'] = (prom / total * 100) if total > 0 else 0
+        # Tasas de promoción por nacionalidad: top 8 por total de estudiantes
+        tasas_ordenadas = datos['promocion_por_nacionalidad'].sort_values('total', ascending=False).head(8)
 
-        # Ordenar por total de estudiantes y tomar top 8
-        tasas_ordenadas = sorted(tasas_por_nac.items(),
-                                key=lambda x: x[1]['total'],
-                                reverse=True)[:8]
+        fig = self.figuras.figura(self.frame_contenido_aulas_detalle, figsize=(14, 6))
+        ax1, ax2 = fig.subplots(1, 2)
 
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
-
-        nacionalidades = [nac for nac, _ in tasas_ordenadas]
-        tasas = [datos['tasa'] for _, datos in tasas_ordenadas]
-        totales = [datos['total'] for _, datos in tasas_ordenadas]
+        nacionalidades = [str(nac) for nac in tasas_ordenadas.index]
+        tasas = tasas_ordenadas['tasa'].tolist()
+        totales = tasas_ordenadas['total'].tolist()
 
         # Gráfico 1: Tasas de promoción
         colores = ['#51cf66' if tasa >= 90 else '#ff8c42' if tasa >= 75 else '#ff6b6b' for tasa in tasas]
@@ -2714,11 +4926,9 @@ class VentanaAnalisis:
             ax2.text(total + max(totales)*0.01, i, f'{int(total)}',
                     ha='left', va='center', fontsize=9)
 
-        plt.tight_layout()
+        fig.tight_layout()
 
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_contenido_aulas_detalle)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.figuras.mostrar(self.frame_contenido_aulas_detalle)
 
     def mostrar_tabla_detallada_aulas(self):
         """Muestra tabla detallada con nivel, nacionalidad y promoción"""
@@ -2755,23 +4965,20 @@ class VentanaAnalisis:
 
     # ==================== PESTAÑA 6: DIVERSIDAD CULTURAL ====================
 
-    def crear_pestana_diversidad_cultural(self):
+    def crear_pestana_diversidad_cultural(self, frame):
         """Crea la pestaña de diversidad cultural"""
-        frame = ttk.Frame(self.notebook)
-        self.notebook.add(frame, text="🌍 Diversidad Cultural")
-
         # Frame de controles
         frame_controles = ttk.Frame(frame)
         frame_controles.pack(side=tk.TOP, fill=tk.X, padx=5, pady=5)
 
         ttk.Button(frame_controles, text="📊 Resumen Diversidad",
-                   command=self.mostrar_resumen_diversidad).grid(row=0, column=0, padx=5)
+                   command=self.vista('diversidad', self.mostrar_resumen_diversidad)).grid(row=0, column=0, padx=5)
         ttk.Button(frame_controles, text="🥧 Gráfico Circular",
-                   command=self.grafico_circular_diversidad).grid(row=0, column=1, padx=5)
+                   command=self.vista('diversidad', self.grafico_circular_diversidad)).grid(row=0, column=1, padx=5)
         ttk.Button(frame_controles, text="📊 Top 10 Orígenes",
-                   command=self.grafico_top_origenes).grid(row=0, column=2, padx=5)
+                   command=self.vista('diversidad', self.grafico_top_origenes)).grid(row=0, column=2, padx=5)
         ttk.Button(frame_controles, text="📈 Evolución por Nivel",
-                   command=self.grafico_diversidad_por_nivel).grid(row=0, column=3, padx=5)
+                   command=self.vista('diversidad', self.grafico_diversidad_por_nivel)).grid(row=0, column=3, padx=5)
 
         # Frame para contenido
         self.frame_contenido_diversidad = ttk.Frame(frame)
@@ -2807,17 +5014,16 @@ class VentanaAnalisis:
 
         texto_widget.insert(tk.END, texto)
 
+    @grafico_memorizado('frame_contenido_diversidad')
     def grafico_circular_diversidad(self):
         """Gráfico circular de diversidad"""
-        for widget in self.frame_contenido_diversidad.winfo_children():
-            widget.destroy()
-
         stats = self.analizador.obtener_resumen_diversidad()
         if not stats:
             messagebox.showwarning("Advertencia", "No hay datos disponibles")
             return
 
-        fig, ax = plt.subplots(figsize=(10, 8))
+        fig = self.figuras.figura(self.frame_contenido_diversidad, figsize=(10, 8))
+        ax = fig.subplots()
 
         # Top 7 + Otros
         top7 = stats['top_nacionalidades'].head(7)
@@ -2827,7 +5033,7 @@ class VentanaAnalisis:
         sizes = list(top7.values) + [otros]
 
         # Colores
-        colors = plt.cm.Set3(range(len(labels)))
+        colors = self.figuras.colores('Set3', range(len(labels)))
 
         # Explotar España
         explode = [0.1 if 'ESPANYA' in label else 0 for label in labels]
@@ -2836,28 +5042,25 @@ class VentanaAnalisis:
                colors=colors, explode=explode, shadow=True)
         ax.set_title('🥧 Distribución por Nacionalidad', fontsize=14, fontweight='bold')
 
-        plt.tight_layout()
+        fig.tight_layout()
 
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_contenido_diversidad)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.figuras.mostrar(self.frame_contenido_diversidad)
 
+    @grafico_memorizado('frame_contenido_diversidad')
     def grafico_top_origenes(self):
         """Gráfico Top 10 orígenes"""
-        for widget in self.frame_contenido_diversidad.winfo_children():
-            widget.destroy()
-
         stats = self.analizador.obtener_resumen_diversidad()
         if not stats:
             messagebox.showwarning("Advertencia", "No hay datos disponibles")
             return
 
-        fig, ax = plt.subplots(figsize=(12, 8))
+        fig = self.figuras.figura(self.frame_contenido_diversidad, figsize=(12, 8))
+        ax = fig.subplots()
 
         top10 = stats['top_nacionalidades'].head(10)
 
         bars = ax.barh(range(len(top10)), top10.values,
-                      color=plt.cm.viridis(np.linspace(0.3, 0.9, len(top10))))
+                      color=self.figuras.colores('viridis', np.linspace(0.3, 0.9, len(top10))))
         ax.set_yticks(range(len(top10)))
         ax.set_yticklabels(top10.index)
         ax.set_title('📊 Top 10 Orígenes', fontsize=14, fontweight='bold')
@@ -2870,54 +5073,42 @@ class VentanaAnalisis:
                    f'{int(valor):,} ({porcentaje:.1f}%)',
                    ha='left', va='center', fontsize=10)
 
-        plt.tight_layout()
+        fig.tight_layout()
 
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_contenido_diversidad)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.figuras.mostrar(self.frame_contenido_diversidad)
 
+    @grafico_memorizado('frame_contenido_diversidad')
     def grafico_diversidad_por_nivel(self):
         """Gráfico de evolución de diversidad por nivel"""
-        for widget in self.frame_contenido_diversidad.winfo_children():
-            widget.destroy()
-
         if self.analizador.df_actual is None:
             messagebox.showwarning("Advertencia", "No hay datos cargados")
             return
 
-        col_nivel = 'Nivell'
-        col_nacionalidad = self.analizador.buscar_columna(['Zona', 'Nacionalitat'])
-        col_numero = self.analizador.buscar_columna(['mero', 'Avalua'])
+        col_nivel = self.analizador.columna('nivel')
+        col_nacionalidad = self.analizador.columna('nacionalidad')
+        col_numero = self.analizador.columna('numero')
 
-        if col_nacionalidad is None or col_numero is None or col_nivel not in self.analizador.df_actual.columns:
+        if col_nacionalidad is None or col_numero is None or col_nivel is None:
             messagebox.showwarning("Advertencia", "Columnas necesarias no encontradas")
             return
 
-        fig, ax = plt.subplots(figsize=(12, 7))
-
-        # Obtener top 6 nacionalidades
-        top6 = self.analizador.df_actual.groupby(col_nacionalidad)[col_numero].sum().sort_values(ascending=False).head(6).index
+        # Top 6 nacionalidades por nivel, del cubo de agregados
+        por_nivel = self.analizador.obtener_diversidad_por_nivel()
+        niveles = list(por_nivel.index)
 
-        # Preparar datos por nivel
-        niveles = sorted(self.analizador.df_actual[col_nivel].unique())
-        datos_por_nac = {nac: [] for nac in top6}
-
-        for nivel in niveles:
-            df_nivel = self.analizador.df_actual[self.analizador.df_actual[col_nivel] == nivel]
-            for nac in top6:
-                total = df_nivel[df_nivel[col_nacionalidad] == nac][col_numero].sum()
-                datos_por_nac[nac].append(total)
+        fig = self.figuras.figura(self.frame_contenido_diversidad, figsize=(12, 7))
+        ax = fig.subplots()
 
         # Crear gráfico de barras apiladas
         x = np.arange(len(niveles))
         width = 0.6
 
         bottom = np.zeros(len(niveles))
-        colors = plt.cm.tab10(range(len(top6)))
+        colors = self.figuras.colores('tab10', range(len(por_nivel.columns)))
 
-        for i, (nac, valores) in enumerate(datos_por_nac.items()):
-            ax.bar(x, valores, width, label=nac, bottom=bottom, color=colors[i])
-            bottom += valores
+        for i, (nac, valores) in enumerate(por_nivel.items()):
+            ax.bar(x, valores.to_numpy(), width, label=nac, bottom=bottom, color=colors[i])
+            bottom += valores.to_numpy()
 
         ax.set_xlabel('Nivel', fontsize=12)
         ax.set_ylabel('Número de Estudiantes', fontsize=12)
@@ -2927,28 +5118,23 @@ class VentanaAnalisis:
         ax.legend(loc='upper left', bbox_to_anchor=(1, 1))
         ax.grid(axis='y', alpha=0.3)
 
-        plt.tight_layout()
+        fig.tight_layout()
 
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_contenido_diversidad)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.figuras.mostrar(self.frame_contenido_diversidad)
 
     # ==================== PESTAÑA 6: COMPARATIVA GRUPOS ====================
 
-    def crear_pestana_comparativa_grupos(self):
+    def crear_pestana_comparativa_grupos(self, frame):
         """Crea la pestaña de comparativa entre grupos culturales"""
-        frame = ttk.Frame(self.notebook)
-        self.notebook.add(frame, text="⚖️ Comparativa Grupos")
-
         frame_controles = ttk.Frame(frame)
         frame_controles.pack(side=tk.TOP, fill=tk.X, padx=5, pady=5)
 
         ttk.Button(frame_controles, text="📊 Tabla Comparativa",
-                   command=self.mostrar_tabla_comparativa).grid(row=0, column=0, padx=5)
+                   command=self.vista('comparativa', self.mostrar_tabla_comparativa)).grid(row=0, column=0, padx=5)
         ttk.Button(frame_controles, text="📈 Tasas de Promoción",
-                   command=self.grafico_tasas_promocion).grid(row=0, column=1, padx=5)
+                   command=self.vista('comparativa', self.grafico_tasas_promocion)).grid(row=0, column=1, padx=5)
         ttk.Button(frame_controles, text="📉 Brechas Educativas",
-                   command=self.grafico_brechas).grid(row=0, column=2, padx=5)
+                   command=self.vista('comparativa', self.grafico_brechas)).grid(row=0, column=2, padx=5)
 
         self.frame_contenido_comparativa = ttk.Frame(frame)
         self.frame_contenido_comparativa.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -2984,17 +5170,16 @@ class VentanaAnalisis:
 
         texto_widget.insert(tk.END, texto)
 
+    @grafico_memorizado('frame_contenido_comparativa')
     def grafico_tasas_promocion(self):
         """Gráfico de tasas de promoción"""
-        for widget in self.frame_contenido_comparativa.winfo_children():
-            widget.destroy()
-
         stats = self.analizador.obtener_comparativa_grupos()
         if not stats:
             messagebox.showwarning("Advertencia", "No hay datos disponibles")
             return
 
-        fig, ax = plt.subplots(figsize=(12, 7))
+        fig = self.figuras.figura(self.frame_contenido_comparativa, figsize=(12, 7))
+        ax = fig.subplots()
 
         grupos = list(stats.keys())
         tasas = [stats[g]['tasa_promocion'] for g in grupos]
@@ -3017,23 +5202,20 @@ class VentanaAnalisis:
             ax.text(tasa + 1, i, f'{tasa:.1f}%',
                    ha='left', va='center', fontsize=10, fontweight='bold')
 
-        plt.tight_layout()
+        fig.tight_layout()
 
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_contenido_comparativa)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.figuras.mostrar(self.frame_contenido_comparativa)
 
+    @grafico_memorizado('frame_contenido_comparativa')
     def grafico_brechas(self):
         """Gráfico de brechas educativas"""
-        for widget in self.frame_contenido_comparativa.winfo_children():
-            widget.destroy()
-
         stats = self.analizador.obtener_comparativa_grupos()
         if not stats:
             messagebox.showwarning("Advertencia", "No hay datos disponibles")
             return
 
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 7))
+        fig = self.figuras.figura(self.frame_contenido_comparativa, figsize=(14, 7))
+        ax1, ax2 = fig.subplots(1, 2)
 
         grupos = list(stats.keys())
         tasas_promocion = [stats[g]['tasa_promocion'] for g in grupos]
@@ -3077,19 +5259,14 @@ class VentanaAnalisis:
                     f'{brecha:+.1f}', ha='left' if brecha >= 0 else 'right',
                     va='center', fontsize=9, fontweight='bold')
 
-        plt.tight_layout()
+        fig.tight_layout()
 
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_contenido_comparativa)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.figuras.mostrar(self.frame_contenido_comparativa)
 
     # ==================== PESTAÑA 7: ANÁLISIS POR CENTRO ====================
 
-    def crear_pestana_analisis_centros(self):
+    def crear_pestana_analisis_centros(self, frame):
         """Crea la pestaña de análisis por centro educativo"""
-        frame = ttk.Frame(self.notebook)
-        self.notebook.add(frame, text="🏢 Análisis por Centro")
-
         # Frame de búsqueda
         frame_busqueda = ttk.LabelFrame(frame, text="🔍 Buscar Centro", padding="10")
         frame_busqueda.pack(side=tk.TOP, fill=tk.X, padx=10, pady=10)
@@ -3100,14 +5277,22 @@ class VentanaAnalisis:
         ttk.Button(frame_busqueda, text="Buscar",
                    command=self.buscar_centro).grid(row=0, column=2, padx=5)
 
+        ttk.Label(frame_busqueda, text="Lista de códigos:").grid(row=1, column=0, padx=5, pady=(5, 0), sticky=tk.N)
+        self.texto_codigos_centros = tk.Text(frame_busqueda, width=40, height=3)
+        self.texto_codigos_centros.grid(row=1, column=1, padx=5, pady=(5, 0))
+        ttk.Button(frame_busqueda, text="Buscar lista",
+                   command=self.buscar_lista_centros).grid(row=1, column=2, padx=5, pady=(5, 0), sticky=tk.N)
+
         # Frame de controles
         frame_controles = ttk.Frame(frame)
         frame_controles.pack(side=tk.TOP, fill=tk.X, padx=5, pady=5)
 
         ttk.Button(frame_controles, text="📊 Top Centros Diversos",
-                   command=self.mostrar_top_centros_diversos).grid(row=0, column=0, padx=5)
+                   command=self.vista('centros', self.mostrar_top_centros_diversos)).grid(row=0, column=0, padx=5)
         ttk.Button(frame_controles, text="🏫 Centros con Aulas Acogida",
-                   command=self.mostrar_centros_aulas).grid(row=0, column=1, padx=5)
+                   command=self.vista('centros', self.mostrar_centros_aulas)).grid(row=0, column=1, padx=5)
+        ttk.Button(frame_controles, text="💾 Exportar Ranking Completo",
+                   command=self.vista('centros', self.exportar_ranking_centros)).grid(row=0, column=2, padx=5)
 
         self.frame_contenido_centros = ttk.Frame(frame)
         self.frame_contenido_centros.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -3122,11 +5307,7 @@ class VentanaAnalisis:
             messagebox.showwarning("Advertencia", "Ingresa un código de centro")
             return
 
-        # Convertir a int si es posible
-        try:
-            codigo = int(codigo)
-        except:
-            pass
+        codigo = interpretar_codigo_centro(codigo)
 
         stats = self.analizador.obtener_analisis_por_centro(codigo)
 
@@ -3158,6 +5339,45 @@ class VentanaAnalisis:
 
         texto_widget.insert(tk.END, texto)
 
+    def buscar_lista_centros(self):
+        """Busca a la vez todos los centros de una lista pegada de códigos"""
+        for widget in self.frame_contenido_centros.winfo_children():
+            widget.destroy()
+
+        codigos = [interpretar_codigo_centro(codigo) for codigo in
+                   re.split(r'[\s,;]+', self.texto_codigos_centros.get(1.0, tk.END)) if codigo]
+        if not codigos:
+            messagebox.showwarning("Advertencia", "Pega uno o más códigos de centro")
+            return
+
+        tabla = self.analizador.obtener_analisis_centros(codigos)
+        if tabla is None:
+            messagebox.showwarning("Advertencia", "No hay datos de centros cargados")
+            return
+
+        texto_widget = scrolledtext.ScrolledText(self.frame_contenido_centros, wrap=tk.WORD, font=('Courier', 10))
+        texto_widget.pack(fill=tk.BOTH, expand=True)
+
+        encontrados = tabla[tabla['encontrado']]
+        texto = ""
+        texto += "="*70 + "\n"
+        texto += f"🏢 BÚSQUEDA DE {len(tabla)} CENTROS ({len(encontrados)} encontrados)\n"
+        texto += "="*70 + "\n\n"
+
+        texto += f"{'Centro':<12} {'Estudiantes':>12} {'Registros':>10} {'Aula acogida':>13}\n"
+        texto += "-"*70 + "\n"
+        for fila in encontrados.itertuples(index=False):
+            aula = f"{int(fila.en_aula_acollida):,}" if pd.notna(fila.en_aula_acollida) else "-"
+            texto += (f"{str(fila.centro):<12} {int(fila.total_estudiantes):>12,} "
+                      f"{int(fila.registros):>10,} {aula:>13}\n")
+
+        no_encontrados = tabla.loc[~tabla['encontrado'], 'centro']
+        if len(no_encontrados) > 0:
+            texto += f"\nNo encontrados ({len(no_encontrados)}): "
+            texto += ", ".join(str(codigo) for codigo in no_encontrados) + "\n"
+
+        texto_widget.insert(tk.END, texto)
+
     def mostrar_top_centros_diversos(self):
         """Muestra top centros más diversos"""
         for widget in self.frame_contenido_centros.winfo_children():
@@ -3174,13 +5394,14 @@ class VentanaAnalisis:
 
         texto = ""
         texto += "="*80 + "\n"
-        texto += "📊 TOP 20 CENTROS MÁS DIVERSOS\n"
+        texto += f"📊 TOP {TOP_CENTROS_RANKING} CENTROS MÁS DIVERSOS\n"
+        texto += f"(centros con al menos {MINIMO_ESTUDIANTES_RANKING} estudiantes)\n"
         texto += "="*80 + "\n\n"
 
         texto += f"{'#':<4} {'Centro':<12} {'Total':>10} {'Extranjeros':>12} {'% Extran.':>10}\n"
         texto += "-"*80 + "\n"
 
-        for i, centro in enumerate(centros[:20], 1):
+        for i, centro in enumerate(centros, 1):
             texto += f"{i:<4} {str(centro['centro']):<12} "
             texto += f"{int(centro['total']):>10,} "
             texto += f"{int(centro['extranjeros']):>12,} "
@@ -3188,6 +5409,33 @@ class VentanaAnalisis:
 
         texto_widget.insert(tk.END, texto)
 
+    def exportar_ranking_centros(self):
+        """Exporta a Excel el ranking de diversidad de todos los centros"""
+        ranking = self.analizador.obtener_ranking_centros()
+        if ranking is None or len(ranking) == 0:
+            messagebox.showwarning("Advertencia", "No hay datos disponibles")
+            return
+
+        ruta = filedialog.asksaveasfilename(
+            defaultextension=".xlsx",
+            filetypes=[("Excel files", "*.xlsx"), ("CSV files", "*.csv"), ("All files", "*.*")]
+        )
+
+        if ruta:
+            try:
+                ranking = ranking.rename(columns={
+                    'centro': 'Centro', 'total': 'Total', 'extranjeros': 'Extranjeros',
+                    'porcentaje': '% Extranjeros'
+                })
+                ranking.insert(0, 'Posición', range(1, len(ranking) + 1))
+                if ruta.lower().endswith('.csv'):
+                    ranking.to_csv(ruta, sep=';', index=False, encoding='utf-8-sig')
+                else:
+                    ranking.to_excel(ruta, index=False, engine='openpyxl')
+                messagebox.showinfo("Éxito", f"Ranking de {len(ranking)} centros exportado a:\n{ruta}")
+            except Exception as e:
+                messagebox.showerror("Error", f"Error al exportar: {str(e)}")
+
     def mostrar_centros_aulas(self):
         """Muestra centros con más estudiantes en aulas de acogida"""
         for widget in self.frame_contenido_centros.winfo_children():
@@ -3197,26 +5445,15 @@ class VentanaAnalisis:
             messagebox.showwarning("Advertencia", "No hay datos cargados")
             return
 
-        col_centro = self.analizador.buscar_columna(['Centre', 'Codi'])
-        col_aula = self.analizador.buscar_columna(['Aula', 'acollida'])
-        col_numero = self.analizador.buscar_columna(['mero', 'Avalua'])
-
-        if not all([col_centro, col_aula, col_numero]):
+        centros_aulas = self.analizador.obtener_centros_aulas_acollida()
+        if centros_aulas is None:
             messagebox.showwarning("Advertencia", "Columnas necesarias no encontradas")
             return
 
-        # Filtrar solo estudiantes en aulas de acogida
-        df_acollida = self.analizador.df_actual[
-            self.analizador.df_actual[col_aula].str.contains('S', na=False, case=False)
-        ]
-
-        if len(df_acollida) == 0:
+        if len(centros_aulas) == 0:
             messagebox.showinfo("Info", "No hay estudiantes en aulas de acogida")
             return
 
-        # Agrupar por centro
-        centros_aulas = df_acollida.groupby(col_centro)[col_numero].sum().sort_values(ascending=False)
-
         texto_widget = scrolledtext.ScrolledText(self.frame_contenido_centros, wrap=tk.WORD, font=('Courier', 10))
         texto_widget.pack(fill=tk.BOTH, expand=True)
 
@@ -3228,7 +5465,7 @@ class VentanaAnalisis:
         texto += f"{'#':<4} {'Centro':<12} {'Estudiantes':>15}\n"
         texto += "-"*70 + "\n"
 
-        for i, (centro, total) in enumerate(centros_aulas.head(20).items(), 1):
+        for i, (centro, total) in enumerate(centros_aulas.head(TOP_CENTROS_RANKING).items(), 1):
             texto += f"{i:<4} {str(centro):<12} {int(total):>15,}\n"
 
         texto_widget.insert(tk.END, texto)
@@ -3237,6 +5474,14 @@ class VentanaAnalisis:
 def main():
     root = tk.Tk()
     app = VentanaAnalisis(root)
+
+    # --medir-arranque: muestra cuánto tarda en aparecer la ventana y la cierra
+    if '--medir-arranque' in sys.argv[1:]:
+        root.update()
+        print(f"Ventana lista en {time.perf_counter() - INICIO_PROGRAMA:.2f} s")
+        app.cerrar()
+        return
+
     root.mainloop()
 
 